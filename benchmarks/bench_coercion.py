@@ -0,0 +1,20 @@
+from datashape import coercion, dshapes, coercion_cost
+
+
+class TimeCoercionTable(object):
+    """ Building the default coercion table, done once on first lookup """
+    def time_build_default_table(self):
+        table = coercion.CoercionTable()
+        coercion._add_default_rules(table)
+
+
+class TimeCoercionCost(object):
+    def setup(self):
+        self.ctypes = dshapes('int8', 'float64')
+        self.arrays = dshapes('10 * 10 * float32', 'X * ... * float64')
+
+    def time_ctypes(self):
+        coercion_cost(*self.ctypes)
+
+    def time_arrays(self):
+        coercion_cost(*self.arrays)
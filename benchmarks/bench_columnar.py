@@ -0,0 +1,23 @@
+from datashape import (dshape, to_arrow_schema, from_arrow_schema,
+                       column_layout, allocate_columns)
+
+from .workloads import wide_record
+
+
+class TimeArrowSchema(object):
+    """ Converting a wide table schema to and from Arrow's JSON schema """
+    def setup(self):
+        self.table = dshape('var * ' + wide_record(200))
+        self.schema = to_arrow_schema(self.table)
+
+    def time_to_arrow_schema(self):
+        to_arrow_schema(self.table)
+
+    def time_from_arrow_schema(self):
+        from_arrow_schema(self.schema)
+
+    def time_column_layout(self):
+        column_layout(self.table)
+
+    def time_allocate_columns(self):
+        allocate_columns(self.table, 10000)
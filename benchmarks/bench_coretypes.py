@@ -0,0 +1,67 @@
+import numpy as np
+
+from datashape import dshape, to_numpy, from_numpy, cat_dshapes
+
+from datashape.coretypes import _index, _index_key
+
+from .workloads import wide_record, nested_type
+
+
+class TimeSubshape(object):
+    def setup(self):
+        self.table = dshape('var * ' + wide_record(50))
+        self.cube = dshape('100 * 200 * var * 10 * float64')
+        self.nested = dshape(nested_type(12))
+
+    def time_row(self):
+        self.table.subshape[0]
+
+    def time_column_slice(self):
+        self.table.subshape[10:20, ['f1', 'f3', 'f5']]
+
+    def time_index_chain(self):
+        self.cube.subshape[5:50:3, -10:, 0, 2:8]
+
+    def time_deep_index_chain(self):
+        ds = self.nested
+        for i in range(6):
+            ds = ds.subshape[0, 'value']
+
+    def time_deep_index_chain_uncached(self):
+        ds = self.nested
+        for i in range(6):
+            ds = _index(ds, _index_key((0, 'value')))
+
+
+class TimeNumPyConversion(object):
+    def setup(self):
+        self.wide = dshape('100 * ' + wide_record(500))
+        self.array = dshape('10 * 10 * float64')
+        self.wide_dtype = to_numpy(self.wide)[1]
+
+    def time_to_numpy_array(self):
+        to_numpy(self.array)
+
+    def time_to_numpy_wide_record(self):
+        to_numpy(self.wide)
+
+    def time_from_numpy_wide_record(self):
+        from_numpy((100,), self.wide_dtype)
+
+    def time_record_to_numpy_dtype(self):
+        self.wide.measure.to_numpy_dtype()
+
+
+
+class TimeCatDshapes(object):
+    def setup(self):
+        self.partitions = [dshape('%d * 10 * %s' % (i % 100 + 1, wide_record(20)))
+                           for i in range(10000)]
+        self.streaming = self.partitions[:5000] + \
+            [dshape('var * 10 * ' + wide_record(20))] + self.partitions[5000:]
+
+    def time_fixed_partitions(self):
+        cat_dshapes(self.partitions)
+
+    def time_streaming_partitions(self):
+        cat_dshapes(iter(self.streaming))
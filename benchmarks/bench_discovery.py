@@ -0,0 +1,44 @@
+from datashape import discover
+
+from .workloads import rows_of_dicts
+
+
+class TimeDiscoverScalarLists(object):
+    """ Discovering long lists of builtin scalars """
+    params = [10 ** 5, 10 ** 7]
+    param_names = ['n']
+
+    def setup(self, n):
+        self.ints = list(range(n))
+        self.floats = [0.5] * n
+        self.bools = [True, False] * (n // 2)
+
+    def time_ints(self, n):
+        discover(self.ints)
+
+    def time_floats(self, n):
+        discover(self.floats)
+
+    def time_bools(self, n):
+        discover(self.bools)
+
+
+class TimeDiscoverCells(object):
+    """ Per-cell dispatch through ``discover`` for comparison """
+    def setup(self):
+        self.ints = list(range(10 ** 5))
+
+    def time_dispatch_ints(self):
+        [discover(x) for x in self.ints]
+
+
+class TimeDiscoverRecords(object):
+    """ Discovering lists of JSON-like dicts """
+    params = [1000, 10000]
+    param_names = ['n']
+
+    def setup(self, n):
+        self.rows = rows_of_dicts(n)
+
+    def time_list_of_dicts(self, n):
+        discover(self.rows)
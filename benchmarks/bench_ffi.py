@@ -0,0 +1,51 @@
+from datashape import dshape, to_ctypes, from_cffi, from_ctypes
+from datashape import util
+from datashape.util import _to_ctypes
+
+from .workloads import wide_record, nested_type, c_header
+
+
+class TimeToCtypes(object):
+    def setup(self):
+        self.wide = dshape(wide_record(200))
+        self.nested = dshape(nested_type(6).replace('string', 'int64')
+                             .replace('var * ', '10 * '))
+
+    def time_wide_record(self):
+        to_ctypes(self.wide)
+
+    def time_wide_record_uncached(self):
+        _to_ctypes(self.wide, None)
+
+    def time_nested(self):
+        to_ctypes(self.nested)
+
+
+class TimeFromCtypes(object):
+    def setup(self):
+        self.wide = to_ctypes(dshape(wide_record(200)))
+
+    def time_wide_record(self):
+        from_ctypes(self.wide)
+
+
+class TimeFromCffi(object):
+    params = [10, 100]
+
+    def setup(self, n):
+        try:
+            import cffi
+        except ImportError:
+            raise NotImplementedError('cffi is not installed')
+        self.ffi = cffi.FFI()
+        self.ffi.cdef(c_header(n))
+        self.structs = [self.ffi.typeof('struct s%d' % i) for i in range(n)]
+
+    def time_structs(self, n):
+        for t in self.structs:
+            from_cffi(self.ffi, t)
+
+    def time_structs_cold(self, n):
+        util._cffi_cache.clear()
+        for t in self.structs:
+            from_cffi(self.ffi, t)
@@ -0,0 +1,21 @@
+from datashape import dshape, coretypes
+from datashape.overload_resolver import OverloadResolver
+
+from .workloads import overloads
+
+
+class TimeResolveOverload(object):
+    params = [10, 100, 400]
+    param_names = ['noverloads']
+
+    def setup(self, n):
+        self.resolver = OverloadResolver('f')
+        self.resolver.extend_overloads(overloads(n))
+        self.args = coretypes.Tuple([dshape('10 * 3 * int16'),
+                                     dshape('10 * 3 * int8')])
+
+    def time_resolve(self, n):
+        self.resolver.resolve_overload(self.args)
+
+    def time_extend(self, n):
+        OverloadResolver('g').extend_overloads(overloads(n))
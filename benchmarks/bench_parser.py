@@ -0,0 +1,23 @@
+from datashape import dshape, parser, type_symbol_table
+
+from .workloads import wide_record, nested_type
+
+
+class TimeParse(object):
+    def setup(self):
+        self.simple = '10 * var * int32'
+        self.wide = 'var * ' + wide_record(500)
+        self.nested = nested_type(20)
+        self.sym = type_symbol_table.sym
+
+    def time_simple(self):
+        parser.parse(self.simple, self.sym)
+
+    def time_wide_record(self):
+        parser.parse(self.wide, self.sym)
+
+    def time_nested(self):
+        parser.parse(self.nested, self.sym)
+
+    def time_dshape_wide_record(self):
+        dshape(self.wide)
@@ -0,0 +1,46 @@
+from datashape import (dshape, isscalar, isrecord, isnumeric, isfixed,
+                       istabular, ishomogeneous, isdatelike, iscollection)
+from datashape.predicates import _dimensions
+
+from .workloads import wide_record, nested_type
+
+predicates = [isscalar, isrecord, isnumeric, isfixed, istabular,
+              ishomogeneous, isdatelike, iscollection, _dimensions]
+
+
+class TimePredicates(object):
+    """ Every predicate over a catalog of schemas, as a catalog scan does """
+    def setup(self):
+        texts = (['var * ' + wide_record(n) for n in range(1, 40)] +
+                 [nested_type(n) for n in range(1, 8)] +
+                 ['%d * %d * float64' % (n, n) for n in range(1, 40)] +
+                 ['var * {id: int64, when: ?datetime, tags: var * string}'])
+        self.strings = texts * 10
+        self.dshapes = [dshape(t) for t in texts] * 10
+
+    def time_strings(self):
+        for ds in self.strings:
+            for pred in predicates:
+                pred(ds)
+
+    def time_dshapes(self):
+        for ds in self.dshapes:
+            for pred in predicates:
+                pred(ds)
+
+
+class TimeDefensiveDshape(object):
+    """ Callers that wrap already-built types in ``dshape`` before asking """
+    def setup(self):
+        texts = (['var * ' + wide_record(n) for n in range(1, 40)] +
+                 [nested_type(n) for n in range(1, 8)])
+        self.measures = [dshape(t).measure for t in texts] * 10
+
+    def time_dshape(self):
+        for m in self.measures:
+            dshape(m)
+
+    def time_predicates(self):
+        for m in self.measures:
+            for pred in predicates:
+                pred(dshape(m))
@@ -0,0 +1,20 @@
+from datashape import validate, compile_validator
+
+
+class TimeValidateNested(object):
+    """ Validating rows of nested records """
+    schema = 'var * {name: string, amount: ?float64, loc: 2 * int32}'
+
+    def setup(self):
+        self.data = [{'name': 'Alice', 'amount': 100.0, 'loc': (1, 2)},
+                     {'name': 'Bob', 'amount': None, 'loc': (3, 4)}] * 5000
+        self.compiled = compile_validator(self.schema)
+
+    def time_validate(self):
+        validate(self.schema, self.data)
+
+    def time_compiled(self):
+        self.compiled(self.data)
+
+    def time_compile_and_validate(self):
+        compile_validator(self.schema)(self.data)
@@ -0,0 +1,79 @@
+"""
+Run the benchmarks in this directory without installing asv.
+
+The benchmark modules follow asv conventions: classes with optional
+``params``/``param_names`` and ``setup``, and ``time_*`` methods.  From
+the root of the repository::
+
+    python -m benchmarks.run               # everything
+    python -m benchmarks.run discover      # names containing 'discover'
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import importlib
+import itertools
+import os
+import sys
+import timeit
+
+
+def iter_benchmark_modules():
+    here = os.path.dirname(os.path.abspath(__file__))
+    for fn in sorted(os.listdir(here)):
+        if fn.startswith('bench_') and fn.endswith('.py'):
+            yield importlib.import_module('benchmarks.' + fn[:-3])
+
+
+def iter_params(cls):
+    params = getattr(cls, 'params', None)
+    if params is None:
+        return [()]
+    names = getattr(cls, 'param_names', None) or ['param']
+    if len(names) == 1:
+        return [(p,) for p in params]
+    return list(itertools.product(*params))
+
+
+def run(pattern='', repeat=3):
+    results = []
+    for mod in iter_benchmark_modules():
+        for clsname in sorted(dir(mod)):
+            cls = getattr(mod, clsname)
+            if not isinstance(cls, type) or not clsname.startswith('Time'):
+                continue
+            methods = sorted(m for m in dir(cls) if m.startswith('time_'))
+            for params in iter_params(cls):
+                bench = cls()
+                if hasattr(bench, 'setup'):
+                    try:
+                        bench.setup(*params)
+                    except NotImplementedError:
+                        # asv's way of skipping, e.g. for missing packages
+                        continue
+                for meth in methods:
+                    name = '%s.%s.%s' % (mod.__name__.split('.')[-1],
+                                         clsname, meth)
+                    if params:
+                        name += '(%s)' % ', '.join(map(str, params))
+                    if pattern not in name:
+                        continue
+                    func = getattr(bench, meth)
+                    # Calibrate so each timing takes at least ~0.2 seconds
+                    number = 1
+                    while True:
+                        t = timeit.timeit(lambda: func(*params), number=number)
+                        if t >= 0.2 or number >= 10 ** 6:
+                            break
+                        number *= 10
+                    best = min([t] + timeit.repeat(lambda: func(*params),
+                                                   number=number,
+                                                   repeat=repeat - 1))
+                    results.append((name, best / number))
+                    print('%-70s %12.3f us' % (name, 1e6 * best / number))
+                    sys.stdout.flush()
+    return results
+
+
+if __name__ == '__main__':
+    run(*sys.argv[1:2])
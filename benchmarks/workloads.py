@@ -0,0 +1,66 @@
+"""
+Datashapes and data shared by the benchmarks.
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import random
+
+numeric_types = ['int8', 'int16', 'int32', 'int64', 'uint8', 'uint16',
+                 'uint32', 'uint64', 'float32', 'float64']
+
+
+def wide_record(nfields, types=numeric_types):
+    """ ``{f0: int8, f1: int16, ...}`` with ``nfields`` fields """
+    return '{%s}' % ', '.join('f%d: %s' % (i, types[i % len(types)])
+                              for i in range(nfields))
+
+
+def nested_type(depth):
+    """ Alternating dimensions and records nested ``depth`` levels deep """
+    ds = 'float64'
+    for i in range(depth):
+        if i % 2:
+            ds = '{id: int64, name: string, value: %s}' % ds
+        else:
+            ds = '%d * %s' % (i + 2, ds)
+    return 'var * ' + ds
+
+
+def rows_of_dicts(n, seed=0):
+    """ Records as found in JSON, with a few missing values """
+    rnd = random.Random(seed)
+    names = ['Alice', 'Bob', 'Charlie', 'Dan', 'Edith', 'Frank']
+    return [{'id': i,
+             'name': rnd.choice(names),
+             'amount': rnd.random() * 100 if i % 10 else None,
+             'flag': bool(i % 2),
+             'tags': [rnd.choice(names) for _ in range(i % 3)]}
+            for i in range(n)]
+
+
+def overloads(n):
+    """ ``n`` distinct elementwise binary signatures over a few dtypes """
+    sigs = []
+    for i in range(n):
+        a = numeric_types[i % len(numeric_types)]
+        b = numeric_types[(i // len(numeric_types)) % len(numeric_types)]
+        dims = ['A... * ', 'M * N * ', 'M * ', 'N * 3 * '][
+                (i // len(numeric_types) ** 2) % 4]
+        sigs.append('(%s%s, %s%s) -> %s%s' % (dims, a, dims, b, dims, a))
+    return sigs
+
+
+def c_header(n):
+    """ C declarations of ``n`` structs, each nesting arrays of earlier ones """
+    ctypes = ['char', 'short', 'int', 'long long', 'unsigned int', 'float',
+              'double', 'int8_t', 'uint64_t', 'size_t']
+    decls = []
+    for i in range(n):
+        fields = ['%s f%d;' % (ctypes[(i + j) % len(ctypes)], j)
+                  for j in range(8)]
+        fields.append('double m[4][4];')
+        if i:
+            fields.append('struct s%d prev[2];' % (i // 2))
+        decls.append('struct s%d { %s };' % (i, ' '.join(fields)))
+    return '\n'.join(decls)
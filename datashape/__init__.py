@@ -1,21 +1,85 @@
 from __future__ import absolute_import
 
+import sys as _sys
+from importlib import import_module as _import_module
+
 from . import lexer, parser
-from . import type_equation_solver
 from .coretypes import *
 from .predicates import *
 from .typesets import *
-from .user import *
 from .type_symbol_table import *
-from .overload_resolver import *
-from .discovery import discover
 from .util import *
-from .coercion import coercion_cost
+from .layout import *
+from .profiling import (stats, reset_stats, enable_stats, disable_stats,
+                        collect_stats)
 from .error import (DataShapeSyntaxError, OverloadError, UnificationError,
                     CoercionError)
 
 __version__ = '0.4.0'
 
+
+# Names imported from submodules on first access.  These pull in NumPy,
+# dateutil and multipledispatch or build the coercion table, none of which
+# is needed to parse and inspect datashapes.
+_lazy_attributes = {
+    'discover': 'discovery',
+    'discover_jsonlines': 'discovery',
+    'validate': 'user',
+    'validate_array': 'user',
+    'compile_validator': 'user',
+    'RowValidator': 'user',
+    'Violation': 'user',
+    'issubschema': 'user',
+    'OverloadResolver': 'overload_resolver',
+    'coercion_cost': 'coercion',
+    'write_array': 'storage',
+    'open_array': 'storage',
+    'append_array': 'storage',
+    'read_dshape': 'storage',
+    'nullable_array': 'nullable',
+    'to_arrow_schema': 'columnar',
+    'from_arrow_schema': 'columnar',
+    'column_layout': 'columnar',
+    'allocate_columns': 'columnar',
+    'to_pyarrow_schema': 'columnar',
+    'from_pyarrow_schema': 'columnar',
+}
+_lazy_modules = ['coercion', 'columnar', 'discovery', 'dispatch', 'nullable',
+                 'overload_resolver', 'promotion', 'storage',
+                 'type_equation_solver', 'user']
+
+
+def __getattr__(name):
+    if name in _lazy_modules:
+        return _import_module('.' + name, __name__)
+    if name == 'np':
+        return _import_module('numpy')
+    try:
+        module = _lazy_attributes[name]
+    except KeyError:
+        raise AttributeError("module %r has no attribute %r" %
+                             (__name__, name))
+    value = getattr(_import_module('.' + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attributes) | set(_lazy_modules)
+                  | set(['np']))
+
+
+# Module __getattr__ (PEP 562) is new in Python 3.7, older versions import
+# everything up front
+if _sys.version_info < (3, 7):
+    np = _import_module('numpy')
+    for _name in _lazy_modules:
+        globals()[_name] = _import_module('.' + _name, __name__)
+    for _name, _module in _lazy_attributes.items():
+        globals()[_name] = getattr(globals()[_module], _name)
+    del _name, _module
+
+
 def test(verbose=False, xunitfile=None, exit=False):
     """
     Runs the full Datashape test suite, outputting
@@ -69,3 +133,7 @@ def test(verbose=False, xunitfile=None, exit=False):
     else:
         return ret
 
+
+
+__all__ = sorted(set(name for name in globals() if not name.startswith('_'))
+                 | set(_lazy_attributes))
@@ -7,13 +7,16 @@ to figure out whether this is possible in the face of polymorphic overloads.
 
 from __future__ import absolute_import, division, print_function
 
+import threading
 from collections import defaultdict
 
 from .error import CoercionError
+from .profiling import timed
 from .coretypes import CType, TypeVar, Mono
 from .typesets import complexes, floating, signed, unsigned
 from .coretypes import Implements, Fixed, Var, DataShape
 from . import coretypes
+from .traversal import Fold
 
 inf = float('inf')
 
@@ -55,16 +58,39 @@ class CoercionTable(object):
         return self.table[src, dst]
 
 
-_table = CoercionTable()
-add_coercion = _table.add_coercion
-coercion_cost_table = _table.coercion_cost
+# The default table, built by _default_table on first use
+_table = None
+_table_lock = threading.Lock()
+
+
+def _default_table():
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                table = CoercionTable()
+                _add_default_rules(table)
+                _table = table
+    return _table
+
+
+def add_coercion(src, dst, cost, transitive=True):
+    """Add a coercion rule to the default coercion table"""
+    _default_table().add_coercion(src, dst, cost, transitive)
+
+
+def coercion_cost_table(src, dst):
+    """Look up a coercion cost in the default coercion table"""
+    return (_table or _default_table()).table[src, dst]
 
 #------------------------------------------------------------------------
 # Coercion invariants
 #------------------------------------------------------------------------
 
-def transitivity(a, b, table=_table):
+def transitivity(a, b, table=None):
     """Enforce coercion rule transitivity"""
+    if table is None:
+        table = _default_table()
     # (src, a) in R and (a, b) in R => (src, b) in R
     for src in table.srcs[a]:
         table.add_coercion(src, b, table.coercion_cost(src, a) +
@@ -141,6 +167,7 @@ def _strip_datashape(a):
     return a
 
 
+@timed('coercion_cost')
 def coercion_cost(a, b, seen=None):
     """
     Determine a coercion cost from type `a` to type `b`.
@@ -195,57 +222,75 @@ def _coercion_cost(a, b, seen=None):
                          '%s and %s') % (a, b))
 
 
+def _mono_parameters(term):
+    return term.parameters
+
+
+_termsize = Fold(lambda term, sizes: sum(sizes) + 1, _mono_parameters,
+                 leaf=lambda x: 0)
+
+
 def termsize(term):
     """Determine the size of a type term"""
-    if isinstance(term, Mono):
-        return sum(termsize(p) for p in term.parameters) + 1
-    return 0
+    return _termsize(term)
 
 
 #------------------------------------------------------------------------
 # Default coercion rules
 #------------------------------------------------------------------------
 
-def add_numeric_rule(types, cost=1):
+def add_numeric_rule(types, cost=1, table=None):
+    if table is None:
+        table = _default_table()
     types = list(types)
     for src, dst in zip(types[:-1], types[1:]):
-        add_coercion(src, dst, cost)
-
-add_numeric_rule(signed)
-add_numeric_rule(unsigned)
-add_numeric_rule(floating)
-add_numeric_rule(complexes)
-
-add_numeric_rule([coretypes.uint8, coretypes.int16])
-add_numeric_rule([coretypes.uint16, coretypes.int32])
-add_numeric_rule([coretypes.uint32, coretypes.int64])
-
-add_numeric_rule([coretypes.int16, coretypes.float32], 1.2)
-add_numeric_rule([coretypes.int32, coretypes.float64], 1.2)
-add_numeric_rule([coretypes.float32, coretypes.complex_float32], 1.2)
-add_numeric_rule([coretypes.float64, coretypes.complex_float64], 1.2)
-
-# Potentially lossy conversions
-
-# unsigned -> signed
-add_numeric_rule([coretypes.uint8, coretypes.int8], 1.5)
-add_numeric_rule([coretypes.uint16, coretypes.int16], 1.5)
-add_numeric_rule([coretypes.uint32, coretypes.int32], 1.5)
-add_numeric_rule([coretypes.uint64, coretypes.int64], 1.5)
-
-# signed -> unsigned
-add_numeric_rule([coretypes.int8, coretypes.uint8], 1.5)
-add_numeric_rule([coretypes.int16, coretypes.uint16], 1.5)
-add_numeric_rule([coretypes.int32, coretypes.uint32], 1.5)
-add_numeric_rule([coretypes.int64, coretypes.uint64], 1.5)
-
-# int -> float
-add_numeric_rule([coretypes.int32, coretypes.float32], 1.5)
-add_numeric_rule([coretypes.int64, coretypes.float64], 1.5)
-
-# float -> complex
-add_numeric_rule([coretypes.float64, coretypes.complex_float32], 1.5)
-
-# Anything -> bool
-for tp in (list(signed) + list(unsigned) + list(floating) + list(complexes)):
-    add_numeric_rule([tp, coretypes.bool_], 1000.)
+        table.add_coercion(src, dst, cost)
+
+
+def _add_default_rules(table):
+    """Fill a coercion table with the default rules
+
+    This runs on the first lookup rather than at import, most programs
+    importing datashape never compute a coercion cost.
+    """
+    rule = lambda types, cost=1: add_numeric_rule(types, cost, table)
+
+    rule(signed)
+    rule(unsigned)
+    rule(floating)
+    rule(complexes)
+
+    rule([coretypes.uint8, coretypes.int16])
+    rule([coretypes.uint16, coretypes.int32])
+    rule([coretypes.uint32, coretypes.int64])
+
+    rule([coretypes.int16, coretypes.float32], 1.2)
+    rule([coretypes.int32, coretypes.float64], 1.2)
+    rule([coretypes.float32, coretypes.complex_float32], 1.2)
+    rule([coretypes.float64, coretypes.complex_float64], 1.2)
+
+    # Potentially lossy conversions
+
+    # unsigned -> signed
+    rule([coretypes.uint8, coretypes.int8], 1.5)
+    rule([coretypes.uint16, coretypes.int16], 1.5)
+    rule([coretypes.uint32, coretypes.int32], 1.5)
+    rule([coretypes.uint64, coretypes.int64], 1.5)
+
+    # signed -> unsigned
+    rule([coretypes.int8, coretypes.uint8], 1.5)
+    rule([coretypes.int16, coretypes.uint16], 1.5)
+    rule([coretypes.int32, coretypes.uint32], 1.5)
+    rule([coretypes.int64, coretypes.uint64], 1.5)
+
+    # int -> float
+    rule([coretypes.int32, coretypes.float32], 1.5)
+    rule([coretypes.int64, coretypes.float64], 1.5)
+
+    # float -> complex
+    rule([coretypes.float64, coretypes.complex_float32], 1.5)
+
+    # Anything -> bool
+    for tp in (list(signed) + list(unsigned) + list(floating) +
+               list(complexes)):
+        rule([tp, coretypes.bool_], 1000.)
@@ -0,0 +1,385 @@
+"""
+Arrow-style columnar schemas.
+
+``to_arrow_schema`` describes a table datashape, ``var * {...}``, as the
+schema of Apache Arrow's JSON format: plain dicts and lists that can be
+serialized with ``json``, with a ``nullable`` flag for option types and
+``children`` for structs and lists.  ``from_arrow_schema`` is its inverse.
+
+``column_layout`` gives the physical buffers Arrow uses for each column:
+a validity bitmap for nullable columns, 32-bit offsets for strings and
+variable-length lists, and a data buffer for fixed-width values.
+``allocate_columns`` allocates them with NumPy.  ``to_pyarrow_schema`` and
+``from_pyarrow_schema`` convert to and from ``pyarrow.Schema`` when pyarrow
+is installed.
+"""
+
+from __future__ import print_function, division, absolute_import
+
+from collections import namedtuple
+
+from .coretypes import (Type, DataShape, Option, Record, CType, String, Bytes,
+                        Date, Time, DateTime, Null, Fixed, Var, date_, time_,
+                        bool_, null, bytes_, string, _numpy)
+from .internal_utils import LRUCache
+from .util import dshape
+
+
+__all__ = ['to_arrow_schema', 'from_arrow_schema', 'column_layout',
+           'allocate_columns', 'to_pyarrow_schema', 'from_pyarrow_schema',
+           'Column', 'Buffer']
+
+
+# Arrow recommends padding every buffer to a multiple of 64 bytes
+ALIGNMENT = 64
+
+_precisions = {'float16': 'HALF', 'float32': 'SINGLE', 'float64': 'DOUBLE'}
+_floats = dict((v, k) for k, v in _precisions.items())
+
+
+Buffer = namedtuple('Buffer', 'kind bit_width')
+Buffer.__doc__ = """ One physical buffer of a column
+
+``kind`` is ``'validity'``, ``'offsets'`` or ``'data'`` and ``bit_width``
+the number of bits per element: 1 for validity bitmaps and booleans, 32
+for offsets, and 8 for the bytes of strings.
+"""
+
+
+Column = namedtuple('Column', 'name type nullable buffers children')
+Column.__doc__ = """ The physical layout of one column of a table
+
+``type`` is the datashape of a value without its option, ``buffers`` a
+tuple of ``Buffer`` and ``children`` the columns of struct fields or of the
+items of a list.
+"""
+
+
+def to_arrow_schema(ds):
+    """ The Arrow JSON schema of a table datashape
+
+    >>> schema = to_arrow_schema('var * {id: int64, name: ?string}')
+    >>> schema['fields'][0]['type']
+    {'name': 'int', 'isSigned': True, 'bitWidth': 64}
+    >>> schema['fields'][1]['type'], schema['fields'][1]['nullable']
+    ({'name': 'utf8'}, True)
+    """
+    return {'fields': [_field(name, typ)
+                       for name, typ in _table_record(ds).fields]}
+
+
+def from_arrow_schema(schema):
+    """ The table datashape of an Arrow JSON schema
+
+    >>> from_arrow_schema({'fields': [
+    ...     {'name': 'x', 'nullable': True,
+    ...      'type': {'name': 'floatingpoint', 'precision': 'DOUBLE'}},
+    ...     {'name': 'tags', 'nullable': False, 'type': {'name': 'list'},
+    ...      'children': [{'name': 'item', 'nullable': False,
+    ...                    'type': {'name': 'utf8'}}]}]})
+    dshape("var * { x : ?float64, tags : var * string }")
+    """
+    return DataShape(Var(), Record([(f['name'], _from_field(f))
+                                    for f in schema['fields']]))
+
+
+def _table_record(ds):
+    ds = dshape(ds)
+    if len(ds) != 2 or not isinstance(ds[0], (Fixed, Var)) or \
+            not isinstance(ds.measure, Record):
+        raise TypeError('Expected a table datashape like var * {...}, got %s'
+                        % ds)
+    return ds.measure
+
+
+def _split(typ):
+    """ A type without its option, and whether it is nullable """
+    if isinstance(typ, DataShape) and len(typ) == 1:
+        typ = typ.measure
+    if isinstance(typ, Option):
+        return _split(typ.ty)[0], True
+    return typ, False
+
+
+def _field(name, typ):
+    typ, nullable = _split(typ)
+    arrow, children = _arrow_type(typ)
+    return {'name': str(name), 'nullable': nullable, 'type': arrow,
+            'children': children}
+
+
+def _arrow_type(typ):
+    """ The Arrow type of a datashape and the fields of its children """
+    if isinstance(typ, DataShape):
+        dim, rest = typ[0], DataShape(*typ.parameters[1:])
+        if isinstance(dim, Var):
+            return {'name': 'list'}, [_field('item', rest)]
+        if isinstance(dim, Fixed):
+            return ({'name': 'fixedsizelist', 'listSize': dim.val},
+                    [_field('item', rest)])
+    elif isinstance(typ, Record):
+        return {'name': 'struct'}, [_field(name, t) for name, t in typ.fields]
+    elif isinstance(typ, CType):
+        if typ == bool_:
+            return {'name': 'bool'}, []
+        if typ.name.startswith(('int', 'uint')):
+            return ({'name': 'int', 'isSigned': typ.name.startswith('int'),
+                     'bitWidth': typ.itemsize * 8}, [])
+        if typ.name in _precisions:
+            return ({'name': 'floatingpoint',
+                     'precision': _precisions[typ.name]}, [])
+    elif isinstance(typ, String):
+        if typ.fixlen is not None and typ.encoding == 'A':
+            return {'name': 'fixedsizebinary', 'byteWidth': typ.fixlen}, []
+        return {'name': 'utf8'}, []
+    elif isinstance(typ, Bytes):
+        return {'name': 'binary'}, []
+    elif isinstance(typ, Date):
+        return {'name': 'date', 'unit': 'DAY'}, []
+    elif isinstance(typ, Time):
+        return {'name': 'time', 'unit': 'MICROSECOND', 'bitWidth': 64}, []
+    elif isinstance(typ, DateTime):
+        arrow = {'name': 'timestamp', 'unit': 'MICROSECOND'}
+        if typ.tz is not None:
+            arrow['timezone'] = typ.tz
+        return arrow, []
+    elif isinstance(typ, Null):
+        return {'name': 'null'}, []
+    raise TypeError('%s has no Arrow equivalent' % (typ,))
+
+
+def _from_field(field):
+    arrow = field['type']
+    name = arrow['name']
+    children = field.get('children', [])
+    if name in ('list', 'largelist'):
+        typ = _list(Var(), _from_field(children[0]))
+    elif name == 'fixedsizelist':
+        typ = _list(Fixed(arrow['listSize']), _from_field(children[0]))
+    elif name == 'struct':
+        typ = Record([(f['name'], _from_field(f)) for f in children])
+    elif name == 'bool':
+        typ = bool_
+    elif name == 'int':
+        typ = Type.lookup_type('%sint%d' % ('' if arrow['isSigned'] else 'u',
+                                            arrow['bitWidth']))
+    elif name == 'floatingpoint':
+        typ = Type.lookup_type(_floats[arrow['precision']])
+    elif name in ('utf8', 'largeutf8'):
+        typ = string
+    elif name in ('binary', 'largebinary'):
+        typ = bytes_
+    elif name == 'fixedsizebinary':
+        typ = String(arrow['byteWidth'], 'A')
+    elif name == 'date':
+        typ = date_
+    elif name == 'time':
+        typ = time_
+    elif name == 'timestamp':
+        typ = DateTime(arrow.get('timezone'))
+    elif name == 'null':
+        return null
+    else:
+        raise TypeError('Arrow type %r has no datashape equivalent' % name)
+    return Option(typ) if field.get('nullable') else typ
+
+
+def _list(dim, item):
+    """ ``dim * item``, adding to the dimensions of an item with some """
+    if isinstance(item, DataShape):
+        return DataShape(dim, *item.parameters)
+    return DataShape(dim, item)
+
+
+_layouts = LRUCache(1024)
+
+
+def column_layout(ds):
+    """ The Arrow buffers of each column of a table datashape
+
+    >>> name, tags = column_layout('var * {name: ?string, tags: var * int32}')
+    >>> [(b.kind, b.bit_width) for b in name.buffers]
+    [('validity', 1), ('offsets', 32), ('data', 8)]
+    >>> tags.buffers
+    (Buffer(kind='offsets', bit_width=32),)
+    >>> tags.children[0].buffers
+    (Buffer(kind='data', bit_width=32),)
+    """
+    record = _table_record(ds)
+    result = _layouts.get(record)
+    if result is None:
+        result = tuple(_column(name, typ) for name, typ in record.fields)
+        _layouts[record] = result
+    return result
+
+
+def _column(name, typ):
+    typ, nullable = _split(typ)
+    kind = _arrow_type(typ)[0]['name']
+    buffers = [Buffer('validity', 1)] if nullable else []
+    children = ()
+    if kind in ('list', 'fixedsizelist'):
+        if kind == 'list':
+            buffers.append(Buffer('offsets', 32))
+        children = _column('item', DataShape(*typ.parameters[1:])),
+    elif kind == 'struct':
+        children = tuple(_column(n, t) for n, t in typ.fields)
+    elif kind in ('utf8', 'binary'):
+        buffers.extend([Buffer('offsets', 32), Buffer('data', 8)])
+    elif kind == 'null':
+        buffers = []
+    else:
+        buffers.append(Buffer('data', _bit_width(typ)))
+    return Column(str(name), typ, nullable, tuple(buffers), children)
+
+
+def _bit_width(typ):
+    """ Bits per value in the data buffer of a fixed-width type """
+    if typ == bool_:
+        return 1
+    if isinstance(typ, CType):
+        return typ.itemsize * 8
+    if isinstance(typ, String):
+        return typ.fixlen * 8
+    if isinstance(typ, Date):
+        return 32
+    return 64
+
+
+def allocate_columns(ds, length, var_length=0):
+    """ Allocate zeroed Arrow buffers for ``length`` rows of a table
+
+    Returns a dict from column name to a dict with a NumPy array for each
+    of its buffers, keyed by buffer kind, and a ``'children'`` list of the
+    same for struct fields and list items.  The length of string data and
+    of list items depends on the values; they are sized for ``var_length``
+    bytes or items per value.  Every buffer is padded to a multiple of 64
+    bytes.
+
+    >>> cols = allocate_columns('var * {id: int64, name: ?string}', 100)
+    >>> cols['id']['data'].dtype, len(cols['id']['data'])
+    (dtype('int64'), 104)
+    >>> sorted(cols['name']), len(cols['name']['offsets'])
+    (['children', 'data', 'offsets', 'validity'], 112)
+    """
+    return dict((c.name, _allocate(c, length, var_length))
+                for c in column_layout(ds))
+
+
+def _allocate(column, length, var_length):
+    np = _numpy()
+    result = {'children': []}
+    variable = any(b.kind == 'offsets' for b in column.buffers)
+    for buf in column.buffers:
+        if buf.kind == 'offsets':
+            count, dtype = length + 1, np.dtype('int32')
+        elif buf.kind == 'data' and variable:
+            count, dtype = length * var_length, np.dtype('uint8')
+        elif buf.bit_width in (8, 16, 32, 64) and \
+                isinstance(column.type, CType):
+            count, dtype = length, column.type.to_numpy_dtype()
+        elif buf.bit_width in (32, 64):
+            count, dtype = length, np.dtype('int%d' % buf.bit_width)
+        else:
+            # Bitmaps and fixed-size binary as raw bytes
+            count, dtype = -(-length * buf.bit_width // 8), np.dtype('uint8')
+        nbytes = _round_up(count * dtype.itemsize, ALIGNMENT)
+        result[buf.kind] = np.zeros(nbytes, dtype='uint8').view(dtype)
+    if column.children:
+        if variable:
+            child_length = length * var_length
+        elif isinstance(column.type, DataShape):
+            child_length = length * column.type[0].val
+        else:
+            child_length = length
+        result['children'] = [_allocate(c, child_length, var_length)
+                              for c in column.children]
+    return result
+
+
+def _round_up(n, alignment):
+    return -(-n // alignment) * alignment
+
+
+def to_pyarrow_schema(ds):
+    """ A ``pyarrow.Schema`` for a table datashape """
+    import pyarrow as pa
+    return pa.schema([_pa_field(f) for f in to_arrow_schema(ds)['fields']])
+
+
+def from_pyarrow_schema(schema):
+    """ The table datashape of a ``pyarrow.Schema`` """
+    return from_arrow_schema({'fields': [_from_pa_field(f) for f in schema]})
+
+
+def _pa_field(field):
+    import pyarrow as pa
+    arrow = field['type']
+    name = arrow['name']
+    children = [_pa_field(f) for f in field['children']]
+    if name == 'list':
+        typ = pa.list_(children[0])
+    elif name == 'fixedsizelist':
+        typ = pa.list_(children[0], arrow['listSize'])
+    elif name == 'struct':
+        typ = pa.struct(children)
+    elif name == 'int':
+        typ = getattr(pa, '%sint%d' % ('' if arrow['isSigned'] else 'u',
+                                       arrow['bitWidth']))()
+    elif name == 'floatingpoint':
+        typ = getattr(pa, _floats[arrow['precision']])()
+    elif name == 'fixedsizebinary':
+        typ = pa.binary(arrow['byteWidth'])
+    elif name == 'date':
+        typ = pa.date32()
+    elif name == 'time':
+        typ = pa.time64('us')
+    elif name == 'timestamp':
+        typ = pa.timestamp('us', tz=arrow.get('timezone'))
+    else:
+        typ = getattr(pa, {'bool': 'bool_', 'utf8': 'string'}.get(name,
+                                                                  name))()
+    return pa.field(field['name'], typ, nullable=field['nullable'])
+
+
+def _from_pa_field(field):
+    import pyarrow as pa
+    t = field.type
+    children = []
+    if pa.types.is_list(t) or pa.types.is_large_list(t):
+        arrow = {'name': 'list'}
+        children = [_from_pa_field(t.value_field)]
+    elif pa.types.is_fixed_size_list(t):
+        arrow = {'name': 'fixedsizelist', 'listSize': t.list_size}
+        children = [_from_pa_field(t.value_field)]
+    elif pa.types.is_struct(t):
+        arrow = {'name': 'struct'}
+        children = [_from_pa_field(t.field(i)) for i in range(t.num_fields)]
+    elif pa.types.is_boolean(t):
+        arrow = {'name': 'bool'}
+    elif pa.types.is_integer(t):
+        arrow = {'name': 'int', 'isSigned': pa.types.is_signed_integer(t),
+                 'bitWidth': t.bit_width}
+    elif pa.types.is_floating(t):
+        arrow = {'name': 'floatingpoint',
+                 'precision': _precisions['float%d' % t.bit_width]}
+    elif pa.types.is_string(t) or pa.types.is_large_string(t):
+        arrow = {'name': 'utf8'}
+    elif pa.types.is_fixed_size_binary(t):
+        arrow = {'name': 'fixedsizebinary', 'byteWidth': t.byte_width}
+    elif pa.types.is_binary(t) or pa.types.is_large_binary(t):
+        arrow = {'name': 'binary'}
+    elif pa.types.is_date(t):
+        arrow = {'name': 'date', 'unit': 'DAY'}
+    elif pa.types.is_time(t):
+        arrow = {'name': 'time'}
+    elif pa.types.is_timestamp(t):
+        arrow = {'name': 'timestamp', 'unit': 'MICROSECOND'}
+        if t.tz is not None:
+            arrow['timezone'] = t.tz
+    elif pa.types.is_null(t):
+        arrow = {'name': 'null'}
+    else:
+        raise TypeError('Arrow type %s has no datashape equivalent' % t)
+    return {'name': field.name, 'nullable': field.nullable, 'type': arrow,
+            'children': children}
@@ -9,13 +9,10 @@ shape and data type.
 import ctypes
 import datetime
 import operator
-from math import ceil
 import re
 
-import numpy as np
-
 from .py2help import _inttypes, _strtypes, unicode
-from .internal_utils import IndexCallable
+from .internal_utils import IndexCallable, LRUCache
 
 
 # Classes of unit types.
@@ -23,6 +20,19 @@ DIMENSION = 1
 MEASURE = 2
 
 
+# NumPy is imported on first use rather than with datashape, see _numpy
+_np = None
+
+
+def _numpy():
+    """ The numpy module, imported once on first use """
+    global _np
+    if _np is None:
+        import numpy
+        _np = numpy
+    return _np
+
+
 class Type(type):
     _registry = {}
 
@@ -79,7 +89,13 @@ class Mono(object):
         return not self.__eq__(other)
 
     def __hash__(self):
-        return hash(self.info())
+        # Types are immutable once built, and hashing a large record walks
+        # every field, so the hash is computed once per instance
+        try:
+            return self.__dict__['_hash']
+        except KeyError:
+            _hash_bottom_up(self)
+            return self.__dict__['_hash']
 
     @property
     def shape(self):
@@ -150,6 +166,32 @@ class Mono(object):
             self._parameters = state
 
 
+def _hash_bottom_up(term):
+    """ Compute and cache the hashes of ``term`` and its subterms
+
+    The hash of a type combines those of its parameters.  Hashing the
+    deepest subterms first, with an explicit stack, means that no hash
+    recurses, however deeply the type is nested.
+    """
+    stack = [(term, False)]
+    while stack:
+        t, expanded = stack.pop()
+        if expanded:
+            t.__dict__['_hash'] = hash(t.info())
+            continue
+        if '_hash' in t.__dict__:
+            continue
+        stack.append((t, True))
+        items = list(t.parameters)
+        while items:
+            p = items.pop()
+            if isinstance(p, Mono):
+                if type(p).__hash__ is Mono.__hash__:
+                    stack.append((p, False))
+            elif isinstance(p, (list, tuple)):
+                items.extend(p)
+
+
 class Unit(Mono):
     """
     Unit type that does not need to be reconstructed.
@@ -255,6 +297,7 @@ class Date(Unit):
         return 'date'
 
     def to_numpy_dtype(self):
+        np = _numpy()
         return np.dtype('datetime64[D]')
 
 
@@ -295,6 +338,7 @@ class DateTime(Unit):
             return 'datetime[tz=%r]' % str(self.tz)
 
     def to_numpy_dtype(self):
+        np = _numpy()
         return np.dtype('datetime64[us]')
 
 
@@ -423,6 +467,7 @@ class String(Unit):
         >>> String(30, 'A').to_numpy_dtype()
         dtype('S30')
         """
+        np = _numpy()
         if self.fixlen:
             if self.encoding == 'A':
                 return np.dtype('S%d' % self.fixlen)
@@ -603,41 +648,35 @@ class DataShape(Mono):
         >>> print(ds.subshape[0, 1:])
         { amount : int32, id : int32 }
         """
-        from .predicates import isdimension
-        if isinstance(index, _inttypes) and isdimension(self[0]):
-            return self.subarray(1)
-        if isinstance(self[0], Record) and isinstance(index, _strtypes):
-            return self[0][index]
-        if isinstance(self[0], Record) and isinstance(index, _inttypes):
-            return self[0].parameters[0][index][1]
-        if isinstance(self[0], Record) and isinstance(index, list):
-            rec = self[0]
-            # Translate strings to corresponding integers
-            index = [self[0].names.index(i) if isinstance(i, _strtypes) else i
-                        for i in index]
-            return DataShape(Record([rec.parameters[0][i] for i in index]))
-        if isinstance(self[0], Record) and isinstance(index, slice):
-            rec = self[0]
-            return DataShape(Record(rec.parameters[0][index]))
-        if isinstance(index, list) and isdimension(self[0]):
-            return len(index) * self.subarray(1)
-        if isinstance(index, slice) and isdimension(self[0]):
-            if (isinstance(self[0], Fixed) or index.stop is not None):
-                start = index.start or 0
-                stop = index.stop or int(self[0])
-                count = stop - start
-                if index.step is not None:
-                    count = int(ceil(count / index.step))
-                return count * self.subarray(1)
-            else:
-                return var * self.subarray(1)
-        if isinstance(index, tuple):
-            if len(index) == 1:
-                return self._subshape(index[0])
-            else:
-                ds = self.subarray(1)._subshape(index[1:])
-                return (self[0] * ds)._subshape(index[0])
-        raise NotImplementedError()
+        return self.indexer(index)
+
+    def indexer(self, index):
+        """ The DataShape of ``self`` indexed by ``index``
+
+        ``index`` is an int, slice, list or field name, or a tuple of these
+        applied to successive dimensions and fields.  Slices follow Python
+        semantics, including negative bounds and steps.  On dimensions of
+        unknown length a slice whose bounds are both given and of the same
+        sign has a fixed length, assuming, as ``subshape`` always has, that
+        the dimension is long enough; other slices yield ``var``.  Results
+        are cached per datashape and index, so planners may call this for
+        every expression node.
+
+        >>> from datashape import dshape
+        >>> ds = dshape('10 * var * {x: int32, y: 3 * float64}')
+        >>> ds.indexer((slice(-4, None), slice(2, 8, 3), 'y'))
+        dshape("4 * 2 * 3 * float64")
+        >>> ds.indexer((slice(None, None, -3), slice(-5, None)))
+        dshape("4 * var * { x : int32, y : 3 * float64 }")
+        >>> ds.indexer((0, 0, 'y', -1))
+        dshape("float64")
+        """
+        key = self, _index_key(index)
+        result = _indexers.get(key)
+        if result is None:
+            result = _index(self, key[1])
+            _indexers[key] = result
+        return result
 
     def __setstate__(self, state):
         self.__init__(*state)
@@ -693,6 +732,7 @@ class CType(Unit):
         >>> CType.from_numpy_dtype(dtype('U30'))
         ctype("string[30, 'U32']")
         """
+        np = _numpy()
         try:
             return Type.lookup_type(dt.name)
         except KeyError:
@@ -726,11 +766,8 @@ class CType(Unit):
         """
         To Numpy dtype.
         """
-        # Fixup the complex type to how numpy does it
-        s = self.name
-        s = {'complex[float32]':'complex64',
-             'complex[float64]':'complex128'}.get(s, s)
-        return np.dtype(s)
+        np = _numpy()
+        return np.dtype(_numpy_names.get(self.name, self.name))
 
     def __str__(self):
         return self.name
@@ -739,6 +776,11 @@ class CType(Unit):
         return ''.join(["ctype(\"", str(self).encode('unicode_escape').decode('ascii'), "\")"])
 
 
+# CType names that NumPy spells differently
+_numpy_names = {'complex[float32]': 'complex64',
+                'complex[float64]': 'complex128'}
+
+
 class Fixed(Unit):
     """
     Fixed dimension.
@@ -924,9 +966,21 @@ class Record(Mono):
     def to_numpy_dtype(self):
         """
         To Numpy record dtype.
+
+        Nested records become nested structured dtypes and fields with
+        fixed dimensions become subarrays.  Fields are packed, as NumPy
+        lays them out by default; ``memory_layout`` gives the C-aligned
+        equivalent.
+
+        >>> from datashape import dshape
+        >>> dshape('{a: int8, b: {x: 3 * float32}}').measure.to_numpy_dtype()
+        dtype([('a', 'i1'), ('b', [('x', '<f4', (3,))])])
         """
-        return np.dtype([(str(name), to_numpy_dtype(typ))
-                         for name, typ in self.fields])
+        result = _to_numpy_cache.get(self)
+        if result is None:
+            result = (), _record_dtype(self, None)
+            _to_numpy_cache[self] = result
+        return result[1]
 
     def __getitem__(self, key):
         return self.dict[key]
@@ -1079,6 +1133,108 @@ Type.register('string', String())
 var = Var()
 
 
+# Conversions to and from NumPy, keyed by datashape and by (shape, dtype)
+_to_numpy_cache = LRUCache(4096)
+_from_numpy_cache = LRUCache(4096)
+
+
+_indexers = LRUCache(4096)
+
+
+def _index_key(index):
+    """ A hashable form of an index, as a tuple of (kind, value) pairs
+
+    >>> _index_key((0, slice(None, 5), ['a', 'b']))
+    (('i', 0), (':', (None, 5, None)), ('l', ('a', 'b')))
+    """
+    if not isinstance(index, tuple):
+        index = index,
+    result = []
+    for i in index:
+        if isinstance(i, _strtypes):
+            result.append(('s', i))
+        elif isinstance(i, slice):
+            result.append((':', (i.start, i.stop, i.step)))
+        elif isinstance(i, list):
+            result.append(('l', tuple(i)))
+        else:
+            try:
+                result.append(('i', operator.index(i)))
+            except TypeError:
+                raise NotImplementedError('Cannot index a datashape with %r'
+                                          % (i,))
+    return tuple(result)
+
+
+def _index(ds, key):
+    """ Apply a normalized index to ``ds``, one component at a time """
+    dims = []
+    for kind, value in key:
+        params = ds.parameters if isinstance(ds, DataShape) else (ds,)
+        head = params[0]
+        if isinstance(head, (Fixed, Var, Ellipsis)):
+            ds = DataShape(*params[1:])
+            if kind == ':':
+                dims.append(_slice_dim(head, value))
+            elif kind == 'l':
+                dims.append(Fixed(len(value)))
+            elif kind != 'i':
+                raise NotImplementedError('Cannot index dimension %s with %r'
+                                          % (head, value))
+        elif isinstance(head, Record) and len(params) == 1:
+            fields = head.fields
+            if kind == 's':
+                ds = head[value]
+            elif kind == 'i':
+                ds = fields[value][1]
+            elif kind == 'l':
+                names = head.names
+                ds = DataShape(Record([fields[names.index(i)
+                                             if isinstance(i, _strtypes)
+                                             else i]
+                                       for i in value]))
+            else:
+                ds = DataShape(Record(fields[slice(*value)]))
+        else:
+            raise NotImplementedError('Cannot index %s with %r' %
+                                      (ds, value))
+    if dims:
+        params = ds.parameters if isinstance(ds, DataShape) else (ds,)
+        return DataShape(*(dims + list(params)))
+    return ds
+
+
+def _slice_dim(dim, value):
+    """ The dimension resulting from slicing ``dim``
+
+    Slices of a dimension of unknown length with bounds of the same sign,
+    such as ``[2:10:2]`` or ``[-5:-2]``, are taken to fit within it, so
+    ``[2:10:2]`` of ``var`` has length 4 even though a shorter array would
+    give fewer elements.  Other slices of such a dimension are ``var``.
+
+    >>> _slice_dim(Fixed(10), (-3, None, None))
+    Fixed(3)
+    >>> _slice_dim(Fixed(10), (None, None, -4))
+    Fixed(3)
+    >>> _slice_dim(var, (2, 10, 2))
+    Fixed(4)
+    >>> _slice_dim(var, (-3, None, None))
+    Var()
+    """
+    if isinstance(dim, Fixed):
+        return Fixed(len(range(*slice(*value).indices(dim.val))))
+    start, stop, step = value
+    if step is None:
+        step = 1
+    if step == 0:
+        raise ValueError('slice step cannot be zero')
+    if start is None and step > 0:
+        start = 0
+    if start is None or stop is None or (start < 0) != (stop < 0):
+        return var
+    return Fixed(len(range(start, stop, step)))
+
+
 class NotNumpyCompatible(Exception):
     """
     Raised when we try to convert a datashape into a NumPy dtype
@@ -1086,12 +1242,17 @@ class NotNumpyCompatible(Exception):
     """
     pass
 
-def to_numpy_dtype(ds):
+def to_numpy_dtype(ds, option=None):
     """ Throw away the shape information and just return the
     measure as NumPy dtype instance."""
-    return to_numpy(ds.measure)[1]
+    return to_numpy(ds.measure, option)[1]
 
-def to_numpy(ds):
+
+# How ``to_numpy`` represents option types
+OPTION_STRATEGIES = 'sentinel', 'mask'
+
+
+def to_numpy(ds, option=None):
     """
     Downcast a datashape object into a Numpy (shape, dtype) tuple if
     possible.
@@ -1101,7 +1262,43 @@ def to_numpy(ds):
     ((5, 5), dtype('int32'))
     >>> to_numpy(dshape('10 * string[30]'))
     ((10,), dtype('<U30'))
+
+    Option types have no NumPy equivalent, and by default raise
+    ``NotNumpyCompatible``.  ``option`` chooses how to store them instead,
+    using the dtype of the underlying type:
+
+    ``'sentinel'``
+        Missing values are NaN or NaT, so only floating point, complex,
+        date, datetime and timedelta types may be optional.
+    ``'mask'``
+        Any type may be optional; which values are missing is recorded in
+        a separate boolean mask, as ``numpy.ma`` does.
+
+    >>> to_numpy(dshape('3 * {x: ?float64, t: ?datetime}'), 'sentinel')
+    ((3,), dtype([('x', '<f8'), ('t', '<M8[us]')]))
+    >>> to_numpy(dshape('?int32'), 'mask')
+    ((), dtype('int32'))
+    >>> to_numpy(dshape('?int32'), 'sentinel') # doctest: +IGNORE_EXCEPTION_DETAIL
+    Traceback (most recent call last):
+      ...
+    NotNumpyCompatible: int32 has no NaN or NaT for missing values, use option='mask'
     """
+    if option is None:
+        key = ds
+    elif option in OPTION_STRATEGIES:
+        key = ds, option
+    else:
+        raise ValueError('option must be one of %s, not %r' %
+                         (', '.join(map(repr, OPTION_STRATEGIES)), option))
+    result = _to_numpy_cache.get(key)
+    if result is None:
+        result = _to_numpy(ds, option)
+        _to_numpy_cache[key] = result
+    return result
+
+
+def _to_numpy(ds, option=None):
+    np = _numpy()
 
     shape = tuple()
     dtype = None
@@ -1125,17 +1322,45 @@ def to_numpy(ds):
     else:
         msr = ds
 
+    dtype = _measure_dtype(msr, option)
+
+    if not isinstance(dtype, np.dtype):
+        raise NotNumpyCompatible('Internal Error: Failed to produce NumPy dtype')
+    return (shape, dtype)
+
+
+def _measure_dtype(msr, option):
+    if isinstance(msr, Option):
+        if option is None:
+            raise NotNumpyCompatible('DataShape measure %s is not NumPy-compatible' % msr)
+        dtype = to_numpy(msr.ty, option)[1]
+        if option == 'sentinel' and (dtype.kind not in 'fcmM' or
+                                     dtype.fields):
+            raise NotNumpyCompatible('%s has no NaN or NaT for missing '
+                                     "values, use option='mask'" % msr.ty)
+        return dtype
+    if isinstance(msr, Record) and option is not None:
+        return _record_dtype(msr, option)
     try:
-        dtype = msr.to_numpy_dtype()
+        return msr.to_numpy_dtype()
     except AttributeError:
         raise NotNumpyCompatible('DataShape measure %s is not NumPy-compatible' % msr)
 
-    if type(dtype) != np.dtype:
-        raise NotNumpyCompatible('Internal Error: Failed to produce NumPy dtype')
-    return (shape, dtype)
 
+def _record_dtype(rec, option):
+    np = _numpy()
+    fields = []
+    for name, typ in rec.fields:
+        shape, dtype = to_numpy(typ, option)
+        if -1 in shape:
+            raise NotNumpyCompatible('Field %s of %s has a dimension of '
+                                     'unknown size' % (name, rec))
+        fields.append((str(name), dtype, shape) if shape
+                      else (str(name), dtype))
+    return np.dtype(fields)
 
-def from_numpy(shape, dt):
+
+def from_numpy(shape, dt, option=None):
     """
     Upcast a (shape, dtype) tuple if possible.
 
@@ -1146,19 +1371,57 @@ def from_numpy(shape, dt):
 
     >>> from_numpy((10,), dtype('S10'))
     dshape("10 * string[10, 'A']")
+
+    Nested structured dtypes become nested records, and subarray fields
+    get fixed dimensions.  A datashape has no padding, so the offsets of an
+    aligned dtype are recovered with ``memory_layout(ds)`` and those of a
+    packed one with ``memory_layout(ds, packed=True)``.  Other offsets and
+    itemsizes, as in a view of some of the fields of an array, are not
+    recorded; ``write_array`` stores such data packed.
+
+    >>> from_numpy((2,), dtype([('p', [('x', 'i4'), ('y', 'f8', (2, 3))])]))
+    dshape("2 * { p : { x : int32, y : 2 * 3 * float64 } }")
+
+    ``option`` is the inverse of the same argument to ``to_numpy``: with
+    ``'sentinel'`` the types that can hold NaN or NaT become option types,
+    with ``'mask'`` every scalar type does.
+
+    >>> from_numpy((10,), dtype([('x', 'f8'), ('n', 'i4')]), 'sentinel')
+    dshape("10 * { x : ?float64, n : int32 }")
+    >>> from_numpy((10,), dtype([('x', 'f8'), ('n', 'i4')]), 'mask')
+    dshape("10 * { x : ?float64, n : ?int32 }")
     """
+    np = _numpy()
     dtype = np.dtype(dt)
-
-    if dtype.kind == 'S':
-        measure = String(dtype.itemsize, 'A')
-    elif dtype.kind == 'U':
-        measure = String(dtype.itemsize // 4, 'U32')
-    elif dtype.fields:
+    if option is not None and option not in OPTION_STRATEGIES:
+        raise ValueError('option must be one of %s, not %r' %
+                         (', '.join(map(repr, OPTION_STRATEGIES)), option))
+    key = tuple(shape), dtype, option
+    result = _from_numpy_cache.get(key)
+    if result is None:
+        result = _from_numpy(key[0], dtype, option)
+        _from_numpy_cache[key] = result
+    return result
+
+
+def _from_numpy(shape, dtype, option=None):
+    if dtype.subdtype is not None:
+        base, inner = dtype.subdtype
+        return _from_numpy(shape + inner, base, option)
+    if dtype.fields:
         field_items = [(name, dtype.fields[name]) for name in dtype.names]
-        rec = [(a,CType.from_numpy_dtype(b[0])) for a,b in field_items]
+        rec = [(a, _from_numpy((), b[0], option)) for a, b in field_items]
         measure = Record(rec)
     else:
-        measure = CType.from_numpy_dtype(dtype)
+        if dtype.kind == 'S':
+            measure = String(dtype.itemsize, 'A')
+        elif dtype.kind == 'U':
+            measure = String(dtype.itemsize // 4, 'U32')
+        else:
+            measure = CType.from_numpy_dtype(dtype)
+        if option == 'mask' or (option == 'sentinel' and
+                                dtype.kind in 'fcmM'):
+            measure = Option(measure)
 
     if shape == ():
         return measure
@@ -1170,6 +1433,7 @@ def typeof(obj):
     """
     Return a datashape ctype for a python scalar.
     """
+    np = _numpy()
     if hasattr(obj, "dshape"):
         return obj.dshape
     elif isinstance(obj, np.ndarray):
@@ -1225,15 +1489,20 @@ def free(ds):
     """
     Return the free variables (TypeVar) of a datashape type (Mono).
     """
+    global _free
+    if _free is None:
+        from .traversal import Fold, parameters
+        _free = Fold(_combine_free, parameters, leaf=lambda x: ())
+    return list(_free(ds))
+
+
+_free = None
+
+
+def _combine_free(ds, results):
     if isinstance(ds, TypeVar):
-        return [ds]
-    elif isinstance(ds, Mono) and not isinstance(ds, Unit):
-        result = []
-        for x in ds.parameters:
-            result.extend(free(x))
-        return result
-    else:
-        return []
+        return ds,
+    return sum(results, ())
 
 
 def type_constructor(ds):
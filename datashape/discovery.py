@@ -1,5 +1,7 @@
 from __future__ import print_function, division, absolute_import
 
+import json
+import os
 import numpy as np
 from dateutil.parser import parse as dateparse
 from datetime import datetime, date, time
@@ -8,13 +10,15 @@ from .dispatch import dispatch
 from .coretypes import (int32, int64, float64, bool_, complex128, datetime_,
                         Option, var, from_numpy, Tuple, null,
                         Record, string, Null, DataShape, real, date_, time_,
-                        Unit)
+                        Unit, Fixed)
 from .predicates import isdimension
 from .py2help import _strtypes, _inttypes
-from .internal_utils import _toposort, groupby
+from .internal_utils import _toposort, groupby, LRUCache
+from . import profiling
 
 
-__all__ = ['discover']
+__all__ = ['discover', 'discover_jsonlines', 'enable_discover_cache',
+           'disable_discover_cache', 'discover_cache_info']
 
 
 @dispatch(_inttypes)
@@ -71,8 +75,44 @@ bools = {'False': False,
 string_coercions = [int, float, bools.__getitem__, dateparse]
 
 
-@dispatch(_strtypes)
-def discover(s):
+# Cache of discovered string values, see ``enable_discover_cache``
+_string_cache = None
+
+
+def enable_discover_cache(maxsize=4096):
+    """ Remember the dshapes of up to ``maxsize`` recently seen strings
+
+    Discovering a string tries each of ``string_coercions`` in turn,
+    including a full date parse.  Real data repeats values heavily, so
+    caching lets each distinct value be classified only once.  Other
+    scalars are discovered by their type alone and are not cached.
+
+    >>> enable_discover_cache(maxsize=100)
+    >>> discover('2014-01-01 12:00:00')
+    DateTime(None)
+    >>> discover('2014-01-01 12:00:00')
+    DateTime(None)
+    >>> discover_cache_info()
+    CacheInfo(hits=1, misses=1, maxsize=100, currsize=1)
+    >>> disable_discover_cache()
+    """
+    global _string_cache
+    _string_cache = LRUCache(maxsize)
+
+
+def disable_discover_cache():
+    """ Turn off and drop the cache enabled by ``enable_discover_cache`` """
+    global _string_cache
+    _string_cache = None
+
+
+def discover_cache_info():
+    """ Hit/miss statistics of the string cache, None if it is disabled """
+    if _string_cache is not None:
+        return _string_cache.info()
+
+
+def _discover_string(s):
     if not s:
         return null
     for f in string_coercions:
@@ -84,6 +124,44 @@ def discover(s):
     return string
 
 
+def _discover_cached_string(s):
+    cache = _string_cache
+    if cache is None:
+        return _discover_string(s)
+    result = cache.get(s)
+    if result is None:
+        result = cache[s] = _discover_string(s)
+    return result
+
+
+@dispatch(_strtypes)
+def discover(s):
+    return _discover_cached_string(s)
+
+
+# dshapes of builtin scalars, looked up by exact type to skip dispatch
+_scalar_dshapes = dict([(t, int64) for t in _inttypes] +
+                       [(float, float64), (bool, bool_),
+                        (complex, complex128), (type(None), null)])
+
+
+def _discover_item(x):
+    """ Discover an element of a container
+
+    Values whose type is exactly a builtin scalar type are answered from
+    ``_scalar_dshapes`` or the string path directly.  Everything else,
+    including subclasses of builtins, goes through ``discover`` so that
+    implementations registered with ``dispatch`` are still honored.
+    """
+    typ = type(x)
+    ds = _scalar_dshapes.get(typ)
+    if ds is not None:
+        return ds
+    if typ in _strtypes:
+        return _discover_cached_string(x)
+    return discover(x)
+
+
 @dispatch((tuple, list))
 def discover(seq):
     if not seq:
@@ -94,8 +172,9 @@ def discover(seq):
             len(set(map(len, seq))) == 1):
         columns = list(zip(*seq))
         try:
-            types = [unite([discover(data) for data in column]).subshape[0]
+            types = [unite([_discover_item(data) for data in column]).subshape[0]
                                            for column in columns]
+            profiling.count('discover.cells', len(seq) * len(columns))
             unite = do_one([unite_identical, unite_merge_dimensions, Tuple])
             return len(seq) * unite(types)
         except AttributeError:  # no subshape available
@@ -106,13 +185,15 @@ def discover(seq):
         keys = sorted(set.union(*(set(d) for d in seq)))
         columns = [[item.get(key) for item in seq] for key in keys]
         try:
-            types = [unite([discover(data) for data in column]).subshape[0]
+            types = [unite([_discover_item(data) for data in column]).subshape[0]
                                            for column in columns]
+            profiling.count('discover.cells', len(seq) * len(columns))
             return len(seq) * Record(list(zip(keys, types)))
         except AttributeError:
             pass
 
-    types = list(map(discover, seq))
+    profiling.count('discover.cells', len(seq))
+    types = list(map(_discover_item, seq))
     return do_one([unite_identical, unite_merge_dimensions, Tuple])(types)
 
 
@@ -201,8 +282,12 @@ def unite_identical(dshapes):
     >>> unite_identical([int32, int32, int32])
     dshape("3 * int32")
     """
-    if len(set(dshapes)) == 1:
-        return len(dshapes) * dshapes[0]
+    if not dshapes:
+        return None
+    first = dshapes[0]
+    # Discovered scalars are usually the same object, skip hashing them
+    if all(ds is first for ds in dshapes) or len(set(dshapes)) == 1:
+        return len(dshapes) * first
 
 
 
@@ -253,7 +338,8 @@ def unpack(ds):
 
 @dispatch(dict)
 def discover(d):
-    return Record([[k, discover(d[k])] for k in sorted(d)])
+    profiling.count('discover.cells', len(d))
+    return Record([[k, _discover_item(d[k])] for k in sorted(d)])
 
 
 @dispatch(np.number)
@@ -266,6 +352,182 @@ def discover(X):
     return from_numpy(X.shape, X.dtype)
 
 
+def merge(a, b):
+    """ Unite two discovered dshapes into one dshape that describes both
+
+    Unlike the ``unite_*`` functions this works pairwise, so a running
+    dshape can be refined one record at a time.
+
+    >>> print(merge(int64, float64))
+    float64
+    >>> print(merge(int64, null))
+    ?int64
+    >>> print(merge(3 * int64, 2 * int64))
+    var * int64
+    >>> print(merge(Record([['a', int64]]), Record([['b', string]])))
+    { a : ?int64, b : ?string }
+
+    An empty list, discovered as ``var * string``, takes the element type
+    of the other side, a mixed list (a ``Tuple``) unites with a list of
+    one type, and lists that may be missing get a ``var`` length:
+
+    >>> print(merge(discover([1]), discover([])))
+    var * int64
+    >>> print(merge(discover([1, 2]), discover([1, 'a'])))
+    2 * string
+    >>> print(merge(null, discover(['a'])))
+    ?var * string
+    """
+    a, b = unpack(a), unpack(b)
+    if a == b:
+        return a
+    if isnull(a):
+        return _optional(b)
+    if isnull(b):
+        return _optional(a)
+    if isinstance(a, Option) or isinstance(b, Option):
+        a = a.ty if isinstance(a, Option) else a
+        b = b.ty if isinstance(b, Option) else b
+        return _optional(unpack(merge(a, b)))
+    if a == _empty_list and _list_parts(b):
+        return var * _list_parts(b)[1]
+    if b == _empty_list and _list_parts(a):
+        return var * _list_parts(a)[1]
+    if isinstance(a, Record) and isinstance(b, Record):
+        ad, bd = a.dict, b.dict
+        names = sorted(set(ad) | set(bd))
+        return Record([[name, merge(ad.get(name, null), bd.get(name, null))]
+                       for name in names])
+    if (isinstance(a, Tuple) and isinstance(b, Tuple) and
+            len(a.dshapes) == len(b.dshapes)):
+        return Tuple([merge(x, y) for x, y in zip(a.dshapes, b.dshapes)])
+    la, lb = _list_parts(a), _list_parts(b)
+    if la and lb:
+        dim = la[0] if la[0] == lb[0] else var
+        return dim * merge(la[1], lb[1])
+    if isinstance(a, Unit) and isinstance(b, Unit):
+        return lowest_common_dshape([a, b])
+    raise ValueError("Can not unite dshapes %s and %s" % (a, b))
+
+
+# What ``discover`` makes of an empty list
+_empty_list = var * string
+
+
+def _list_parts(ds):
+    """ The dimension and element type of a discovered list, or ``None``
+
+    A ``Tuple``, discovered from a list of mixed types, is a list of the
+    union of its types.
+    """
+    if isinstance(ds, DataShape) and isdimension(ds[0]):
+        return ds[0], ds.subarray(1)
+    if isinstance(ds, Tuple) and ds.dshapes:
+        elem = ds.dshapes[0]
+        for t in ds.dshapes[1:]:
+            elem = merge(elem, t)
+        return Fixed(len(ds.dshapes)), elem
+    return None
+
+
+def _optional(ds):
+    """ ``?ds``, where a missing list may have any length """
+    if isinstance(ds, Option):
+        return ds
+    if isinstance(ds, DataShape) and isinstance(ds[0], Fixed):
+        ds = var * ds.subarray(1)
+    return Option(ds)
+
+
+def _discover_lines(lines, encoding):
+    """ Count and discover the JSON documents in an iterable of lines """
+    n, ds = 0, None
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode(encoding)
+        if not line.strip():
+            continue
+        item = discover(json.loads(line))
+        ds = item if ds is None else merge(ds, item)
+        n += 1
+    return n, ds
+
+
+def _iter_byte_range(f, start, stop):
+    """ Lines of binary file ``f`` that begin within ``[start, stop)`` """
+    if start:
+        # Step back one byte so a line starting exactly at ``start`` is kept
+        f.seek(start - 1)
+        f.readline()
+    else:
+        f.seek(0)
+    while f.tell() < stop:
+        line = f.readline()
+        if not line:
+            break
+        yield line
+
+
+def _discover_jsonlines_range(args):
+    path, start, stop, encoding = args
+    with open(path, 'rb') as f:
+        return _discover_lines(_iter_byte_range(f, start, stop), encoding)
+
+
+def discover_jsonlines(f, encoding='utf-8', processes=None):
+    """ Discover the dshape of a JSON Lines file
+
+    Documents are parsed one line at a time and united into a running
+    dshape, so memory use does not grow with the size of the file.
+
+    Parameters
+    ----------
+    f : str or file
+        A filename or an iterable of lines, e.g. an open file.
+    encoding : str, optional
+        Encoding used to decode lines given as bytes.
+    processes : int, optional
+        Split the file into this many byte ranges and discover them in a
+        pool of worker processes.  Only filenames can be split, so this
+        raises ``ValueError`` for other iterables.
+
+    >>> from io import StringIO
+    >>> f = StringIO(u'{"name": "Alice", "amount": 100}\\n'
+    ...              u'{"name": "Bob", "amount": null}\\n')
+    >>> print(discover_jsonlines(f))
+    2 * { amount : ?int64, name : string }
+    """
+    if not isinstance(f, _strtypes):
+        if processes not in (None, 1):
+            raise ValueError('processes=%r needs a filename, not %s' %
+                             (processes, type(f).__name__))
+        results = [_discover_lines(f, encoding)]
+    elif not processes or processes == 1:
+        results = [_discover_jsonlines_range((f, 0, os.path.getsize(f),
+                                              encoding))]
+    else:
+        from multiprocessing import Pool
+        size = os.path.getsize(f)
+        bounds = [size * i // processes for i in range(processes + 1)]
+        jobs = [(f, start, stop, encoding)
+                for start, stop in zip(bounds[:-1], bounds[1:])]
+        pool = Pool(processes)
+        try:
+            results = pool.map(_discover_jsonlines_range, jobs)
+        finally:
+            pool.close()
+            pool.join()
+
+    results = [(n, ds) for n, ds in results if n]
+    if not results:
+        return var * string
+    n, ds = results[0]
+    for m, other in results[1:]:
+        n += m
+        ds = merge(ds, other)
+    return n * ds
+
+
 def descendents(d, x):
     """
 
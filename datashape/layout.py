@@ -0,0 +1,252 @@
+"""
+Memory layout of fixed-size datashapes.
+
+A ``Layout`` records where each part of a datashape lives in a flat,
+C-contiguous buffer: the total itemsize and alignment, the shape and strides
+of its dimensions and the offset of every record or tuple field.  Layouts
+follow the rules of a C compiler (and of NumPy's ``align=True``), or pack
+fields back to back with ``packed=True``.
+"""
+
+from __future__ import print_function, division, absolute_import
+
+from .coretypes import (DataShape, CType, String, Date, DateTime, Record,
+                        Tuple, Fixed, Var, _numpy)
+from .internal_utils import LRUCache
+
+
+__all__ = ['Layout', 'memory_layout', 'buffer_view']
+
+
+# Bytes per character of fixed-length strings, matching String.to_numpy_dtype
+_string_widths = {'A': 1}
+
+
+class Layout(object):
+    """ The memory layout of a fixed-size datashape
+
+    Attributes
+    ----------
+
+    ds: Mono
+        The datashape described
+    itemsize: int
+        Size in bytes of one complete element, including trailing padding
+    alignment: int
+        Required alignment in bytes of the start of an element
+    shape: tuple of ints
+        The fixed dimensions, ``()`` for a bare measure
+    strides: tuple of ints
+        C-contiguous strides in bytes for ``shape``
+    fields: tuple of (name, offset, Layout) triples
+        The fields of a record or tuple measure, empty otherwise.  Tuple
+        fields are named ``'f0'``, ``'f1'``, ... as in NumPy.
+
+    >>> from datashape import dshape
+    >>> lay = memory_layout(dshape('{a: int8, b: float64, c: int16}'))
+    >>> lay.itemsize, lay.alignment
+    (24, 8)
+    >>> [(name, offset) for name, offset, _ in lay.fields]
+    [('a', 0), ('b', 8), ('c', 16)]
+    """
+    __slots__ = ('ds', 'itemsize', 'alignment', 'shape', 'strides', 'fields',
+                 'packed', '_dtype')
+
+    def __init__(self, ds, itemsize, alignment, shape=(), strides=(),
+                 fields=(), packed=False):
+        self.ds = ds
+        self.itemsize = itemsize
+        self.alignment = alignment
+        self.shape = shape
+        self.strides = strides
+        self.fields = fields
+        self.packed = packed
+        self._dtype = None
+
+    @property
+    def measure(self):
+        """ The layout of a single element of the measure """
+        if not self.shape:
+            return self
+        return memory_layout(self.ds.measure, self.packed)
+
+    def offset(self, *path):
+        """ Byte offset of a (nested) field from the start of an element
+
+        >>> from datashape import dshape
+        >>> ds = dshape('{a: int8, b: {x: int8, y: int32}}')
+        >>> memory_layout(ds).offset('b', 'y')
+        8
+        >>> memory_layout(ds, packed=True).offset('b', 'y')
+        2
+        """
+        lay, total = self.measure, 0
+        for name in path:
+            for fname, foffset, flayout in lay.fields:
+                if fname == name:
+                    break
+            else:
+                raise KeyError(name)
+            total += foffset
+            lay = flayout.measure
+        return total
+
+    def to_numpy_dtype(self):
+        """ A NumPy dtype with the same itemsize and field offsets
+
+        >>> from datashape import dshape
+        >>> dt = memory_layout(dshape('{a: int8, b: int32}')).to_numpy_dtype()
+        >>> dt.itemsize, dt.fields['b'][1]
+        (8, 4)
+        >>> memory_layout(dshape('2 * 3 * int16')).to_numpy_dtype()
+        dtype(('<i2', (2, 3)))
+        """
+        if self._dtype is None:
+            np = _numpy()
+            measure = self.measure
+            if measure.fields:
+                dtype = np.dtype({'names': [f[0] for f in measure.fields],
+                                  'formats': [f[2].to_numpy_dtype()
+                                              for f in measure.fields],
+                                  'offsets': [f[1] for f in measure.fields],
+                                  'itemsize': measure.itemsize},
+                                 align=not self.packed)
+            else:
+                dtype = self.ds.measure.to_numpy_dtype()
+            if self.shape:
+                dtype = np.dtype((dtype, self.shape))
+            self._dtype = dtype
+        return self._dtype
+
+    def __repr__(self):
+        return ('Layout(%s, itemsize=%d, alignment=%d, strides=%r)' %
+                (self.ds, self.itemsize, self.alignment, self.strides))
+
+
+_layouts = LRUCache(1024)
+
+
+def memory_layout(ds, packed=False):
+    """ Compute the memory layout of a fixed-size datashape
+
+    Fields are placed at the next multiple of their alignment and records
+    are padded to a multiple of their largest alignment, as a C compiler
+    would.  With ``packed=True`` every alignment is one and no padding is
+    inserted.  Results are cached per ``(ds, packed)``.
+
+    Raises ``TypeError`` for datashapes without a fixed size, such as those
+    with ``var`` dimensions, variable-length strings or option types.
+
+    >>> from datashape import dshape
+    >>> lay = memory_layout(dshape('3 * 4 * int32'))
+    >>> lay.itemsize, lay.shape, lay.strides
+    (48, (3, 4), (16, 4))
+    >>> memory_layout(dshape('(int8, float64)')).itemsize
+    16
+    >>> memory_layout(dshape('(int8, float64)'), packed=True).itemsize
+    9
+    >>> memory_layout(dshape('var * int32'))
+    Traceback (most recent call last):
+      ...
+    TypeError: Dimension var of var * int32 has no fixed size
+    """
+    key = ds, packed
+    result = _layouts.get(key)
+    if result is None:
+        result = _layout(ds, packed)
+        _layouts[key] = result
+    return result
+
+
+def _layout(ds, packed):
+    if isinstance(ds, DataShape):
+        if len(ds) == 1:
+            return memory_layout(ds.measure, packed)
+        measure = memory_layout(ds.measure, packed)
+        shape = []
+        for dim in ds.shape:
+            if not isinstance(dim, Fixed):
+                raise TypeError('Dimension %s of %s has no fixed size' %
+                                (dim, ds))
+            shape.append(dim.val)
+        strides = [measure.itemsize] * len(shape)
+        for i in range(len(shape) - 1, 0, -1):
+            strides[i - 1] = strides[i] * shape[i]
+        itemsize = strides[0] * shape[0] if shape else measure.itemsize
+        return Layout(ds, itemsize, measure.alignment, tuple(shape),
+                      tuple(strides), packed=packed)
+    if isinstance(ds, Record):
+        return _struct_layout(ds, ds.fields, packed)
+    if isinstance(ds, Tuple):
+        return _struct_layout(ds, [('f%d' % i, t)
+                                   for i, t in enumerate(ds.dshapes)], packed)
+    if isinstance(ds, CType) and ds.name not in ('void', 'object'):
+        return Layout(ds, ds.itemsize, 1 if packed else ds.c_alignment,
+                      packed=packed)
+    if isinstance(ds, String) and ds.fixlen is not None:
+        width = _string_widths.get(ds.encoding, 4)
+        return Layout(ds, ds.fixlen * width, 1 if packed else width,
+                      packed=packed)
+    if isinstance(ds, (Date, DateTime)):
+        return Layout(ds, 8, 1 if packed else 8, packed=packed)
+    raise TypeError('%s has no fixed-size memory layout' % (ds,))
+
+
+def _struct_layout(ds, fields, packed):
+    offset, alignment, result = 0, 1, []
+    for name, typ in fields:
+        lay = memory_layout(typ, packed)
+        offset = _round_up(offset, lay.alignment)
+        result.append((str(name), offset, lay))
+        offset += lay.itemsize
+        alignment = max(alignment, lay.alignment)
+    return Layout(ds, _round_up(offset, alignment), alignment,
+                  fields=tuple(result), packed=packed)
+
+
+def _round_up(n, alignment):
+    return -(-n // alignment) * alignment
+
+
+def buffer_view(ds, buf, offset=0, packed=False):
+    """ A zero-copy NumPy view of a buffer laid out as ``ds``
+
+    ``buf`` may be any object supporting the buffer protocol, such as
+    ``bytes``, ``bytearray``, ``memoryview`` or ``mmap``; the view is
+    writeable when the buffer is.  A leading ``var`` dimension takes its
+    length from the number of whole elements in the buffer after
+    ``offset``.
+
+    >>> from datashape import dshape
+    >>> import numpy as np
+    >>> buf = np.arange(6, dtype='int32').tobytes()
+    >>> buffer_view(dshape('2 * 3 * int32'), buf)
+    array([[0, 1, 2],
+           [3, 4, 5]], dtype=int32)
+    >>> buffer_view(dshape('var * {x: int32, y: int32}'), buf)['y']
+    array([1, 3, 5], dtype=int32)
+    """
+    np = _numpy()
+    if isinstance(ds, DataShape) and len(ds) > 1 and \
+            isinstance(ds[0], Var):
+        element = memory_layout(ds.subarray(1), packed)
+        nbytes = memoryview(buf).nbytes - offset
+        if element.itemsize == 0:
+            raise ValueError('Cannot infer the length of %s from a buffer' %
+                             ds)
+        count = nbytes // element.itemsize
+        if count * element.itemsize != nbytes:
+            raise ValueError('Buffer of %d bytes is not a whole number of '
+                             '%d-byte elements of %s' %
+                             (nbytes, element.itemsize, ds.subarray(1)))
+        shape = (count,) + element.shape
+    else:
+        element = memory_layout(ds, packed)
+        count = 1
+        shape = element.shape
+    measure = element.measure
+    for n in element.shape:
+        count *= n
+    result = np.frombuffer(buf, dtype=measure.to_numpy_dtype(), count=count,
+                           offset=offset)
+    return result.reshape(shape)
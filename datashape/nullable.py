@@ -0,0 +1,142 @@
+"""
+NumPy arrays for data with missing values.
+
+``to_numpy(ds, option)`` chooses dtypes for option types; this module fills
+arrays of those dtypes from Python data that uses ``None`` for missing
+values.  With the ``'sentinel'`` strategy missing values become NaN or NaT in
+a plain array.  With ``'mask'`` they also get a boolean mask of the same
+structure, as a ``numpy.ma.MaskedArray`` or a ``(values, mask)`` pair.
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import numpy as np
+
+from .coretypes import (DataShape, Option, Record, Var, to_numpy,
+                        OPTION_STRATEGIES)
+from .util import dshape
+
+
+__all__ = ['nullable_array']
+
+
+def nullable_array(data, ds, option='mask', masked=True):
+    """ Convert nested Python data with ``None`` for missing values
+
+    ``ds`` may have a leading ``var`` dimension, which takes the length of
+    ``data``; other dimensions must be fixed.  Records are given as dicts
+    or as sequences of field values.  A dict may leave out optional fields,
+    which are then missing.
+
+    >>> a = nullable_array([1, None, 3], 'var * ?int32')
+    >>> a.dtype, a.mask.tolist()
+    (dtype('int32'), [False, True, False])
+    >>> values, mask = nullable_array([{'x': 1.5, 'n': None}],
+    ...                               'var * {x: ?float64, n: ?int16}',
+    ...                               masked=False)
+    >>> mask.tolist()
+    [(False, True)]
+    >>> nullable_array([0.5, None], '2 * ?float64', option='sentinel')
+    array([0.5, nan])
+    """
+    if option not in OPTION_STRATEGIES:
+        raise ValueError('option must be one of %s, not %r' %
+                         (', '.join(map(repr, OPTION_STRATEGIES)), option))
+    ds = dshape(ds)
+    params = ds.parameters
+    if len(params) > 1 and isinstance(params[0], Var):
+        shape, dtype = to_numpy(DataShape(*params[1:]), option)
+        shape = (len(data),) + shape
+    else:
+        shape, dtype = to_numpy(ds, option)
+    convert = _converter(ds.measure, dtype)
+    pairs = [convert(x) for x in _flatten(data, len(shape))]
+    values, mask = _arrays(pairs, dtype, shape)
+    if option == 'sentinel':
+        return values
+    if masked:
+        return np.ma.MaskedArray(values, mask=mask)
+    return values, mask
+
+
+def _flatten(data, ndim):
+    if not ndim:
+        return [data]
+    rows = list(data)
+    for _ in range(ndim - 1):
+        rows = [x for row in rows for x in row]
+    return rows
+
+
+def _converter(measure, dtype):
+    """ A function from a Python value to a (value, mask) pair """
+    if isinstance(measure, DataShape):
+        if len(measure) > 1 and dtype.subdtype is not None:
+            return _subarray_converter(measure.measure, *dtype.subdtype)
+        measure = measure.measure
+    if isinstance(measure, Option):
+        convert = _converter(measure.ty, dtype)
+        missing = _missing(dtype)
+        return lambda x: missing if x is None else convert(x)
+    if isinstance(measure, Record) and dtype.names:
+        converters = [_converter(t, dtype.fields[name][0])
+                      for t, name in zip(measure.types, dtype.names)]
+        names = dtype.names
+        required = frozenset(name for name, t in measure.fields
+                             if not _is_option(t))
+
+        def convert_record(x):
+            if isinstance(x, dict):
+                missing = [name for name in names
+                           if name in required and name not in x]
+                if missing:
+                    raise ValueError('Record %r is missing required '
+                                     'fields %s' % (x, ', '.join(missing)))
+                x = [x.get(name) for name in names]
+            pairs = [f(v) for f, v in zip(converters, x)]
+            return tuple(v for v, _ in pairs), tuple(m for _, m in pairs)
+        return convert_record
+    return _present
+
+
+def _is_option(t):
+    if isinstance(t, DataShape) and len(t) == 1:
+        t = t.measure
+    return isinstance(t, Option)
+
+
+def _subarray_converter(measure, base, shape):
+    convert = _converter(measure, base)
+
+    def convert_subarray(x):
+        pairs = [convert(v) for v in _flatten(x, len(shape))]
+        return _arrays(pairs, base, shape)
+    return convert_subarray
+
+
+def _arrays(pairs, dtype, shape):
+    """ Values and mask arrays from a list of (value, mask) pairs """
+    values = np.array([v for v, _ in pairs], dtype=dtype).reshape(shape)
+    mask = np.array([m for _, m in pairs],
+                    dtype=np.ma.make_mask_descr(dtype)).reshape(shape)
+    return values, mask
+
+
+def _present(x):
+    return x, False
+
+
+def _missing(dtype):
+    """ The (value, mask) pair of a missing value of ``dtype`` """
+    if dtype.subdtype is not None:
+        base, shape = dtype.subdtype
+        count = int(np.prod(shape))
+        return _arrays([_missing(base)] * count, base, shape)
+    if dtype.names:
+        pairs = [_missing(dtype.fields[name][0]) for name in dtype.names]
+        return tuple(v for v, _ in pairs), tuple(m for _, m in pairs)
+    if dtype.kind in 'fc':
+        return dtype.type('nan'), True
+    if dtype.kind in 'mM':
+        return dtype.type('NaT'), True
+    return np.zeros((), dtype=dtype)[()], True
@@ -2,6 +2,7 @@ from __future__ import print_function, division, absolute_import
 
 from . import coretypes, util
 from .error import UnificationError, CoercionError, OverloadError
+from .profiling import timed
 from .type_equation_solver import (match_argtypes_to_signature,
                                    PrunedMatchProcessing)
 
@@ -58,6 +59,7 @@ class OverloadResolver(object):
         # TODO Create an accelerator data structure here
         pass
 
+    @timed('resolve_overload')
     def resolve_overload(self, argstype, resolver=None):
         """
         Given a tuple type representing input arguments, finds
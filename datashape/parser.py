@@ -5,6 +5,7 @@ Parser for the datashape grammar.
 from __future__ import absolute_import, division, print_function
 
 from . import lexer, error
+from .profiling import timed
 # TODO: Remove coretypes dependency, make 100% of interaction through
 #       the type symbol table
 from . import coretypes
@@ -560,6 +561,7 @@ class DataShapeParser(object):
             return tconstr(dshapes, ret_dshape)
 
 
+@timed('parse')
 def parse(ds_str, sym):
     """Parses a single datashape from a string.
 
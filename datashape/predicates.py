@@ -1,15 +1,168 @@
-from .util import collect, dshape
-from .internal_utils import remove
+from collections import namedtuple
+
+from .util import dshape
+from .internal_utils import LRUCache
+from .py2help import _strtypes
 from .coretypes import *
 
 # https://github.com/ContinuumIO/datashape/blob/master/docs/source/types.rst
 
 __all__ = ['isdimension', 'ishomogeneous', 'istabular', 'isfixed', 'isscalar',
         'isrecord', 'iscollection', 'isnumeric', 'isboolean', 'isdatelike',
-        'isreal']
+        'isreal', 'schema_facts', 'SchemaFacts']
 
 dimension_types = (Fixed, Var, Ellipsis, int)
 
+
+SchemaFacts = namedtuple('SchemaFacts', ['ndim', 'fixed', 'scalar', 'record',
+                                         'collection', 'numeric', 'real',
+                                         'boolean', 'datelike',
+                                         'homogeneous', 'tabular',
+                                         'var_dims'])
+
+_string_facts = LRUCache(4096)
+
+
+def schema_facts(ds):
+    """ The answers to all predicates for a datashape, computed at once
+
+    Facts are cached on the datashape object, or by string for datashapes
+    given as text, so evaluating many predicates over many schemas walks
+    each type only once.  ``ndim`` is ``None`` where ``_dimensions`` would
+    raise, and ``var_dims`` counts ``var`` dimensions at any depth.
+
+    >>> facts = schema_facts('var * {name: string, amount: ?int32}')
+    >>> facts.ndim, facts.fixed, facts.tabular, facts.numeric, facts.var_dims
+    (2, False, True, False, 1)
+    """
+    if isinstance(ds, _strtypes):
+        result = _string_facts.get(ds)
+        if result is None:
+            result = schema_facts(dshape(ds))
+            _string_facts[ds] = result
+        return result
+    if not isinstance(ds, Mono):
+        return _compute_facts(dshape(ds))
+    try:
+        return ds.__dict__['_facts']
+    except KeyError:
+        if isinstance(ds, DataShape) and len(ds.parameters) == 1:
+            # A bare measure wrapped by ``dshape`` has the facts of the measure
+            result = schema_facts(ds.measure)
+        else:
+            result = _compute_facts(ds)
+        ds.__dict__['_facts'] = result
+        return result
+
+
+def _compute_facts(ds):
+    params = ds.parameters if isinstance(ds, DataShape) else (ds,)
+    measure = params[-1]
+    base = measure.ty if isinstance(measure, Option) else measure
+    if len(params) == 1:
+        scalar = isinstance(base, Unit)
+        record = isinstance(base, Record)
+    else:
+        scalar = record = False
+    field_facts = ([schema_facts(t) for t in base.types]
+                   if isinstance(base, Record) else [])
+
+    # Dimensions, counting records as one more
+    ndim = 0
+    for dim in params[:-1]:
+        if not isinstance(dim, dimension_types):
+            ndim = None
+            break
+        ndim += 1
+    if ndim is not None:
+        if isinstance(base, Record):
+            if field_facts and None not in [f.ndim for f in field_facts]:
+                ndim += 1 + max(f.ndim for f in field_facts)
+            else:
+                ndim = None
+        elif not isinstance(base, Unit):
+            ndim = None
+
+    # Fixedness stops at the first unknown or var dimension
+    fixed = True
+    for p in params:
+        if isinstance(p, TypeVar):
+            fixed = None
+            break
+        if isinstance(p, Var):
+            fixed = False
+            break
+        if isinstance(p, Record):
+            fixed = all(f.fixed for f in field_facts)
+
+    var_dims = sum(isinstance(dim, Var) for dim in params[:-1]) + \
+        sum(f.var_dims for f in field_facts)
+
+    if len(params) > 1:
+        inner = params[1:]
+        tabular = ndim == 2 and \
+            schema_facts(inner[0] if len(inner) == 1
+                         else DataShape(*inner)).fixed
+    else:
+        tabular = False
+
+    return SchemaFacts(ndim=ndim,
+                       fixed=fixed,
+                       scalar=scalar,
+                       record=record,
+                       collection=isinstance(params[0], dimension_types),
+                       numeric=_isnumeric(base),
+                       real=isinstance(base, Unit) and 'float' in str(base),
+                       boolean=base == bool_,
+                       datelike=base == date_ or base == datetime_,
+                       homogeneous=len(set(_scalars(ds))) == 1,
+                       tabular=bool(tabular),
+                       var_dims=var_dims)
+
+
+def _isnumeric(ds):
+    """ Whether NumPy would consider ``ds`` a number, without NumPy
+
+    >>> _isnumeric(int32), _isnumeric(complex128), _isnumeric(bool_)
+    (True, True, False)
+    """
+    return isinstance(ds, CType) and ds.name.startswith(_numeric_prefixes)
+
+
+_numeric_prefixes = 'int', 'uint', 'float', 'complex'
+
+
+def _scalars(ds):
+    """ The scalar non-dimension types within ``ds``
+
+    >>> sorted(map(str, _scalars(dshape('{a: int32, b: 3 * ?string}'))))
+    ['?string', 'int32']
+    """
+    result = []
+    stack = [ds]
+    while stack:
+        x = stack.pop()
+        if _isunit(x):
+            if not isinstance(x, dimension_types):
+                result.append(x)
+        elif isinstance(x, Record):
+            stack.extend(x.types)
+        elif isinstance(x, Mono):
+            stack.extend(x.parameters)
+        elif isinstance(x, (list, tuple)):
+            stack.extend(x)
+    return result
+
+
+def _isunit(ds):
+    """ Whether ``ds`` is a unit type, possibly optional """
+    if isinstance(ds, DataShape) and len(ds) == 1:
+        ds = ds[0]
+    if isinstance(ds, Option):
+        ds = ds.ty
+    return isinstance(ds, Unit)
+
+
 def isscalar(ds):
     """ Is this dshape a single dtype?
 
@@ -20,13 +173,9 @@ def isscalar(ds):
     >>> isscalar('{name: string, amount: int}')
     False
     """
-    if isinstance(ds, str):
-        ds = dshape(ds)
-    if isinstance(ds, DataShape) and len(ds) == 1:
-        ds = ds[0]
-    if isinstance(ds, Option):
-        ds = ds.ty
-    return isinstance(ds, Unit)
+    if isinstance(ds, _strtypes + (Mono,)):
+        return schema_facts(ds).scalar
+    return False
 
 
 def isrecord(ds):
@@ -39,13 +188,9 @@ def isrecord(ds):
     >>> isrecord('?{name: string, amount: int}')
     True
     """
-    if isinstance(ds, str):
-        ds = dshape(ds)
-    if isinstance(ds, DataShape) and len(ds) == 1:
-        ds = ds[0]
-    if isinstance(ds, Option):
-        ds = ds.ty
-    return isinstance(ds, Record)
+    if isinstance(ds, _strtypes + (Mono,)):
+        return schema_facts(ds).record
+    return False
 
 
 def isdimension(ds):
@@ -71,8 +216,7 @@ def ishomogeneous(ds):
     >>> ishomogeneous('var * {name: string, amount: int}')
     False
     """
-    ds = dshape(ds)
-    return len(set(remove(isdimension, collect(isscalar, ds)))) == 1
+    return schema_facts(ds).homogeneous
 
 
 def _dimensions(ds):
@@ -89,20 +233,10 @@ def _dimensions(ds):
     >>> _dimensions('var * {name: string, amount: int}')
     2
     """
-    ds = dshape(ds)
-    if isinstance(ds, str):
-        ds = dshape(ds)
-    if isinstance(ds, DataShape) and len(ds) == 1:
-        ds = ds[0]
-    if isinstance(ds, Option):
-        return _dimensions(ds.ty)
-    if isinstance(ds, Record):
-        return 1 + max(map(_dimensions, ds.types))
-    if isinstance(ds, DataShape) and isdimension(ds[0]):
-        return 1 + _dimensions(ds.subshape[0])
-    if isscalar(ds):
-        return 0
-    raise NotImplementedError('Can not compute dimensions for %s' % ds)
+    result = schema_facts(ds).ndim
+    if result is None:
+        raise NotImplementedError('Can not compute dimensions for %s' % ds)
+    return result
 
 
 def isfixed(ds):
@@ -117,16 +251,7 @@ def isfixed(ds):
     >>> isfixed('10 * {name: string, amounts: var * int}')
     False
     """
-    ds = dshape(ds)
-    if isinstance(ds[0], TypeVar):
-        return None  # don't know
-    if isinstance(ds[0], Var):
-        return False
-    if isinstance(ds[0], Record):
-        return all(map(isfixed, ds[0].types))
-    if len(ds) > 1:
-        return isfixed(ds.subarray(1))
-    return True
+    return schema_facts(ds).fixed
 
 
 def istabular(ds):
@@ -141,8 +266,7 @@ def istabular(ds):
     >>> istabular('10 * var * int')
     False
     """
-    ds = dshape(ds)
-    return _dimensions(ds) == 2 and isfixed(ds.subarray(1))
+    return schema_facts(ds).tabular
 
 
 def iscollection(ds):
@@ -153,9 +277,7 @@ def iscollection(ds):
     >>> iscollection('int32')
     False
     """
-    if isinstance(ds, str):
-        ds = dshape(ds)
-    return isdimension(ds[0])
+    return schema_facts(ds).collection
 
 
 def isnumeric(ds):
@@ -170,13 +292,7 @@ def isnumeric(ds):
     >>> isnumeric('var * {amount: ?int32}')
     False
     """
-    if isinstance(ds, str):
-        ds = dshape(ds)
-    if isinstance(ds, DataShape):
-        ds = ds.measure
-    if isinstance(ds, Option):
-        ds = ds.ty
-    return isinstance(ds, Unit) and np.issubdtype(to_numpy_dtype(ds), np.number)
+    return schema_facts(ds).numeric
 
 
 def isreal(ds):
@@ -189,13 +305,7 @@ def isreal(ds):
     >>> isreal('string')
     False
     """
-    if isinstance(ds, str):
-        ds = dshape(ds)
-    if isinstance(ds, DataShape):
-        ds = ds.measure
-    if isinstance(ds, Option):
-        ds = ds.ty
-    return isinstance(ds, Unit) and 'float' in str(ds)
+    return schema_facts(ds).real
 
 
 def isboolean(ds):
@@ -208,13 +318,7 @@ def isboolean(ds):
     >>> isboolean('int')
     False
     """
-    if isinstance(ds, str):
-        ds = dshape(ds)
-    if isinstance(ds, DataShape):
-        ds = ds.measure
-    if isinstance(ds, Option):
-        ds = ds.ty
-    return ds == bool_
+    return schema_facts(ds).boolean
 
 
 def isdatelike(ds):
@@ -227,10 +331,4 @@ def isdatelike(ds):
     >>> isdatelike('?datetime')
     True
     """
-    if isinstance(ds, str):
-        ds = dshape(ds)
-    if isinstance(ds, DataShape):
-        ds = ds.measure
-    if isinstance(ds, Option):
-        ds = ds.ty
-    return ds in (date_, datetime_)
+    return schema_facts(ds).datelike
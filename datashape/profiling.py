@@ -0,0 +1,119 @@
+"""
+Opt-in counters and timers for the hot paths of datashape.
+
+Instrumentation is off by default, in which case an instrumented call
+costs one extra function call and a flag check.
+
+>>> import datashape
+>>> with collect_stats():
+...     ds = datashape.dshape('var * {name: string, amount: int32}')
+>>> stats()['parse'].count
+1
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import threading
+import time
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
+from functools import wraps
+
+__all__ = ['stats', 'reset_stats', 'enable_stats', 'disable_stats',
+           'collect_stats']
+
+
+Stat = namedtuple('Stat', ['count', 'time'])
+
+try:
+    _clock = time.perf_counter
+except AttributeError:  # Python 2
+    _clock = time.time
+
+enabled = False
+_counts = defaultdict(int)
+_times = defaultdict(float)
+_lock = threading.Lock()
+# Per-thread nesting depth of timed functions, so that recursive calls are
+# only timed once
+_local = threading.local()
+
+
+def enable_stats():
+    """ Start counting and timing instrumented calls """
+    global enabled
+    enabled = True
+
+
+def disable_stats():
+    """ Stop counting and timing instrumented calls """
+    global enabled
+    enabled = False
+
+
+def reset_stats():
+    """ Zero all counters and timers """
+    with _lock:
+        _counts.clear()
+        _times.clear()
+
+
+def stats():
+    """ A snapshot of the counters and cumulative timers
+
+    Returns a dict mapping names to ``Stat(count, time)``, with time in
+    seconds.  Plain counters have a time of zero.
+    """
+    with _lock:
+        return dict((name, Stat(count, _times.get(name, 0.0)))
+                    for name, count in _counts.items())
+
+
+@contextmanager
+def collect_stats(reset=True):
+    """ Enable instrumentation for the duration of a with block
+
+    Statistics remain available from ``stats`` after the block exits.
+    """
+    global enabled
+    if reset:
+        reset_stats()
+    previous = enabled
+    enabled = True
+    try:
+        yield
+    finally:
+        enabled = previous
+
+
+def count(name, n=1):
+    """ Add ``n`` to the counter ``name`` if instrumentation is enabled """
+    if enabled:
+        with _lock:
+            _counts[name] += n
+
+
+def timed(name):
+    """ Decorator counting calls of a function and their cumulative time """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            depth = getattr(_local, 'depth', None)
+            if depth is None:
+                depth = _local.depth = defaultdict(int)
+            outermost = not depth[name]
+            depth[name] += 1
+            start = _clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = _clock() - start
+                depth[name] -= 1
+                with _lock:
+                    _counts[name] += 1
+                    if outermost:
+                        _times[name] += elapsed
+        return wrapper
+    return decorator
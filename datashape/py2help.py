@@ -40,11 +40,25 @@ else:
     basestring = str
     _strtypes = (str,)
 
-try:
-    import pytest
 
-    xfail = pytest.mark.xfail
-    skipif = pytest.mark.skipif
-    raises = pytest.raises
-except ImportError:
-    pass
+if sys.version_info < (3, 7):
+    # Module __getattr__ (PEP 562) is new in Python 3.7
+    try:
+        import pytest
+
+        xfail = pytest.mark.xfail
+        skipif = pytest.mark.skipif
+        raises = pytest.raises
+    except ImportError:
+        pass
+else:
+    def __getattr__(name):
+        # The pytest helpers are imported on first use, importing pytest
+        # along with datashape would dominate its import time
+        if name in ('xfail', 'skipif', 'raises'):
+            import pytest
+            return {'xfail': pytest.mark.xfail,
+                    'skipif': pytest.mark.skipif,
+                    'raises': pytest.raises}[name]
+        raise AttributeError("module %r has no attribute %r" %
+                             (__name__, name))
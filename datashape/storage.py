@@ -0,0 +1,191 @@
+"""
+A minimal on-disk format for typed arrays.
+
+A file holds an 8-byte magic string, the length of the header as a
+little-endian uint32, and a UTF-8 datashape header padded with spaces to a
+multiple of 64 bytes.  The raw C-contiguous data follows, laid out as
+``to_numpy`` of that datashape describes.  Files whose datashape starts with
+``var`` take their length from the file size and can be appended to.
+
+Data is always stored little-endian, whatever the byte order of the machine
+or of the array written, so files can be shared between machines.
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import os
+import struct
+
+import numpy as np
+
+from .coretypes import DataShape, Var, var, from_numpy, to_numpy
+from .error import DataShapeSyntaxError
+from .layout import memory_layout
+from .util import dshape
+
+
+__all__ = ['write_array', 'open_array', 'append_array', 'read_dshape']
+
+
+MAGIC = b'\x93DSHAPE\x01'
+ALIGNMENT = 64
+MODES = ('r', 'r+', 'c')
+
+_prefix = struct.Struct('<8sI')
+
+
+def write_array(filename, data, var_length=False):
+    """ Write an array to ``filename`` with its datashape as the header
+
+    With ``var_length=True`` the leading dimension is stored as ``var`` so
+    that more rows can be added with ``append_array``.  Returns the
+    datashape written.  Raises ``ValueError``, before writing anything, for
+    data that the header cannot describe exactly, such as Python objects or
+    datetimes with units other than days and microseconds.
+
+    >>> import os, tempfile
+    >>> fn = os.path.join(tempfile.mkdtemp(), 'points.dshape')
+    >>> write_array(fn, np.zeros(3, dtype=[('x', 'f8'), ('y', 'f8')]))
+    dshape("3 * { x : float64, y : float64 }")
+    >>> open_array(fn).shape
+    (3,)
+    """
+    data = np.asarray(data)
+    ds = from_numpy(data.shape, data.dtype)
+    if var_length:
+        if not data.ndim:
+            raise ValueError('A scalar has no leading dimension to make var')
+        ds = DataShape(var, *ds.parameters[1:])
+    dtype = _stored_dtype(ds, data.dtype)
+    header = str(ds).encode('utf-8')
+    total = _round_up(_prefix.size + len(header) + 1, ALIGNMENT)
+    header += b' ' * (total - _prefix.size - len(header) - 1) + b'\n'
+    with open(filename, 'wb') as f:
+        f.write(_prefix.pack(MAGIC, len(header)))
+        f.write(header)
+        f.write(np.ascontiguousarray(data, dtype=dtype).tobytes())
+    return ds
+
+
+def read_dshape(filename):
+    """ The datashape of a file and the offset of its data
+
+    >>> import os, tempfile
+    >>> fn = os.path.join(tempfile.mkdtemp(), 'data.dshape')
+    >>> _ = write_array(fn, np.arange(10), var_length=True)
+    >>> read_dshape(fn)
+    (dshape("var * int64"), 64)
+    """
+    with open(filename, 'rb') as f:
+        prefix = f.read(_prefix.size)
+        if len(prefix) < _prefix.size:
+            raise ValueError('%s is not a datashape array file' % filename)
+        magic, length = _prefix.unpack(prefix)
+        if magic != MAGIC:
+            raise ValueError('%s is not a datashape array file' % filename)
+        header = f.read(length)
+    return dshape(header.decode('utf-8').strip()), _prefix.size + length
+
+
+def open_array(filename, mode='r'):
+    """ Memory-map a file written by ``write_array``
+
+    ``mode`` is passed to ``numpy.memmap``: ``'r'`` for read-only, ``'r+'``
+    to write through to the file and ``'c'`` for copy-on-write.  The modes
+    of ``numpy.memmap`` that create the file would overwrite the header, so
+    they are refused.
+    """
+    if mode not in MODES:
+        raise ValueError('mode must be one of %s, not %r' %
+                         (', '.join(map(repr, MODES)), mode))
+    ds, offset = read_dshape(filename)
+    if _has_var_length(ds):
+        shape, dtype = _to_numpy(ds.subarray(1))
+        rowsize = dtype.itemsize * int(np.prod(shape))
+        nbytes = os.path.getsize(filename) - offset
+        if rowsize and nbytes % rowsize:
+            raise ValueError('%s holds a partial row of %s' %
+                             (filename, ds.subarray(1)))
+        shape = (nbytes // rowsize if rowsize else 0,) + shape
+    else:
+        shape, dtype = _to_numpy(ds)
+    if not dtype.itemsize * int(np.prod(shape)):
+        # Zero-length mappings are not allowed
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(filename, dtype=dtype, mode=mode, offset=offset,
+                     shape=shape)
+
+
+def append_array(filename, data):
+    """ Append rows to a file whose leading dimension is ``var``
+
+    ``data`` is converted to the dtype of the file, which must be possible
+    without changing the kind of its values, so integers can be appended to
+    a file of floats but not floats to a file of integers.  Returns the new
+    number of rows.
+
+    >>> import os, tempfile
+    >>> fn = os.path.join(tempfile.mkdtemp(), 'data.dshape')
+    >>> _ = write_array(fn, np.arange(3), var_length=True)
+    >>> append_array(fn, np.arange(3, 5))
+    5
+    >>> open_array(fn)
+    memmap([0, 1, 2, 3, 4])
+    """
+    ds, offset = read_dshape(filename)
+    if not _has_var_length(ds):
+        raise ValueError('Can only append to files with a leading var '
+                         'dimension, not %s' % ds)
+    shape, dtype = _to_numpy(ds.subarray(1))
+    data = np.asarray(data)
+    if data.shape[1:] != shape:
+        raise ValueError('Cannot append data of shape %s to %s' %
+                         (data.shape, ds))
+    if not np.can_cast(data.dtype, dtype, 'same_kind'):
+        raise ValueError('Cannot append data of dtype %s to %s' %
+                         (data.dtype, ds))
+    with open(filename, 'ab') as f:
+        f.write(np.ascontiguousarray(data, dtype=dtype).tobytes())
+        end = f.tell()
+    rowsize = dtype.itemsize * int(np.prod(shape))
+    return (end - offset) // rowsize if rowsize else 0
+
+
+def _stored_dtype(ds, dtype):
+    """ The dtype in which ``ds`` is stored, checking that it holds ``dtype``
+
+    The header must parse back to ``ds``, which must have a fixed-size
+    layout, and ``dtype`` may differ from the stored dtype only in byte
+    order and padding.
+    """
+    try:
+        same = dshape(str(ds)) == ds
+    except DataShapeSyntaxError:
+        same = False
+    if not same:
+        raise ValueError('Cannot store data of dtype %s, its datashape %s '
+                         'does not read back' % (dtype, ds))
+    try:
+        memory_layout(ds.measure)
+    except TypeError as e:
+        raise ValueError('Cannot store data of dtype %s: %s' % (dtype, e))
+    _, stored = _to_numpy(ds.measure)
+    if not np.can_cast(dtype, stored, 'equiv'):
+        raise ValueError('Cannot store data of dtype %s, %s reads back as %s'
+                         % (dtype, ds, stored))
+    return stored
+
+
+def _to_numpy(ds):
+    """ Like ``to_numpy`` but with the little-endian dtype stored on disk """
+    shape, dtype = to_numpy(ds)
+    return shape, dtype.newbyteorder('<')
+
+
+def _has_var_length(ds):
+    return isinstance(ds, DataShape) and len(ds) > 1 and \
+        isinstance(ds[0], Var)
+
+
+def _round_up(n, alignment):
+    return -(-n // alignment) * alignment
@@ -3,6 +3,7 @@ from __future__ import absolute_import, division, print_function
 import unittest
 
 from datashape import coercion_cost, dshape, dshapes, error
+from datashape import coercion, coretypes
 from datashape.tests import common
 from datashape.py2help import xfail
 
@@ -109,5 +110,48 @@ class TestCoercionErrors(unittest.TestCase):
                               dshape('bool'), dshape(ds))
 
 
+class TestDefaultCoercionTable(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = coercion._table
+
+    def tearDown(self):
+        coercion._table = self.saved
+
+    def test_built_once_on_first_lookup(self):
+        import threading
+        builds = []
+        add_default_rules = coercion._add_default_rules
+        def counting_add_default_rules(table):
+            builds.append(table)
+            add_default_rules(table)
+
+        coercion._table = None
+        coercion._add_default_rules = counting_add_default_rules
+        try:
+            results = []
+            def lookup():
+                results.append(coercion.coercion_cost_table(
+                    coretypes.int8, coretypes.int64))
+            threads = [threading.Thread(target=lookup) for i in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            coercion._add_default_rules = add_default_rules
+        self.assertEqual(len(builds), 1)
+        self.assertEqual(results, [3] * 8)
+        self.assertEqual(coercion._table.table, self.saved.table)
+
+    def test_add_coercion_keeps_default_rules(self):
+        coercion._table = None
+        coercion.add_coercion(coretypes.bool_, coretypes.int8, 2)
+        self.assertEqual(coercion.coercion_cost_table(coretypes.bool_,
+                                                      coretypes.int16), 3)
+        self.assertEqual(coercion.coercion_cost_table(coretypes.int8,
+                                                      coretypes.int16), 1)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,120 @@
+import json
+
+import numpy as np
+import pytest
+
+from datashape import (dshape, to_arrow_schema, from_arrow_schema,
+                       column_layout, allocate_columns, DataShape, Record,
+                       Option, var, bytes_)
+from datashape.columnar import Buffer, ALIGNMENT
+
+
+tables = ['var * {a: int8, b: ?uint64, c: float32, d: ?bool}',
+          'var * {name: ?string, code: string[4, "A"]}',
+          'var * {day: ?date, when: datetime, at: time, '
+          "utc: datetime[tz='UTC']}",
+          'var * {tags: var * string, m: ?var * ?float64, p: 3 * int16}',
+          'var * {pos: ?{x: float64, y: float64, ids: var * {k: int32}}}',
+          'var * {grid: var * var * int32, m: 2 * 3 * ?float32, '
+          'n: var * 2 * ?var * string}']
+
+
+@pytest.mark.parametrize('ds', tables)
+def test_round_trip(ds):
+    ds = dshape(ds)
+    schema = to_arrow_schema(ds)
+    assert json.loads(json.dumps(schema)) == schema
+    assert from_arrow_schema(schema) == ds
+
+
+def test_bytes():
+    ds = DataShape(var, Record([('raw', Option(bytes_))]))
+    schema = to_arrow_schema(ds)
+    assert schema['fields'][0]['type'] == {'name': 'binary'}
+    assert from_arrow_schema(schema) == ds
+
+
+def test_schema():
+    schema = to_arrow_schema('10 * {a: ?float64, b: var * int32}')
+    a, b = schema['fields']
+    assert a == {'name': 'a', 'nullable': True, 'children': [],
+                 'type': {'name': 'floatingpoint', 'precision': 'DOUBLE'}}
+    assert b['type'] == {'name': 'list'}
+    assert b['children'][0]['type'] == {'name': 'int', 'isSigned': True,
+                                        'bitWidth': 32}
+
+
+@pytest.mark.parametrize('ds', ['int32', '10 * int32', 'var * var * int32',
+                                'var * {a: complex128}', 'var * {a: json}',
+                                'var * {a: T}', 'var * {a: (int32, int8)}'])
+def test_not_convertible(ds):
+    with pytest.raises(TypeError):
+        to_arrow_schema(ds)
+
+
+def test_unknown_arrow_type():
+    with pytest.raises(TypeError):
+        from_arrow_schema({'fields': [{'name': 'a', 'nullable': False,
+                                       'type': {'name': 'decimal'}}]})
+
+
+def test_column_layout():
+    cols = column_layout('var * {a: ?int16, b: bool, s: string, '
+                         'f: 2 * ?float32, r: {x: int8}}')
+    assert [c.name for c in cols] == ['a', 'b', 's', 'f', 'r']
+    a, b, s, f, r = cols
+    assert a.nullable and a.buffers == (Buffer('validity', 1),
+                                        Buffer('data', 16))
+    assert b.buffers == (Buffer('data', 1),)
+    assert s.buffers == (Buffer('offsets', 32), Buffer('data', 8))
+    assert f.buffers == () and f.children[0].nullable
+    assert f.children[0].buffers == (Buffer('validity', 1),
+                                     Buffer('data', 32))
+    assert r.buffers == () and r.children[0].type == dshape('int8').measure
+    assert column_layout('var * {a: ?int16, b: bool, s: string, '
+                         'f: 2 * ?float32, r: {x: int8}}') is cols
+
+
+def test_allocate_columns():
+    cols = allocate_columns('var * {a: ?int16, b: bool, s: string, '
+                            'f: 2 * ?float32, l: var * int64}', 100,
+                            var_length=3)
+    assert cols['a']['data'].dtype == np.int16
+    assert len(cols['a']['data']) == 128
+    assert len(cols['a']['validity']) == ALIGNMENT
+    assert len(cols['b']['data']) == ALIGNMENT
+    assert cols['s']['offsets'].dtype == np.int32
+    assert len(cols['s']['offsets']) >= 101
+    assert len(cols['s']['data']) == 320
+    item = cols['f']['children'][0]
+    assert item['data'].dtype == np.float32 and len(item['data']) >= 200
+    assert len(cols['l']['children'][0]['data']) >= 300
+    for col in cols.values():
+        for name, buf in col.items():
+            if name != 'children':
+                assert buf.nbytes % ALIGNMENT == 0
+                assert not buf.any()
+
+
+def test_pyarrow_round_trip():
+    pa = pytest.importorskip('pyarrow')
+    from datashape import to_pyarrow_schema, from_pyarrow_schema
+    for ds in tables:
+        schema = to_pyarrow_schema(ds)
+        assert isinstance(schema, pa.Schema)
+        assert from_pyarrow_schema(schema) == dshape(ds)
+
+
+def test_pyarrow_nested_lists():
+    pa = pytest.importorskip('pyarrow')
+    from datashape import from_pyarrow_schema
+
+    def item(typ):
+        return pa.field('item', typ, nullable=False)
+    schema = pa.schema([
+        pa.field('grid', pa.list_(item(pa.list_(item(pa.int32())))),
+                 nullable=False),
+        pa.field('m', pa.list_(item(pa.list_(item(pa.float32()), 3)), 2),
+                 nullable=False)])
+    assert from_pyarrow_schema(schema) == \
+        dshape('var * {grid: var * var * int32, m: 2 * 3 * float32}')
@@ -5,8 +5,9 @@ import pytest
 import unittest
 
 from datashape.coretypes import (Record, real, String, CType, DataShape, int32,
-        Fixed, Option)
-from datashape import dshape, to_numpy_dtype, from_numpy, error
+        Fixed, Option, NotNumpyCompatible)
+from datashape import (dshape, to_numpy_dtype, to_numpy, from_numpy, error,
+                       memory_layout, discover)
 from datashape.py2help import unicode
 
 
@@ -50,6 +51,57 @@ class TestToNumpyDtype(object):
     def test_dimensions(self):
         return to_numpy_dtype(dshape('var * int32')) == np.int32
 
+    def test_complex(self):
+        assert to_numpy_dtype(dshape('complex[float32]')) == np.complex64
+        assert to_numpy_dtype(dshape('complex[float64]')) == np.complex128
+
+    def test_cached(self):
+        ds = dshape('10 * {x: int32, y: float64}')
+        assert to_numpy(ds) is to_numpy(ds)
+        assert to_numpy(ds) is to_numpy(dshape('10 * {x: int32, y: float64}'))
+        assert ds.measure.to_numpy_dtype() is to_numpy_dtype(ds)
+
+    def test_not_compatible_is_not_cached(self):
+        ds = dshape('var * int32')
+        for i in range(2):
+            with pytest.raises(NotNumpyCompatible):
+                to_numpy(ds)
+
+    def test_nested_records_and_subarrays(self):
+        ds = dshape('{a: int8, b: {x: int16, y: 2 * 3 * float64}, '
+                    'c: 4 * {z: bool}}')
+        assert ds.measure.to_numpy_dtype() == np.dtype(
+            [('a', 'i1'), ('b', [('x', 'i2'), ('y', 'f8', (2, 3))]),
+             ('c', [('z', '?')], (4,))])
+        with pytest.raises(NotNumpyCompatible):
+            to_numpy(dshape('{a: N * int32}'))
+        with pytest.raises(NotNumpyCompatible):
+            to_numpy(dshape('{a: var * int32}'))
+
+    def test_option_is_not_compatible_by_default(self):
+        with pytest.raises(NotNumpyCompatible):
+            to_numpy(dshape('3 * ?int32'))
+        with pytest.raises(ValueError):
+            to_numpy(dshape('3 * ?int32'), 'nan')
+
+    def test_option_sentinel(self):
+        assert to_numpy(dshape('3 * ?float32'), 'sentinel') == \
+            ((3,), np.dtype('f4'))
+        assert to_numpy(dshape('?date'), 'sentinel') == ((), np.dtype('M8[D]'))
+        assert to_numpy(dshape('{a: ?complex128, b: int8, c: {d: ?datetime}}'),
+                        'sentinel') == \
+            ((), np.dtype([('a', 'c16'), ('b', 'i1'),
+                           ('c', [('d', 'M8[us]')])]))
+        for ds in ['?int32', '?bool', '?string[3]', '?{a: float64}']:
+            with pytest.raises(NotNumpyCompatible):
+                to_numpy(dshape(ds), 'sentinel')
+
+    def test_option_mask(self):
+        assert to_numpy(dshape('2 * {a: ?int32, b: ?{c: ?bool}}'), 'mask') == \
+            ((2,), np.dtype([('a', 'i4'), ('b', [('c', '?')])]))
+        ds = dshape('{a: ?int32}')
+        assert to_numpy(ds, 'mask') is to_numpy(ds, 'mask')
+
 
 class TestFromNumPyDtype(object):
 
@@ -81,6 +133,49 @@ class TestFromNumPyDtype(object):
         assert (from_numpy((2,), np.dtype('U7')) ==
                 dshape('2 * string[7, "U32"]'))
 
+    def test_cached(self):
+        dtype = np.dtype([('x', '<i4'), ('y', '<i4')])
+        assert from_numpy((2,), dtype) is from_numpy([2], dtype)
+        assert from_numpy((3,), dtype) == dshape('3 * {x: int32, y: int32}')
+        assert from_numpy((2,), 'int64') != from_numpy((2,), 'int32')
+
+    @pytest.mark.parametrize('align', [False, True])
+    def test_nested_records_and_subarrays(self, align):
+        dtype = np.dtype([('a', 'i1'),
+                          ('b', [('x', 'i2'), ('y', 'f8', (2, 3))]),
+                          ('c', [('z', '?'), ('w', 'S3')], (4,))],
+                         align=align)
+        ds = from_numpy((5,), dtype)
+        assert ds == dshape("5 * {a: int8, b: {x: int16, y: 2 * 3 * float64}, "
+                            "c: 4 * {z: bool, w: string[3, 'A']}}")
+        lay = memory_layout(ds.measure, packed=not align)
+        assert lay.to_numpy_dtype() == dtype
+        if not align:
+            assert to_numpy(ds) == ((5,), dtype)
+
+    def test_other_layouts_are_described(self):
+        padded = np.dtype({'names': ['a'], 'formats': ['i4'], 'itemsize': 8})
+        assert from_numpy((2,), padded) == dshape('2 * {a: int32}')
+        data = np.zeros(3, dtype=[('a', 'i4'), ('b', 'f8'), ('c', 'i2')])
+        view = data[['a', 'c']]
+        assert from_numpy(view.shape, view.dtype) == \
+            dshape('3 * {a: int32, c: int16}')
+        assert discover(view) == dshape('3 * {a: int32, c: int16}')
+
+    def test_subarray_dtype(self):
+        assert from_numpy((5,), np.dtype(('i4', (2, 3)))) == \
+            dshape('5 * 2 * 3 * int32')
+
+    def test_option(self):
+        dtype = np.dtype([('x', 'f8'), ('n', 'i4'), ('p', [('t', 'M8[s]')])])
+        assert from_numpy((2,), dtype, 'sentinel') == \
+            dshape('2 * {x: ?float64, n: int32, p: {t: ?datetime}}')
+        assert from_numpy((2,), dtype, 'mask') == \
+            dshape('2 * {x: ?float64, n: ?int32, p: {t: ?datetime}}')
+        assert from_numpy((), 'i8', 'mask') == dshape('?int64').measure
+        with pytest.raises(ValueError):
+            from_numpy((), 'i8', 'nan')
+
     def test_string_from_CType_classmethod(self):
         assert CType.from_numpy_dtype(np.dtype('S7')) == String(7, 'A')
 
@@ -107,6 +202,68 @@ def test_subshape():
     assert ds.subshape[::2] == dshape('3 * 3 * float32')
 
 
+@pytest.mark.parametrize(('index', 'expected'), [
+    (slice(-3, None), '3 * 4 * int32'),
+    (slice(None, -3), '7 * 4 * int32'),
+    (slice(-3, -1), '2 * 4 * int32'),
+    (slice(None, None, -1), '10 * 4 * int32'),
+    (slice(8, 2, -2), '3 * 4 * int32'),
+    (slice(-100, 100), '10 * 4 * int32'),
+    (slice(5, 2), '0 * 4 * int32'),
+    ((-1, slice(None, None, 3)), '2 * int32'),
+    ((slice(1, 3), -1), '2 * int32'),
+    (([0, -1], [1, 2, 3]), '2 * 3 * int32')])
+def test_subshape_fixed_slices(index, expected):
+    ds = dshape('10 * 4 * int32')
+    assert ds.subshape[index] == dshape(expected)
+    assert ds.indexer(index) == dshape(expected)
+
+
+@pytest.mark.parametrize(('index', 'expected'), [
+    (slice(2, 7), '5 * int32'),
+    (slice(None, 7, 2), '4 * int32'),
+    (slice(-5, -2), '3 * int32'),
+    (slice(-5, None), 'var * int32'),
+    (slice(2, None), 'var * int32'),
+    (slice(None, -2), 'var * int32'),
+    (slice(None, None, -1), 'var * int32'),
+    (slice(2, -2), 'var * int32')])
+def test_subshape_var_slices(index, expected):
+    assert dshape('var * int32').subshape[index] == dshape(expected)
+
+
+def test_indexer_fields():
+    ds = dshape('var * {a: int32, b: 2 * {c: float64, d: string}}')
+    assert ds.indexer((0, 'b', 1, 'd')) == dshape('string').measure
+    assert ds.indexer((slice(0, 5), -1, slice(None), 'c')) == \
+        dshape('5 * 2 * float64')
+    assert ds.indexer((0, ['b', 0])) == dshape('{b: 2 * {c: float64, '
+                                               'd: string}, a: int32}')
+    assert ds.indexer((0, slice(-1, None))) == \
+        dshape('{b: 2 * {c: float64, d: string}}')
+    assert ds.indexer((0, np.int64(-2))) == dshape('int32').measure
+
+
+def test_indexer_is_cached():
+    ds = dshape('10 * var * {x: int32, y: float64}')
+    a = ds.indexer((slice(2, 5), 0, ['x']))
+    assert ds.subshape[2:5, 0, ['x']] is a
+    assert dshape('10 * var * {x: int32, y: float64}').subshape[2:5, 0, ['x']] is a
+    assert ds.indexer((slice(2, 5), 0, ['y'])) is not a
+
+
+def test_indexer_errors():
+    ds = dshape('10 * {x: int32}')
+    with pytest.raises(NotImplementedError):
+        ds.indexer('x')
+    with pytest.raises(NotImplementedError):
+        ds.indexer((0, 'x', 0))
+    with pytest.raises(NotImplementedError):
+        ds.indexer(1.5)
+    with pytest.raises(ValueError):
+        ds.indexer(slice(None, None, 0))
+
+
 def test_DataShape_coerces_ints():
     assert DataShape(5, 'int32')[0] == Fixed(5)
     assert DataShape(5, 'int32')[1] == int32
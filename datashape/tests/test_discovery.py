@@ -2,7 +2,9 @@ import numpy as np
 import sys
 
 from datashape.discovery import (discover, null, unite_identical, unite_base,
-        unite_merge_dimensions, do_one, lowest_common_dshape)
+        unite_merge_dimensions, do_one, lowest_common_dshape, merge,
+        discover_jsonlines, enable_discover_cache, disable_discover_cache,
+        discover_cache_info)
 from datashape.coretypes import *
 from datashape.internal_utils import raises
 from datashape import dshape
@@ -219,3 +221,134 @@ def test_unite_base_on_records():
                dshape('{name: string, amount: int64}')]
     assert unite_base(dshapes) == \
             dshape('2 * {name: string, amount: int64}')
+
+
+def test_merge():
+    assert merge(int64, int64) == int64
+    assert merge(null, string) == Option(string)
+    assert merge(Option(int64), float64) == Option(float64)
+    assert merge(2 * int64, 2 * int64) == 2 * int64
+    assert merge(2 * int64, 3 * Option(int64)) == var * Option(int64)
+    assert merge(Tuple([int64, string]), Tuple([float64, null])) == \
+            Tuple([float64, Option(string)])
+    assert merge(2 * int64, Tuple([int64])) == var * int64
+    assert merge(Tuple([int64, string]), 3 * int64) == var * string
+    assert raises(ValueError, lambda: merge(2 * int64, Record([['a', int64]])))
+
+
+def test_merge_lists():
+    assert merge(discover([1]), discover([])) == var * int64
+    assert merge(discover([]), discover([[1.5]])) == dshape('var * 1 * float64')
+    assert merge(discover({'t': None}), discover({'t': ['a']})) == \
+        Record([['t', Option(var * string)]])
+    assert merge(discover({'t': ['a']}), discover({'t': None})) == \
+        Record([['t', Option(var * string)]])
+    assert merge(discover([1, 'a']), discover([1, 2, 3])) == var * string
+
+
+def test_merge_nested_records():
+    a = discover({'name': 'Alice', 'loc': {'x': 1, 'y': 2}, 'tags': ['a']})
+    b = discover({'name': 'Bob', 'loc': {'x': 1.0}, 'tags': ['b', 'c']})
+    assert merge(a, b) == dshape("""{loc: {x: float64, y: ?int64},
+                                     name: string,
+                                     tags: var * string}""")[0]
+
+
+jsonlines = [b'{"name": "Alice", "amount": 100, "tags": ["a", "b"]}',
+             b'{"name": "Bob", "amount": null, "tags": []}',
+             b'',
+             b'{"name": "Charlie", "amount": 1.5, "tags": ["c"],'
+             b' "loc": {"x": 1, "y": 2}}',
+             b'{"name": "Dan", "amount": 2, "tags": ["d"],'
+             b' "loc": {"x": 3}}']
+
+jsonlines_dshape = dshape("""4 * {amount: ?float64,
+                                  loc: ?{x: int64, y: ?int64},
+                                  name: string,
+                                  tags: var * string}""")
+
+
+def test_discover_jsonlines(tmpdir):
+    fn = str(tmpdir.join('data.json'))
+    with open(fn, 'wb') as f:
+        f.write(b'\n'.join(jsonlines) + b'\n')
+
+    assert discover_jsonlines(fn) == jsonlines_dshape
+    with open(fn, 'rb') as f:
+        assert discover_jsonlines(f) == jsonlines_dshape
+
+
+def test_discover_jsonlines_parallel(tmpdir):
+    fn = str(tmpdir.join('data.json'))
+    with open(fn, 'wb') as f:
+        f.write(b'\n'.join(jsonlines * 25))
+
+    expected = 100 * jsonlines_dshape.subshape[0]
+    assert discover_jsonlines(fn, processes=3) == expected
+    assert discover_jsonlines(fn, processes=7) == expected
+
+
+def test_discover_jsonlines_processes_need_a_filename():
+    lines = [b'{"a": 1}']
+    assert discover_jsonlines(lines, processes=1) == dshape('1 * {a: int64}')
+    assert raises(ValueError, lambda: discover_jsonlines(lines, processes=2))
+
+
+def test_discover_jsonlines_empty(tmpdir):
+    fn = str(tmpdir.join('data.json'))
+    open(fn, 'w').close()
+    assert discover_jsonlines(fn) == var * string
+    assert discover_jsonlines(fn, processes=2) == var * string
+
+
+def test_discover_cache():
+    assert discover_cache_info() is None
+    enable_discover_cache(maxsize=2)
+    try:
+        data = ['1', '2', '1', '1', 'Alice']
+        assert [discover(x) for x in data] == \
+                [int64, int64, int64, int64, string]
+        info = discover_cache_info()
+        assert (info.hits, info.misses) == (2, 3)
+        assert info.currsize == info.maxsize == 2
+        cached = discover(data)
+    finally:
+        disable_discover_cache()
+    assert discover_cache_info() is None
+    assert cached == discover(data)
+
+
+def test_discover_cache_threads():
+    from threading import Thread
+    enable_discover_cache(maxsize=50)
+    try:
+        values = [str(i % 100) for i in range(1000)]
+        results = []
+        def run():
+            results.append([discover(v) for v in values])
+        threads = [Thread(target=run) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert all(r == [int64] * len(values) for r in results)
+        info = discover_cache_info()
+        assert info.hits + info.misses == 4 * len(values)
+        assert info.currsize <= 50
+    finally:
+        disable_discover_cache()
+
+
+def test_discover_list_honors_dispatch_for_subclasses():
+    from datashape.dispatch import dispatch
+
+    class Flag(int):
+        pass
+
+    @dispatch(Flag)
+    def discover(x):
+        return bool_
+
+    assert discover([Flag(1), Flag(0)]) == 2 * bool_
+    assert discover([{'a': Flag(1)}]) == 1 * Record([['a', bool_]])
+    assert discover([1, 2]) == 2 * int64
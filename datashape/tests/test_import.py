@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Cumulative time budget for ``import datashape``, in microseconds.  The
+# import takes about 40ms when numpy and friends are left unimported.
+IMPORT_BUDGET = 200000
+
+heavy_modules = ['numpy', 'dateutil', 'multipledispatch', 'pytest',
+                 'datashape.coercion', 'datashape.discovery', 'datashape.user']
+
+root = os.path.dirname(os.path.dirname(os.path.dirname(
+                       os.path.abspath(__file__))))
+
+
+def run_python(*args):
+    p = subprocess.Popen((sys.executable,) + args, cwd=root,
+                         stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = p.communicate()
+    assert p.returncode == 0, err
+    return out.decode(), err.decode()
+
+
+def test_parsing_does_not_import_heavy_modules():
+    out, _ = run_python('-c',
+        "import sys, datashape\n"
+        "ds = datashape.dshape('var * {name: string, amount: ?int32}')\n"
+        "datashape.isrecord(ds.measure), datashape.isfixed(ds)\n"
+        "print(' '.join(m for m in %r if m in sys.modules))" % heavy_modules)
+    assert out.split() == []
+
+
+def test_lazy_attributes():
+    out, _ = run_python('-c',
+        "import datashape\n"
+        "print(datashape.discover([1, 2]))\n"
+        "print(datashape.coercion_cost(datashape.int32, datashape.int64))\n"
+        "print(datashape.type_equation_solver.__name__)")
+    assert out.split('\n')[:3] == ['2 * int64', '1',
+                                   'datashape.type_equation_solver']
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7),
+                    reason='-X importtime requires Python 3.7')
+def test_import_time():
+    # Take the best of a few runs to smooth over a busy machine
+    times = []
+    for i in range(3):
+        _, err = run_python('-X', 'importtime', '-c', 'import datashape')
+        for line in err.splitlines():
+            self_time, cumulative, name = line.split(':', 1)[1].split('|')
+            if name.strip() == 'datashape':
+                times.append(int(cumulative))
+    assert min(times) < IMPORT_BUDGET
+
+
+def test_old_names_are_reachable():
+    out, _ = run_python('-c',
+        "import datashape\n"
+        "from datashape.py2help import xfail, skipif, raises\n"
+        "print(datashape.dispatch.__name__, datashape.np.__name__)")
+    assert out.split() == ['datashape.dispatch', 'numpy']
@@ -0,0 +1,145 @@
+import ctypes
+import mmap
+
+import numpy as np
+import pytest
+
+from datashape import dshape, memory_layout, buffer_view
+from datashape.layout import Layout
+
+
+@pytest.mark.parametrize(('ds', 'dt'), [
+    ('int8', 'i1'),
+    ('float64', 'f8'),
+    ('string[5]', 'U5'),
+    ("string[7, 'A']", 'S7'),
+    ('datetime', 'M8[us]'),
+    ('{a: int8, b: float64, c: int16}', [('a', 'i1'), ('b', 'f8'),
+                                         ('c', 'i2')]),
+    ('{a: bool, b: {x: int16, y: 3 * int8}}',
+     [('a', '?'), ('b', [('x', 'i2'), ('y', 'i1', (3,))])]),
+    ('{a: int8, b: 2 * 2 * float32}', [('a', 'i1'), ('b', 'f4', (2, 2))]),
+    ('{a: int8, b: 2 * {x: int8, y: int64}}',
+     [('a', 'i1'), ('b', [('x', 'i1'), ('y', 'i8')], (2,))])])
+def test_aligned_layout_matches_numpy(ds, dt):
+    lay = memory_layout(dshape(ds))
+    expected = np.dtype(dt, align=True)
+    assert lay.itemsize == expected.itemsize
+    assert lay.alignment == expected.alignment
+    assert lay.to_numpy_dtype() == expected
+    if expected.names:
+        assert [f[1] for f in lay.fields] == \
+            [expected.fields[name][1] for name in expected.names]
+
+
+def test_aligned_layout_matches_ctypes():
+    class S(ctypes.Structure):
+        _fields_ = [('a', ctypes.c_int8), ('b', ctypes.c_double),
+                    ('c', ctypes.c_int16), ('d', ctypes.c_int32 * 3)]
+    lay = memory_layout(dshape('{a: int8, b: float64, c: int16, d: 3 * int32}'))
+    assert lay.itemsize == ctypes.sizeof(S)
+    assert lay.alignment == ctypes.alignment(S)
+    assert [f[1] for f in lay.fields] == \
+        [getattr(S, name).offset for name in 'abcd']
+
+
+def test_packed_layout():
+    ds = dshape('{a: int8, b: float64, c: {x: int8, y: int32}}')
+    lay = memory_layout(ds, packed=True)
+    assert lay.itemsize == 14
+    assert lay.alignment == 1
+    assert [f[1] for f in lay.fields] == [0, 1, 9]
+    assert lay.offset('c', 'y') == 10
+    dt = lay.to_numpy_dtype()
+    assert dt.itemsize == 14
+    assert not dt.isalignedstruct
+
+
+def test_dimensions():
+    lay = memory_layout(dshape('2 * 3 * {a: int8, b: int32}'))
+    assert lay.shape == (2, 3)
+    assert lay.strides == (24, 8)
+    assert lay.itemsize == 48
+    assert lay.measure.itemsize == 8
+    assert lay.offset('b') == 4
+    assert lay.strides == np.empty(lay.shape, lay.measure.to_numpy_dtype()).strides
+
+
+def test_tuple_fields_are_named_like_numpy():
+    lay = memory_layout(dshape('(int8, int32)'))
+    assert [f[:2] for f in lay.fields] == [('f0', 0), ('f1', 4)]
+
+
+def test_layouts_are_cached():
+    ds = dshape('{a: int8, b: float64}')
+    assert memory_layout(ds) is memory_layout(dshape('{a: int8, b: float64}'))
+    assert memory_layout(ds) is not memory_layout(ds, packed=True)
+    assert isinstance(memory_layout(ds), Layout)
+
+
+@pytest.mark.parametrize('ds', ['var * int32', '3 * string', '?int32',
+                                '{a: int32, b: string}', '3 * json',
+                                '(int8, var * int8)'])
+def test_variable_size_datashapes_have_no_layout(ds):
+    with pytest.raises(TypeError):
+        memory_layout(dshape(ds))
+
+
+def test_offset_of_missing_field():
+    with pytest.raises(KeyError):
+        memory_layout(dshape('{a: int8}')).offset('b')
+
+
+def test_buffer_view_of_nested_records():
+    ds = dshape('var * {id: int32, pos: {x: float64, y: float64}, '
+                "name: string[4, 'A']}")
+    dt = memory_layout(ds.subarray(1)).to_numpy_dtype()
+    data = np.zeros(3, dtype=dt)
+    data['id'] = [1, 2, 3]
+    data['pos']['y'] = [0.5, 1.5, 2.5]
+    data['name'] = [b'a', b'bb', b'cccc']
+    view = buffer_view(ds, data.tobytes())
+    assert view.shape == (3,)
+    assert view.tolist() == data.tolist()
+    assert view['pos']['y'].tolist() == [0.5, 1.5, 2.5]
+    assert view['name'][2] == b'cccc'
+
+
+def test_buffer_view_shares_memory():
+    buf = bytearray(24)
+    view = buffer_view(dshape('var * 3 * int16'), buf)
+    assert view.shape == (4, 3)
+    view[1, 2] = 7
+    assert np.frombuffer(buf, dtype='int16')[5] == 7
+
+    mem = memoryview(buf)
+    view = buffer_view(dshape('2 * int32'), mem, offset=8)
+    view[0] = -1
+    assert buf[8:12] == b'\xff\xff\xff\xff'
+
+
+def test_buffer_view_of_mmap(tmpdir):
+    fn = str(tmpdir.join('data.bin'))
+    np.arange(10, dtype='float64').tofile(fn)
+    with open(fn, 'r+b') as f:
+        m = mmap.mmap(f.fileno(), 0)
+        view = buffer_view(dshape('var * float64'), m)
+        assert view.tolist() == list(range(10))
+        del view
+        m.close()
+
+
+def test_buffer_view_packed():
+    ds = dshape('var * {a: int8, b: int32}')
+    buf = b'\x01\x02\x00\x00\x00' * 2
+    view = buffer_view(ds, buf, packed=True)
+    assert view['b'].tolist() == [2, 2]
+
+
+def test_buffer_view_errors():
+    with pytest.raises(ValueError):
+        buffer_view(dshape('var * int32'), b'\x00' * 6)
+    with pytest.raises(ValueError):
+        buffer_view(dshape('4 * int32'), b'\x00' * 8)
+    with pytest.raises(TypeError):
+        buffer_view(dshape('3 * var * int32'), b'\x00' * 12)
@@ -0,0 +1,73 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from datashape import dshape, nullable_array, from_numpy, NotNumpyCompatible
+
+
+def test_masked_ints():
+    a = nullable_array([1, None, 3], 'var * ?int64')
+    assert isinstance(a, np.ma.MaskedArray)
+    assert a.dtype == np.dtype('i8')
+    assert a.mask.tolist() == [False, True, False]
+    assert a.sum() == 4
+
+
+def test_mask_pair_of_nested_records():
+    ds = 'var * {id: int32, flag: ?bool, pos: ?{x: float64, y: ?int16}}'
+    data = [{'id': 1, 'flag': True, 'pos': {'x': 0.5, 'y': None}},
+            (2, None, None)]
+    values, mask = nullable_array(data, ds, masked=False)
+    assert isinstance(values, np.ndarray)
+    assert values['id'].tolist() == [1, 2]
+    assert values['pos']['x'][0] == 0.5
+    assert np.isnan(values['pos']['x'][1])
+    assert mask.tolist() == [(False, False, (False, True)),
+                             (False, True, (True, True))]
+
+
+def test_sentinels():
+    ds = '2 * 2 * {x: ?float64, t: ?datetime}'
+    when = datetime.datetime(2014, 1, 1, 12)
+    a = nullable_array([[(1.0, when), (None, None)],
+                        [(None, when), (2.0, None)]], ds, option='sentinel')
+    assert not isinstance(a, np.ma.MaskedArray)
+    assert a.shape == (2, 2)
+    assert np.isnan(a['x']).tolist() == [[False, True], [True, False]]
+    assert np.isnat(a['t']).tolist() == [[False, True], [False, True]]
+    assert a['t'][0, 0] == np.datetime64(when)
+
+
+def test_sentinel_needs_nan():
+    with pytest.raises(NotNumpyCompatible):
+        nullable_array([1, None], 'var * ?int32', option='sentinel')
+
+
+def test_round_trip_through_from_numpy():
+    ds = dshape('3 * {x: ?float64, n: ?int32}')
+    a = nullable_array([(1.0, 1), (None, None), (3.0, 3)], ds)
+    assert from_numpy(a.shape, a.dtype, 'mask') == ds
+    a = nullable_array([1.0, None], '2 * ?float64', option='sentinel')
+    assert from_numpy(a.shape, a.dtype, 'sentinel') == dshape('2 * ?float64')
+
+
+def test_subarray_fields():
+    ds = 'var * {a: ?float64, b: 2 * ?int32}'
+    a = nullable_array([(1.0, [1, None]), (None, [None, 3])], ds)
+    assert a.dtype == np.dtype([('a', 'f8'), ('b', 'i4', (2,))])
+    assert a['b'].mask.tolist() == [[False, True], [True, False]]
+    assert a['b'].filled(-1).tolist() == [[1, -1], [-1, 3]]
+    a = nullable_array([None, {'a': [1, 2]}], 'var * ?{a: 2 * float64}')
+    assert a['a'].mask.tolist() == [[True, True], [False, False]]
+
+
+def test_dicts_may_leave_out_optional_fields():
+    ds = 'var * {id: int32, name: ?string[8], pos: ?{x: float64}}'
+    a = nullable_array([{'id': 1}, {'id': 2, 'pos': {'x': 0.5}}], ds)
+    assert a['id'].tolist() == [1, 2]
+    assert a.mask.tolist() == [(False, True, (True,)),
+                               (False, True, (False,))]
+    with pytest.raises(ValueError) as excinfo:
+        nullable_array([{'name': 'Alice'}], ds)
+    assert 'id' in str(excinfo.value)
@@ -1,6 +1,7 @@
 from datashape.predicates import *
 from datashape.predicates import _dimensions
 from datashape.coretypes import TypeVar, int32
+from datashape import dshape
 from unittest import TestCase
 
 class Test_All(TestCase):
@@ -11,3 +12,44 @@ class Test_All(TestCase):
         assert _dimensions('?int') == _dimensions('int')
         assert _dimensions('3 * ?int') == _dimensions('3 * int')
 
+
+
+def test_schema_facts():
+    facts = schema_facts('var * {name: string, amounts: 3 * ?float64}')
+    assert facts == SchemaFacts(ndim=3, fixed=False, scalar=False,
+                                record=False, collection=True, numeric=False,
+                                real=False, boolean=False, datelike=False,
+                                homogeneous=False, tabular=False, var_dims=1)
+    facts = schema_facts(dshape('10 * 3 * ?float32'))
+    assert (facts.ndim, facts.fixed, facts.tabular, facts.numeric,
+            facts.real, facts.homogeneous) == (2, True, True, True, True,
+                                               True)
+    assert schema_facts('var * var * int32').var_dims == 2
+    assert schema_facts('M * int32').ndim is None
+    assert schema_facts('M * int32').fixed is None
+
+
+def test_schema_facts_are_cached():
+    ds = dshape('var * {a: int32, b: 5 * {c: string}}')
+    assert schema_facts(ds) is schema_facts(ds)
+    assert schema_facts('var * int32') is schema_facts('var * int32')
+    # Shared subtrees are analyzed once
+    assert schema_facts(ds.measure['b']) is schema_facts(ds.measure['b'])
+
+
+def test_predicates_of_unusual_types():
+    assert not isnumeric('time')
+    assert not isnumeric('3 * T')
+    assert not istabular('var * json')
+    assert not iscollection(dshape('{a: int32}').measure)
+    assert ishomogeneous('... * int32')
+
+
+def test_scalar_and_record_agree_for_text_and_types():
+    for text in ['int32', '?int32', '{a: int32}', '?{a: int32}', 'T',
+                 '3 * int32', 'var * {a: int32}', '(int32, string)']:
+        ds = dshape(text)
+        for x in [ds, ds.measure] if len(ds) == 1 else [ds]:
+            assert isscalar(x) == isscalar(text)
+            assert isrecord(x) == isrecord(text)
+    assert not isscalar(3) and not isrecord(None)
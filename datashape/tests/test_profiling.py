@@ -0,0 +1,77 @@
+from datashape import (dshape, dshapes, discover, coercion_cost, coretypes,
+                       stats, reset_stats, enable_stats, disable_stats,
+                       collect_stats)
+from datashape import profiling
+from datashape.overload_resolver import OverloadResolver
+
+
+def test_disabled_by_default():
+    reset_stats()
+    dshape('10 * int32')
+    assert stats() == {}
+
+
+def test_collect_stats():
+    with collect_stats():
+        dshapes('10 * int32', 'var * {x: int32}')
+        discover([{'x': 1, 'y': 2}, {'x': 3, 'y': 4}])
+        coercion_cost(coretypes.int8, coretypes.int64)
+        ores = OverloadResolver('f')
+        ores.extend_overloads(['(A... * int64) -> A... * int64',
+                               '(A... * float64) -> A... * float64'])
+        ores.resolve_overload(coretypes.Tuple([dshape('3 * int32')]))
+    result = stats()
+    assert result['discover.cells'].count == 4
+    assert result['discover.cells'].time == 0
+    assert result['coercion_cost'].count >= 1
+    assert result['resolve_overload'].count == 1
+    assert result['match_argtypes_to_signature'].count == 2
+    assert result['parse'].count == 5
+    assert result['parse'].time > 0
+
+    assert not profiling.enabled
+    dshape('10 * int32')
+    assert stats()['parse'].count == 5
+
+
+def test_enable_disable_reset():
+    reset_stats()
+    enable_stats()
+    try:
+        dshape('10 * int32')
+        with collect_stats(reset=False):
+            dshape('10 * int32')
+        assert profiling.enabled
+        dshape('10 * int32')
+    finally:
+        disable_stats()
+    assert stats()['parse'].count == 3
+    reset_stats()
+    assert stats() == {}
+
+
+def test_recursive_calls_are_timed_once():
+    @profiling.timed('fib')
+    def fib(n):
+        return n if n < 2 else fib(n - 1) + fib(n - 2)
+
+    with collect_stats():
+        fib(10)
+        total = stats()['fib']
+    assert total.count == 177
+    with collect_stats():
+        fib(1)
+    assert stats()['fib'].time < total.time
+
+
+def test_discover_cells_counts_the_path_taken():
+    with collect_stats():
+        discover([(1, 2), (3, 4)])
+    assert stats()['discover.cells'].count == 4
+
+    # The column pass gives up on the mixed field, so only the generic pass
+    # over the two rows and their fields is counted, plus the nested list
+    # which the column pass had already discovered
+    with collect_stats():
+        discover([{'a': 1}, {'a': [1]}])
+    assert stats()['discover.cells'].count == 6
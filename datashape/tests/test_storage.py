@@ -0,0 +1,142 @@
+import os
+
+import numpy as np
+import pytest
+
+from datashape import (dshape, write_array, open_array, append_array,
+                       read_dshape)
+from datashape.storage import MAGIC, ALIGNMENT
+
+
+@pytest.fixture
+def fn(tmpdir):
+    return str(tmpdir.join('data.dshape'))
+
+
+def test_round_trip(fn):
+    data = np.arange(12, dtype='float32').reshape(3, 4)
+    assert write_array(fn, data) == dshape('3 * 4 * float32')
+    result = open_array(fn)
+    assert isinstance(result, np.memmap)
+    assert result.dtype == data.dtype
+    assert (result == data).all()
+
+
+def test_header(fn):
+    write_array(fn, np.zeros(5, dtype='int16'))
+    with open(fn, 'rb') as f:
+        assert f.read(len(MAGIC)) == MAGIC
+    ds, offset = read_dshape(fn)
+    assert ds == dshape('5 * int16')
+    assert offset % ALIGNMENT == 0
+    assert os.path.getsize(fn) == offset + 10
+
+
+def test_records_and_strings(fn):
+    dt = np.dtype([('name', 'S8'), ('amount', 'f8'), ('when', 'M8[D]')])
+    data = np.array([(b'Alice', 100.0, '2014-01-01'),
+                     (b'Bob', -50.0, '2014-02-01')], dtype=dt)
+    ds = write_array(fn, data)
+    assert ds == dshape("2 * {name: string[8, 'A'], amount: float64, "
+                        "when: date}")
+    assert open_array(fn).tolist() == data.tolist()
+
+
+def test_nested_records_and_subarrays(fn):
+    dtype = np.dtype([('a', 'i1'), ('b', [('x', 'i2'), ('y', 'f8', (2,))])])
+    data = np.zeros(3, dtype=dtype)
+    data['b']['y'] = [[1, 2], [3, 4], [5, 6]]
+    assert write_array(fn, data) == \
+        dshape('3 * {a: int8, b: {x: int16, y: 2 * float64}}')
+    result = open_array(fn)
+    assert result.dtype == dtype
+    assert result['b']['y'].tolist() == [[1, 2], [3, 4], [5, 6]]
+
+
+def test_append(fn):
+    write_array(fn, np.arange(6).reshape(3, 2), var_length=True)
+    assert read_dshape(fn)[0] == dshape('var * 2 * int64')
+    assert append_array(fn, [[6, 7], [8, 9]]) == 5
+    assert open_array(fn).tolist() == np.arange(10).reshape(5, 2).tolist()
+
+
+def test_append_converts_dtype(fn):
+    write_array(fn, np.zeros(0, dtype='float64'), var_length=True)
+    assert open_array(fn).shape == (0,)
+    append_array(fn, np.array([1, 2], dtype='int8'))
+    result = open_array(fn)
+    assert result.dtype == np.dtype('float64')
+    assert result.tolist() == [1.0, 2.0]
+
+
+def test_append_errors(fn):
+    write_array(fn, np.zeros((2, 2)))
+    with pytest.raises(ValueError):
+        append_array(fn, np.zeros((1, 2)))
+    write_array(fn, np.zeros((2, 2)), var_length=True)
+    with pytest.raises(ValueError):
+        append_array(fn, np.zeros((1, 3)))
+    write_array(fn, np.zeros(2, dtype='int32'), var_length=True)
+    with pytest.raises(ValueError):
+        append_array(fn, np.array([1.5]))
+    with pytest.raises(ValueError):
+        append_array(fn, np.array(['a']))
+    append_array(fn, np.array([3], dtype='int64'))
+    assert open_array(fn).tolist() == [0, 0, 3]
+
+
+def test_big_endian_data_is_stored_little_endian(fn):
+    data = np.arange(3, dtype='>i4')
+    assert write_array(fn, data) == dshape('3 * int32')
+    ds, offset = read_dshape(fn)
+    with open(fn, 'rb') as f:
+        f.seek(offset)
+        assert f.read() == np.arange(3, dtype='<i4').tobytes()
+    assert open_array(fn).tolist() == [0, 1, 2]
+
+
+def test_write_through(fn):
+    write_array(fn, np.zeros(4, dtype='int32'))
+    m = open_array(fn, mode='r+')
+    m[2] = 7
+    m.flush()
+    del m
+    assert open_array(fn).tolist() == [0, 0, 7, 0]
+
+
+def test_unstorable_data(fn):
+    for data in [np.array([object(), object()]),
+                 np.array(['2014-01-01T00:00:00.000000001'], dtype='M8[ns]'),
+                 np.zeros(2, dtype=[('x', 'O')])]:
+        with pytest.raises(ValueError):
+            write_array(fn, data)
+        assert not os.path.exists(fn)
+
+
+def test_padding_and_views_are_stored_packed(fn):
+    data = np.zeros(3, dtype=[('a', 'i4'), ('b', 'f8'), ('c', 'i2')])
+    data['a'] = [1, 2, 3]
+    assert write_array(fn, data[['a', 'c']]) == \
+        dshape('3 * {a: int32, c: int16}')
+    assert open_array(fn).tolist() == [(1, 0), (2, 0), (3, 0)]
+    aligned = np.dtype([('a', 'i1'), ('b', 'i4')], align=True)
+    write_array(fn, np.ones(2, dtype=aligned))
+    assert open_array(fn).tolist() == [(1, 1), (1, 1)]
+
+
+def test_open_modes(fn):
+    write_array(fn, np.zeros(4, dtype='int32'))
+    for mode in ['w+', 'readwrite', 'x']:
+        with pytest.raises(ValueError):
+            open_array(fn, mode=mode)
+    assert read_dshape(fn)[0] == dshape('4 * int32')
+    m = open_array(fn, mode='c')
+    m[0] = 1
+    assert open_array(fn).tolist() == [0, 0, 0, 0]
+
+
+def test_not_a_datashape_file(fn):
+    with open(fn, 'wb') as f:
+        f.write(b'\x93NUMPY\x01\x00' + b'\x00' * 100)
+    with pytest.raises(ValueError):
+        open_array(fn)
@@ -0,0 +1,88 @@
+import pytest
+
+from datashape import (dshape, DataShape, Record, Option, Fixed, Var, TypeVar,
+                       Unit, int32, string)
+from datashape.coretypes import free
+from datashape.coercion import termsize
+from datashape.traversal import children, walk, fold, Fold
+from datashape.util import collect, has
+from datashape.validation import validate
+from datashape.error import DataShapeError
+
+
+def deep(n, measure=int32, dim=Fixed(2), wrap=lambda t: Record([('x', t)])):
+    t = measure
+    for i in range(n):
+        t = DataShape(dim, wrap(t))
+    return t
+
+
+def test_children():
+    ds = dshape('3 * {a: int32, b: (string, T)}')
+    assert children(ds) == [Fixed(3), ds.measure]
+    assert list(children(ds.measure)) == [int32,
+                                          dshape('(string, T)').measure]
+    assert children(dshape('(string, T)').measure) == [dshape('string'),
+                                                       dshape('T')]
+    assert children(5) == ()
+
+
+def test_walk_is_preorder_and_prunes():
+    ds = dshape('2 * {a: var * int32}')
+    units = list(walk(ds, prune=lambda t: isinstance(t, Unit)))
+    assert units == [ds, Fixed(2), ds.measure, dshape('var * int32'), Var(),
+                     int32]
+
+
+def test_fold_shares_equal_subterms():
+    calls = []
+
+    def count(t, results):
+        calls.append(t)
+        return 1 + sum(results)
+    ds = dshape('{a: 3 * int32, b: 3 * int32, c: 3 * int32}')
+    assert fold(count, ds, leaf=lambda x: 0) == 2 + 3 * 3
+    assert calls.count(dshape('3 * int32')) == 1
+
+
+def test_fold_cache_is_reused_between_calls():
+    calls = []
+
+    def count(t, results):
+        calls.append(t)
+        return 1 + sum(results)
+    size = Fold(count, leaf=lambda x: 0)
+    assert size(dshape('10 * int32')) == size(dshape('10 * int32'))
+    assert len(calls) == 3
+
+
+@pytest.mark.parametrize('n', [10, 5000])
+def test_deep_types_do_not_recurse(n):
+    t = deep(n)
+    assert not has(Var, t)
+    assert has(Var, deep(n, dim=Var()))
+    assert len(collect(lambda x: isinstance(x, Fixed), t)) == n
+    validate(t)
+
+    options = deep(n, TypeVar('T'), wrap=Option)
+    assert free(options) == [TypeVar('T')]
+    assert termsize(options) == 3 * n + 1
+    validate(options)
+
+
+def test_validate_nested_ellipsis():
+    with pytest.raises(DataShapeError):
+        validate(deep(3, measure=dshape('... * ... * int32')))
+
+
+def test_helpers_match_previous_results():
+    ds = dshape('var * {a: M * int32, b: (string, T), c: ?float64}')
+    assert free(ds) == []
+    assert free(dshape('M * {a: N * T}')) == [TypeVar('M')]
+    assert termsize(ds) == 3
+    assert termsize(dshape('M * N * int32')) == 4
+    assert has(TypeVar, ds)
+    assert not has(TypeVar, int32)
+    assert collect(lambda t: isinstance(t, TypeVar), ds) == [TypeVar('M'),
+                                                             TypeVar('T')]
+    assert collect(lambda t: isinstance(t, Record), string) == []
@@ -1,5 +1,7 @@
 from datashape.user import *
 from datashape import dshape
+from datashape.coretypes import Fixed, Null
+from datashape.internal_utils import raises
 from datetime import date, time, datetime
 import numpy as np
 
@@ -52,8 +54,230 @@ def test_issubschema():
     assert issubschema('2 * int', '2 * int')
     assert not issubschema('2 * int', '3 * int')
 
-    # assert issubschema('float32', 'real')
+    assert issubschema('float32', 'real')
+
+
+def test_issubschema_numeric_widening():
+    assert issubschema('int8', 'int64')
+    assert issubschema('uint8', 'int16')
+    assert issubschema('int32', 'float64')
+    assert issubschema('float32', 'complex[float32]')
+    assert not issubschema('int64', 'int32')
+    assert not issubschema('uint64', 'int64')
+    assert not issubschema('int32', 'bool')
+    assert not issubschema('int32', 'string')
+
+
+def test_issubschema_dimensions():
+    assert issubschema('10 * int32', 'var * int32')
+    assert issubschema('var * int32', 'var * int32')
+    assert issubschema('10 * 3 * int32', 'N * 3 * int32')
+    assert not issubschema('var * int32', '10 * int32')
+    assert not issubschema('N * int32', '10 * int32')
+    assert not issubschema('10 * int32', '10 * 10 * int32')
+
+    assert issubschema('10 * 3 * int32', '... * int32')
+    assert issubschema('10 * 3 * int32', '... * 3 * int32')
+    assert issubschema('10 * 3 * int32', '10 * ... * int64')
+    assert issubschema('10 * ... * int32', '... * int32')
+    assert issubschema('10 * ... * 3 * int32', 'var * ... * int32')
+    assert not issubschema('... * int32', '10 * ... * int32')
+    assert not issubschema('... * int32', '10 * int32')
+    assert not issubschema('10 * 3 * int32', '... * 4 * int32')
+
+
+def test_issubschema_options():
+    assert issubschema('int32', '?int32')
+    assert issubschema('?int32', '?int64')
+    assert issubschema(Null(), '?string')
+    assert not issubschema('?int32', 'int32')
+    assert issubschema('var * {x: int32, y: string}',
+                       'var * {x: ?int32, y: ?string}')
+
+
+def test_issubschema_records():
+    assert issubschema('{x: int, y: int, z: int}', '{x: int, y: int}')
+    assert issubschema('{x: int, y: int}', '{y: int64, x: real}')
+    assert not issubschema('{x: int, y: int}', '{x: int, y: int, z: int}')
+    assert not issubschema('{x: real, y: int}', '{x: int, y: int}')
+    assert issubschema('{x: {a: int32, b: int32}}', '{x: {a: ?int64}}')
+    assert issubschema('(int32, string[10])', '(int64, string)')
+    assert not issubschema('(int32, string)', '(int32, string[10])')
+    assert not issubschema('(int32, string)', '(int32, string, string)')
+
+
+def test_issubschema_strings():
+    assert issubschema('string[10]', 'string[20]')
+    assert issubschema("string[10, 'A']", 'string')
+    assert not issubschema('string', "string['A']")
+    assert not issubschema('string[20]', 'string[10]')
+
+
+def test_issubschema_binds_type_variables():
+    assert issubschema('10 * 10 * int32', 'N * N * int32')
+    assert not issubschema('10 * 3 * int32', 'N * N * int32')
+    assert issubschema('{x: int32, y: int32}', '{x: T, y: T}')
+    assert not issubschema('{x: int32, y: int64}', '{x: T, y: T}')
+    assert issubschema('10 * {x: 10 * int32}', 'N * {x: N * T}')
+    assert not issubschema('10 * {x: 3 * int32}', 'N * {x: N * T}')
 
 def test_integration():
     assert validate('{name: string, arrived: date}',
                     {'name': 'Alice', 'arrived': date(2012, 1, 5)})
+
+
+def test_validate_array_dimensions():
+    x = np.ones((3, 4), dtype='int32')
+    assert validate('3 * 4 * int32', x)
+    assert validate('var * 4 * int64', x)
+    assert validate('... * int32', x)
+    assert validate('3 * ... * int32', x)
+    assert not validate('4 * 4 * int32', x)
+    assert not validate('3 * int32', x)
+    assert not validate('3 * 4 * 1 * ... * int32', x)
+    assert not validate('3 * 4 * int16', x)
+    assert validate_array('0 * 4 * float64', np.ones((0, 4)))[0]
+
+
+def test_validate_array_nulls():
+    x = np.array([[1.0, 2.0], [np.nan, 4.0], [5.0, np.nan]])
+    valid, indices = validate_array('3 * 2 * float64', x)
+    assert not valid
+    assert list(indices) == [1, 2]
+    assert validate('3 * 2 * ?float64', x)
+
+    d = np.array(['2000-01-01', 'NaT'], dtype='M8[D]')
+    assert list(validate_array('2 * date', d)[1]) == [1]
+    assert validate('2 * ?date', d)
+    assert validate('2 * ?datetime', d)
+    assert not validate('2 * date', d.astype('M8[s]'))
+
+
+def test_validate_masked_arrays():
+    x = np.ma.masked_array([1, 2, 3], mask=[False, True, False])
+    assert validate('3 * ?int64', x)
+    assert list(validate_array('3 * int64', x)[1]) == [1]
+
+
+def test_validate_record_arrays():
+    dt = np.dtype([('name', 'U5'), ('amount', 'f8'), ('loc', 'i4', (2,))])
+    x = np.array([('Alice', 100.0, (1, 2)),
+                  ('Bob', np.nan, (3, 4)),
+                  ('Charlie', 300.0, (5, 6))], dtype=dt)
+    assert validate('3 * {name: string, amount: ?float64, loc: 2 * int32}', x)
+    assert validate('var * {amount: ?real}', x)
+
+    valid, indices = validate_array('var * {name: string, amount: real}', x)
+    assert not valid and list(indices) == [1]
+
+    valid, indices = validate_array('var * {name: string[3], amount: ?real}',
+                                    x)
+    assert list(indices) == [0, 2]
+
+    assert validate_array('var * {name: string, id: int32}', x) == \
+            (False, None)
+    assert not validate('var * {name: string, loc: 3 * int32}', x)
+    assert not validate('var * {name: int32}', x)
+
+
+def test_validate_object_arrays():
+    x = np.array(['Alice', None, 'Bob'], dtype=object)
+    assert validate('3 * ?string', x)
+    assert list(validate_array('3 * string', x)[1]) == [1]
+    assert list(validate_array('2 * string',
+                               np.array(['Alice', 1], dtype=object))[1]) == [1]
+
+
+def test_validate_option():
+    assert validate('?int', None)
+    assert validate('?int', 1)
+    assert not validate('?int', 'Alice')
+    assert validate('var * {name: string, amount: ?int}',
+                    [{'name': 'Alice', 'amount': None}])
+
+
+def test_compile_validator():
+    schemas = ['int', 'real', 'string', '?int', '2 * int', '3 * int',
+               '2 * 3 * int', '{x: int, y: int}', '{x: int, y: real}',
+               'var * {x: int, y: int}', 'var * {x: ?int, y: 2 * string}',
+               'date', 'time', 'datetime', '{name: string, arrived: date}']
+    values = [1, 2.0, 'Alice', None, True, (1, 2), [(1, 2, 3), (4, 5, 6)],
+              {'x': 1, 'y': 2}, {'x': 1, 'y': 2.0}, {'x': 1, 'z': 2},
+              (1, 2.0), (1.0, 2), [{'x': 1, 'y': 2}, {'x': 3, 'y': 4}],
+              [{'x': None, 'y': ['a', 'b']}], [{'x': 1, 'y': ['a', 1]}],
+              date(1999, 1, 20), time(12, 0, 0),
+              datetime(1999, 1, 20, 12, 0, 0),
+              {'name': 'Alice', 'arrived': date(2012, 1, 5)}]
+    for schema in schemas:
+        valid = compile_validator(schema)
+        for value in values:
+            assert valid(value) == bool(validate(schema, value)), \
+                    (schema, value)
+
+
+def test_compile_validator_is_cached():
+    assert compile_validator('var * {x: int}') is \
+            compile_validator(dshape('var * {x: int}'))
+
+
+def test_compile_validator_numpy():
+    valid = compile_validator('var * 2 * int32')
+    assert valid(np.ones((5, 2), dtype='int32'))
+    assert not valid(np.ones((5, 3), dtype='int32'))
+    assert valid([np.ones(2, dtype='int32'), (1, 2)])
+
+
+def test_row_validator():
+    rows = [{'name': 'Alice', 'amount': 100},
+            {'name': 'Bob', 'amount': 1.5},
+            ('Charlie', 300),
+            ['Dan', None],
+            {'amount': 'lots'},
+            'Edith']
+    v = RowValidator('var * {name: string, amount: int}')
+    violations = list(v(iter(rows)))
+    assert [(x.index, x.field, x.value) for x in violations] == \
+            [(1, 'amount', 1.5), (3, 'amount', None), (4, 'name', None),
+             (4, 'amount', 'lots'), (5, None, 'Edith')]
+    assert violations[0].expected == dshape('int32')[0]
+    assert v.rows == 6
+    assert v.invalid_rows == 4
+    assert v.errors == 5
+    assert v.field_errors == {'name': 1, 'amount': 3}
+
+
+def test_row_validator_max_errors():
+    def rows():
+        for i in range(10 ** 9):
+            yield {'x': i if i % 3 else None}
+    v = RowValidator('var * {x: int}', max_errors=3)
+    assert [x.index for x in v(rows())] == [0, 3, 6]
+    assert v.errors == 3
+    assert v.rows == 7
+
+
+def test_row_validator_fixed_length():
+    v = RowValidator('3 * {x: int}')
+    violations = list(v([(1,), (2,)]))
+    assert violations == [Violation(2, None, Fixed(3), 2)]
+    assert list(v([(1,)] * 3)) == []
+
+
+def test_row_validator_row_length():
+    v = RowValidator('var * {x: int, y: ?int}')
+    violations = list(v([(1,), (1, 2), (1, 2, 3), ['a'], ()]))
+    assert [(x.index, x.field, x.value) for x in violations] == \
+            [(2, None, (1, 2, 3)), (3, 'x', 'a'), (4, 'x', None)]
+    assert v.invalid_rows == 3
+    assert v.errors == 3
+
+    # Short tuples are treated like dicts that leave out the same fields
+    v = RowValidator('var * {x: int, y: ?int}')
+    violations = list(v([{'x': 1}, {}]))
+    assert [(x.index, x.field, x.value) for x in violations] == \
+            [(1, 'x', None)]
+
+
+def test_row_validator_requires_records():
+    assert raises(TypeError, lambda: RowValidator('var * int'))
+    assert raises(TypeError, lambda: RowValidator('{x: int}'))
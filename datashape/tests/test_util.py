@@ -1,7 +1,12 @@
+import ctypes
 import unittest
 
+import pytest
+
 import datashape
-from datashape import dshape, has_var_dim, has_ellipsis
+from datashape.error import DataShapeError
+from datashape import (dshape, has_var_dim, has_ellipsis, to_ctypes,
+                       to_ctypes_many, from_ctypes, from_cffi, memory_layout)
 
 
 class TestDataShapeUtil(unittest.TestCase):
@@ -10,6 +15,8 @@ class TestDataShapeUtil(unittest.TestCase):
         dslist = [dshape('3 * 10 * int32')]
         self.assertEqual(datashape.cat_dshapes(dslist),
                         dslist[0])
+        self.assertEqual(datashape.cat_dshapes([dshape('int32')]),
+                         dshape('int32'))
         # two dshapes
         dslist = [dshape('3 * 10 * int32'),
                         dshape('7 * 10 * int32')]
@@ -23,6 +30,77 @@ class TestDataShapeUtil(unittest.TestCase):
         self.assertRaises(ValueError, datashape.cat_dshapes,
                         [dshape('3 * 10 * int32'), dshape('3 * 1 * int32')])
 
+    def test_cat_dshapes_streaming(self):
+        dslist = [dshape('3 * 10 * int32'), dshape('var * 10 * int32'),
+                  dshape('2 * 10 * int32')]
+        self.assertEqual(datashape.cat_dshapes(dslist),
+                         dshape('var * 10 * int32'))
+        self.assertEqual(datashape.cat_dshapes(dshape('N * int8')
+                                               for i in range(3)),
+                         dshape('var * int8'))
+        # any iterable works, and is only consumed once
+        dslist = (dshape('%d * int8' % i) for i in range(1, 5))
+        self.assertEqual(datashape.cat_dshapes(dslist), dshape('10 * int8'))
+
+    def test_cat_dshapes_unifies(self):
+        dslist = [dshape('3 * 10 * int32'), dshape('2 * var * int64'),
+                  dshape('1 * 10 * float32')]
+        self.assertEqual(datashape.cat_dshapes(dslist),
+                         dshape('6 * var * float64'))
+
+    def test_cat_dshapes_options_records_strings(self):
+        cat = lambda *args: datashape.cat_dshapes(map(dshape, args))
+        self.assertEqual(cat('2 * ?int32', '3 * int32'), dshape('5 * ?int32'))
+        self.assertEqual(cat('2 * {x: int32}', '3 * {x: float64}'),
+                         dshape('5 * {x: float64}'))
+        self.assertEqual(cat('2 * string[5]', '3 * string[7]'),
+                         dshape('5 * string[7]'))
+        self.assertEqual(cat('2 * {x: ?string[5], y: 3 * int8}',
+                             '1 * {x: string, y: var * int16}'),
+                         dshape('3 * {x: ?string, y: var * int16}'))
+        self.assertRaises(ValueError, cat, '2 * {x: int32}', '2 * {y: int32}')
+        self.assertRaises(ValueError, cat, "2 * string[5, 'A']",
+                          '2 * string[5]')
+
+    def test_cat_dshapes_mismatch(self):
+        self.assertRaises(ValueError, datashape.cat_dshapes,
+                          [dshape('3 * int32'), dshape('3 * 2 * int32')])
+        self.assertRaises(ValueError, datashape.cat_dshapes,
+                          [dshape('3 * int32'), dshape('3 * string')])
+        self.assertRaises(ValueError, datashape.cat_dshapes,
+                          [dshape('int32'), dshape('int32')])
+
+    def test_dshape_of_types(self):
+        rec = dshape('{a: int32, b: 3 * string}').measure
+        self.assertEqual(dshape(rec), datashape.DataShape(rec))
+        self.assertEqual(dshape(datashape.int32), dshape('int32'))
+        self.assertEqual(dshape([datashape.Fixed(3), rec]),
+                         dshape('3 * {a: int32, b: 3 * string}'))
+        self.assertRaises(TypeError, dshape, 1)
+        self.assertRaises(TypeError, dshape, object())
+
+    def test_types_are_validated_once(self):
+        from datashape import validation
+        calls = []
+        original = validation._validate
+
+        def spy(ds, params):
+            calls.append(ds)
+            return original(ds, params)
+        validation._validate = spy
+        try:
+            ds = dshape('var * {a: 3 * int32, b: ?string}')
+            n = len(calls)
+            self.assertTrue(n)
+            validation.validate(ds)
+            dshape(ds.measure)
+            self.assertEqual(len(calls), n + 1)  # just the new wrapper
+            self.assertRaises(DataShapeError, dshape,
+                              [ds.measure['a'], datashape.Ellipsis(),
+                               datashape.Ellipsis(), datashape.int32])
+        finally:
+            validation._validate = original
+
     def test_has_var_dim(self):
         msg = ""
         fail = False
@@ -86,6 +164,116 @@ class TestDataShapeUtil(unittest.TestCase):
 
         self.assertFalse(fail, msg)
 
+    def test_to_ctypes_primitives(self):
+        self.assertIs(to_ctypes(dshape('int64')), ctypes.c_int64)
+        self.assertIs(to_ctypes(dshape('bool')), ctypes.c_bool)
+        self.assertIs(to_ctypes(dshape('complex[float64]')),
+                      datashape.util.Complex128)
+        self.assertIs(to_ctypes(dshape('complex64')),
+                      to_ctypes(dshape('complex[float32]')))
+        self.assertRaises(TypeError, to_ctypes, dshape('string'))
+        self.assertRaises(TypeError, to_ctypes, dshape('?int32'))
+
+    def test_to_ctypes_arrays(self):
+        t = to_ctypes(dshape('2 * 3 * int16'))
+        self.assertEqual(t._length_, 2)
+        self.assertEqual(t._type_._length_, 3)
+        self.assertIs(t._type_._type_, ctypes.c_int16)
+        self.assertEqual(to_ctypes(dshape('N * int8'))._length_, 0)
+
+    def test_to_ctypes_strings(self):
+        t = to_ctypes(dshape("{name: string[8, 'A'], uname: string[3]}"))
+        self.assertEqual(t.name.size, 8)
+        self.assertEqual(t.uname.size, 12)
+        value = t(name=b'Alice')
+        self.assertEqual(value.name, b'Alice')
+
+    def test_to_ctypes_nested_records(self):
+        ds = dshape('{id: int32, pos: 2 * {x: int8, y: float64}, '
+                    't: (int8, int16), w: 3 * 2 * float32}')
+        t = to_ctypes(ds)
+        layout = memory_layout(ds)
+        self.assertEqual(ctypes.sizeof(t), layout.itemsize)
+        self.assertEqual(ctypes.alignment(t), layout.alignment)
+        self.assertEqual([getattr(t, name).offset for name in ds.measure.names],
+                         [offset for _, offset, _ in layout.fields])
+        self.assertEqual(from_ctypes(t), ds.measure)
+
+    def test_to_ctypes_pack(self):
+        ds = dshape('{a: int8, b: {c: int8, d: int64}}')
+        t = to_ctypes(ds, pack=1)
+        self.assertEqual(ctypes.sizeof(t), memory_layout(ds, packed=True).itemsize)
+        self.assertEqual(t.b.offset, 1)
+        self.assertEqual(ctypes.sizeof(to_ctypes(ds, pack=4)), 16)
+        self.assertEqual(ctypes.sizeof(to_ctypes(ds)), 24)
+
+    def test_to_ctypes_is_cached(self):
+        ds = '{a: int8, b: 4 * {c: int8, d: int64}}'
+        self.assertIs(to_ctypes(dshape(ds)), to_ctypes(dshape(ds)))
+        self.assertIsNot(to_ctypes(dshape(ds)), to_ctypes(dshape(ds), pack=1))
+
+    def test_to_ctypes_many(self):
+        types = to_ctypes_many(['int32', dshape('{x: int8}'), 'int32'])
+        self.assertEqual(types[0], ctypes.c_int32)
+        self.assertIs(types[1], to_ctypes(dshape('{x: int8}')))
+        self.assertIs(types[2], types[0])
+
+    def test_from_ctypes(self):
+        class Point(ctypes.Structure):
+            _fields_ = [('x', ctypes.c_longlong), ('y', ctypes.c_double * 3),
+                        ('name', ctypes.c_char * 8)]
+
+        class Line(ctypes.Structure):
+            _fields_ = [('points', Point * 2), ('flag', ctypes.c_bool)]
+
+        expected = dshape("{points: 2 * {x: int64, y: 3 * float64, "
+                          "name: string[8, 'A']}, flag: bool}").measure
+        self.assertEqual(from_ctypes(Line), expected)
+        self.assertIs(from_ctypes(Line), from_ctypes(Line))
+        self.assertEqual(from_ctypes(ctypes.POINTER(Line)), expected)
+        self.assertEqual(from_ctypes(ctypes.POINTER(ctypes.c_int16 * 4 * 2)),
+                         dshape('2 * 4 * int16'))
+
+    def test_from_ctypes_errors(self):
+        class Node(ctypes.Structure):
+            pass
+        Node._fields_ = [('value', ctypes.c_int32),
+                         ('next', ctypes.POINTER(Node))]
+
+        class Flags(ctypes.Structure):
+            _fields_ = [('a', ctypes.c_int32, 3)]
+
+        self.assertRaises(TypeError, from_ctypes, Node)
+        self.assertRaises(TypeError, from_ctypes, Flags)
+        self.assertRaises(TypeError, from_ctypes,
+                          ctypes.POINTER(ctypes.POINTER(ctypes.c_int32)))
+
+    def test_from_cffi(self):
+        cffi = pytest.importorskip('cffi')
+        ffi = cffi.FFI()
+        ffi.cdef('''
+            struct point { int64_t x; double y[3]; _Bool ok; };
+            struct line { struct point points[2][2]; unsigned short n;
+                          size_t len; };
+            struct flags { int a : 3; };
+            struct node { int value; struct node *next; };
+        ''')
+        expected = dshape('{points: 2 * 2 * {x: int64, y: 3 * float64, '
+                          'ok: bool}, n: uint16, len: uint64}').measure
+        line = ffi.typeof('struct line')
+        self.assertEqual(from_cffi(ffi, line), expected)
+        self.assertIs(from_cffi(ffi, line), from_cffi(ffi, line))
+        self.assertEqual(from_cffi(ffi, ffi.typeof('struct line *')), expected)
+        self.assertEqual(from_cffi(ffi, ffi.typeof('int (*)[10]')),
+                         dshape('10 * int32'))
+        self.assertEqual(from_cffi(ffi, ffi.typeof('float[]')),
+                         dshape('N * float32'))
+        self.assertRaises(TypeError, from_cffi, ffi,
+                          ffi.typeof('struct flags'))
+        self.assertRaises(TypeError, from_cffi, ffi,
+                          ffi.typeof('struct node'))
+
+
 if __name__ == '__main__':
     unittest.main()
 
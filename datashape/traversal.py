@@ -0,0 +1,143 @@
+"""
+Iterative traversals over datashape types.
+
+Helpers such as ``free``, ``termsize`` or ``has`` summarize a type by
+combining the results of its parts.  ``Fold`` does this with an explicit
+stack rather than Python recursion, so arbitrarily deep types do not hit the
+recursion limit, and it memoizes the result for every subterm: equal subtrees
+within a type, and types seen in earlier calls, are only visited once.
+"""
+
+from __future__ import print_function, division, absolute_import
+
+from .coretypes import Mono, Unit, Record
+from .internal_utils import LRUCache
+
+
+__all__ = ['children', 'parameters', 'walk', 'fold', 'Fold']
+
+
+def children(term):
+    """ The subterms of a term
+
+    Records contribute their field types, other types their parameters, with
+    sequences of types (as in ``Tuple``) spliced in, and lists and tuples
+    their items.
+
+    >>> from datashape import dshape
+    >>> children(dshape('10 * {x: int32, y: float64}'))
+    [Fixed(10), dshape("{ x : int32, y : float64 }")]
+    >>> children(dshape('(int32, float64)').measure)
+    [dshape("int32"), dshape("float64")]
+    """
+    if isinstance(term, Record):
+        return term.types
+    if isinstance(term, Mono):
+        result = []
+        for p in term.parameters:
+            if isinstance(p, (list, tuple)):
+                result.extend(p)
+            else:
+                result.append(p)
+        return result
+    if isinstance(term, (list, tuple)):
+        return term
+    return ()
+
+
+def parameters(term):
+    """ The parameters of a non-unit type, the subterms of ``free``
+
+    Unlike ``children`` this does not look inside records or tuples of
+    types, as ``validate`` and ``free`` never have.
+    """
+    if isinstance(term, Mono) and not isinstance(term, Unit):
+        return term.parameters
+    return ()
+
+
+def walk(term, children=children, prune=None):
+    """ Iterate over a term and its subterms, parents first
+
+    When ``prune(t)`` is true the subterms of ``t`` are skipped.
+
+    >>> from datashape import dshape
+    >>> is_unit = lambda t: isinstance(t, Unit)
+    >>> [str(t) for t in walk(dshape('3 * {x: int32}'), prune=is_unit)]
+    ['3 * { x : int32 }', '3', '{ x : int32 }', 'int32']
+    """
+    stack = [term]
+    while stack:
+        t = stack.pop()
+        yield t
+        if prune is None or not prune(t):
+            stack.extend(reversed(children(t)))
+
+
+class Fold(object):
+    """ A memoized bottom-up fold over types
+
+    ``combine(t, results)`` computes the value of a type ``t`` from the
+    values of its ``children(t)``; ``leaf(x)`` gives the value of anything
+    that is not a type, such as the name of a ``CType``.  Values of types
+    are cached in an ``LRUCache`` shared by all calls, so ``combine`` must
+    depend only on the structure of ``t``.
+
+    >>> from datashape import dshape
+    >>> depth = Fold(lambda t, results: 1 + max(results or [0]),
+    ...              leaf=lambda x: 0)
+    >>> depth(dshape('10 * {x: 3 * int32}'))
+    4
+    """
+    def __init__(self, combine, children=children, leaf=None, maxsize=4096):
+        self.combine = combine
+        self.children = children
+        self.leaf = leaf
+        self.cache = LRUCache(maxsize)
+
+    def __call__(self, term):
+        return fold(self.combine, term, self.children, self.leaf, self.cache)
+
+
+def fold(combine, term, children=children, leaf=None, cache=None):
+    """ Fold ``combine`` bottom-up over a term without recursion
+
+    See ``Fold``.  Children that are not types are passed to ``leaf``, or
+    used as they are if it is ``None``.  ``cache``, if given, is a mapping
+    with a ``get`` method that shares the values of types between calls.
+    Within a call, equal subterms are combined once.
+    """
+    if not isinstance(term, Mono):
+        return leaf(term) if leaf is not None else term
+    done = {}
+    if cache is not None:
+        result = cache.get(term, done)
+        if result is not done:
+            return result
+    stack = [term]
+    while stack:
+        t = stack[-1]
+        if t in done:
+            stack.pop()
+            continue
+        kids = children(t)
+        pending = False
+        for k in kids:
+            if isinstance(k, Mono) and k not in done:
+                if cache is not None:
+                    value = cache.get(k, done)
+                    if value is not done:
+                        done[k] = value
+                        continue
+                stack.append(k)
+                pending = True
+        if pending:
+            continue
+        stack.pop()
+        value = combine(t, [done[k] if isinstance(k, Mono)
+                            else leaf(k) if leaf is not None else k
+                            for k in kids])
+        done[t] = value
+        if cache is not None:
+            cache[t] = value
+    return done[term]
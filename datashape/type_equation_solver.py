@@ -15,6 +15,7 @@ from . import coretypes
 from . import error
 from . import coercion
 from . import promotion
+from .profiling import timed
 
 inf = float('inf')
 
@@ -60,6 +61,7 @@ def matches_datashape_pattern(concrete, symbolic):
     return True
 
 
+@timed('match_argtypes_to_signature')
 def match_argtypes_to_signature(argtypes, signature, resolver=None,
                                 cutoff_cost=inf):
     """
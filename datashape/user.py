@@ -1,21 +1,36 @@
 from __future__ import print_function, division, absolute_import
+import numpy as np
 from datashape.dispatch import dispatch
 from .coretypes import *
 from .predicates import isdimension
 from .util import dshape
+from .internal_utils import LRUCache
+from .py2help import _strtypes
 import sys
+from collections import namedtuple
 from datetime import date, time, datetime
 
 
-__all__ = ['validate', 'issubschema']
+__all__ = ['validate', 'validate_array', 'compile_validator', 'RowValidator',
+           'Violation', 'issubschema']
 
 
 basetypes = np.generic, int, float, str, date, time, datetime
 
 
+# Scalars are checked against the kind of a dtype rather than its exact size,
+# so that e.g. Python ints are valid int32s
+_kind_types = {'b': np.bool_, 'i': np.signedinteger, 'u': np.unsignedinteger,
+               'f': np.floating, 'c': np.complexfloating}
+
+
+def _scalar_type(dtype):
+    return _kind_types.get(dtype.kind, dtype.type)
+
+
 @dispatch(np.dtype, basetypes)
 def validate(schema, value):
-    return np.issubdtype(type(value), schema)
+    return np.issubdtype(type(value), _scalar_type(schema))
 
 
 @dispatch(CType, basetypes)
@@ -38,6 +53,11 @@ def validate(schema, value):
         return validate(schema[0], value)
 
 
+@dispatch(Option, object)
+def validate(schema, value):
+    return value is None or validate(schema.ty, value)
+
+
 @dispatch(Record, dict)
 def validate(schema, d):
     return all(validate(sch, d.get(k)) for k, sch in schema.parameters[0])
@@ -91,19 +111,472 @@ def validate(schema, value):
 
 @dispatch(DataShape, np.ndarray)
 def validate(schema, value):
-    return issubschema(from_numpy(value.shape, value.dtype), schema)
+    return validate_array(schema, value)[0]
+
+
+_compiled_validators = LRUCache(256)
+
+
+def compile_validator(schema):
+    """ Build a fast validation function for a datashape
+
+    The schema is walked once up front, so the returned function checks
+    values without dispatching on types or building intermediate
+    datashapes.  Validators are cached per schema.
+
+    >>> valid = compile_validator('var * {name: string, amount: ?int}')
+    >>> valid([{'name': 'Alice', 'amount': 100}, ('Bob', None)])
+    True
+    >>> valid([{'name': 'Alice', 'amount': 1.5}])
+    False
+    """
+    schema = dshape(schema)
+    result = _compiled_validators.get(schema)
+    if result is None:
+        result = _compiled_validators[schema] = _compile(schema)
+    return result
+
+
+def _compile(schema):
+    if isinstance(schema, DataShape):
+        if len(schema) == 1:
+            return _compile(schema[0])
+        head = schema[0]
+        if isinstance(head, Ellipsis):
+            return lambda value: bool(validate(schema, value))
+        return _compile_dimension(schema, head, _compile(schema.subarray(1)))
+    if isinstance(schema, Option):
+        inner = _compile(schema.ty)
+        return lambda value: value is None or inner(value)
+    if isinstance(schema, Record):
+        return _compile_record([(name, _compile(typ))
+                                for name, typ in schema.fields])
+    if isinstance(schema, String):
+        return lambda value: isinstance(value, _strtypes)
+    if isinstance(schema, CType):
+        return _compile_ctype(_scalar_type(to_numpy_dtype(schema)))
+    for typ, pytype in ((DateTime, datetime), (Date, date), (Time, time)):
+        if isinstance(schema, typ):
+            return lambda value: isinstance(value, pytype)
+    return lambda value: bool(validate(schema, value))
+
+
+def _compile_dimension(schema, dim, inner):
+    size = dim.val if isinstance(dim, Fixed) else None
+    def valid(value):
+        if isinstance(value, np.ndarray):
+            return validate_array(schema, value)[0]
+        if not isinstance(value, (tuple, list)):
+            return False
+        if size is not None and len(value) != size:
+            return False
+        for item in value:
+            if not inner(item):
+                return False
+        return True
+    return valid
+
+
+def _compile_record(fields):
+    def valid(value):
+        if isinstance(value, dict):
+            get = value.get
+            for name, field in fields:
+                if not field(get(name)):
+                    return False
+            return True
+        if isinstance(value, (tuple, list)):
+            for (name, field), item in zip(fields, value):
+                if not field(item):
+                    return False
+            return True
+        return False
+    return valid
+
+
+def _compile_ctype(scalar_type):
+    # Remember the answer for every Python type seen, values of the same
+    # type are either all valid or all invalid
+    accepted = {}
+    def valid(value):
+        typ = type(value)
+        try:
+            return accepted[typ]
+        except KeyError:
+            ok = accepted[typ] = (issubclass(typ, basetypes) and
+                                  np.issubdtype(typ, scalar_type))
+            return ok
+    return valid
+
+
+Violation = namedtuple('Violation', ['index', 'field', 'expected', 'value'])
+
+
+class RowValidator(object):
+    """ Validate a stream of rows against a ``var * {...}`` schema
+
+    Calling the validator on an iterable of rows (dicts or tuples) lazily
+    yields a ``Violation(index, field, expected, value)`` for every field
+    that does not match the schema, holding only one row at a time.
+    Rows that are not dicts, tuples or lists, and tuples or lists with too
+    many fields, are reported with a field of None.  As with a dict that
+    leaves out keys, the missing trailing fields of a short tuple or list
+    are None, which only optional fields accept.  Running counts are kept
+    on the validator as rows are consumed, accumulating over calls until
+    ``reset`` is called.
+
+    Parameters
+    ----------
+    schema : str or DataShape
+        A one dimensional datashape of records.
+    max_errors : int, optional
+        Stop consuming rows after this many violations.
+
+    >>> v = RowValidator('var * {name: string, amount: int}')
+    >>> for violation in v([('Alice', 100), ('Bob', 'NaN'), ('Charlie', 1)]):
+    ...     print(violation)
+    Violation(index=1, field='amount', expected=ctype("int32"), value='NaN')
+    >>> v.rows, v.invalid_rows, v.errors
+    (3, 1, 1)
+    """
+    def __init__(self, schema, max_errors=None):
+        schema = dshape(schema)
+        if len(schema) != 2 or not isinstance(schema.measure, Record):
+            raise TypeError('RowValidator expects a one dimensional datashape'
+                            ' of records, not %s' % schema)
+        self.schema = schema
+        self.max_errors = max_errors
+        self.fields = [(name, typ, compile_validator(typ))
+                       for name, typ in schema.measure.fields]
+        self.reset()
+
+    def reset(self):
+        """ Reset the running counts """
+        self.rows = 0
+        self.invalid_rows = 0
+        self.errors = 0
+        self.field_errors = dict((name, 0) for name, _, _ in self.fields)
+
+    def __call__(self, rows):
+        fields = self.fields
+        field_errors = self.field_errors
+        index = -1
+        for index, row in enumerate(rows):
+            if self.max_errors is not None and self.errors >= self.max_errors:
+                return
+            self.rows += 1
+            if isinstance(row, dict):
+                values = [row.get(name) for name, _, _ in fields]
+            elif isinstance(row, (tuple, list)):
+                values = row
+                if len(values) < len(fields):
+                    values = list(values)
+                    values.extend([None] * (len(fields) - len(values)))
+            else:
+                self.invalid_rows += 1
+                self.errors += 1
+                yield Violation(index, None, self.schema.measure, row)
+                continue
+            row_ok = True
+            if len(values) > len(fields):
+                # Extra fields of a tuple row
+                self.invalid_rows += 1
+                self.errors += 1
+                row_ok = False
+                yield Violation(index, None, self.schema.measure, row)
+                if (self.max_errors is not None and
+                        self.errors >= self.max_errors):
+                    return
+            for (name, typ, valid), value in zip(fields, values):
+                if not valid(value):
+                    if row_ok:
+                        self.invalid_rows += 1
+                        row_ok = False
+                    self.errors += 1
+                    field_errors[name] += 1
+                    yield Violation(index, name, typ, value)
+                    if (self.max_errors is not None and
+                            self.errors >= self.max_errors):
+                        return
+        dim = self.schema[0]
+        if isinstance(dim, Fixed) and dim.val != index + 1:
+            self.errors += 1
+            yield Violation(index + 1, None, dim, index + 1)
+
+
+def validate_array(schema, value):
+    """ Validate a NumPy array against a datashape with array operations
+
+    Checks the dimensions of ``value`` against those of ``schema``, that
+    the dtype (or each field of a structured dtype) can be safely cast to
+    the measure, and that missing values -- NaN, NaT, ``None`` in object
+    arrays or masked entries of a ``numpy.ma`` array -- only appear where
+    the measure is an ``Option``.
+
+    Returns a tuple ``(valid, indices)``.  ``indices`` holds the positions
+    along the leading axis of the offending elements, or is None when the
+    shape or dtype can never match the schema.
+
+    >>> x = np.array([1.0, np.nan, 3.0])
+    >>> validate_array('3 * ?float64', x)
+    (True, array([], dtype=int64))
+    >>> validate_array('3 * float64', x)
+    (False, array([1]))
+    >>> validate_array('3 * int32', x)
+    (False, None)
+    """
+    schema = dshape(schema)
+    if not _dims_match(schema.shape, np.shape(value)):
+        return False, None
+    if not isinstance(value, np.ndarray):
+        value = np.asarray(value)
+    bad = _invalid_mask(schema.measure, value, False)
+    if bad is None:
+        return False, None
+    if bad.ndim == 0:
+        indices = np.flatnonzero([bad])
+    else:
+        indices = np.flatnonzero(bad.any(axis=tuple(range(1, bad.ndim))))
+    return not len(indices), indices
+
+
+def _dims_match(dims, shape):
+    """ Do the dimensions of a datashape describe a NumPy shape? """
+    for i, dim in enumerate(dims):
+        if isinstance(dim, Ellipsis):
+            after = dims[i + 1:]
+            return (len(shape) >= i + len(after) and
+                    _dims_match(after, shape[len(shape) - len(after):]))
+        if i >= len(shape):
+            return False
+        if isinstance(dim, Fixed) and dim.val != shape[i]:
+            return False
+    return len(dims) == len(shape)
+
+
+def _invalid_mask(measure, value, nullable):
+    """ Boolean array marking elements of ``value`` not matching ``measure``
+
+    Returns None if no element of an array with this dtype could match.
+    """
+    if isinstance(measure, Option):
+        return _invalid_mask(measure.ty, value, True)
+    if isinstance(measure, DataShape):
+        # A subarray field, its dimensions are the trailing axes of value
+        ndim = len(measure.shape)
+        if not _dims_match(measure.shape, value.shape[value.ndim - ndim:]):
+            return None
+        bad = _invalid_mask(measure.measure, value, nullable)
+        if bad is None or not ndim:
+            return bad
+        return bad.any(axis=tuple(range(bad.ndim - ndim, bad.ndim)))
+    if isinstance(measure, Record):
+        names = value.dtype.names or ()
+        bad = np.zeros(value.shape, dtype=bool)
+        for name, typ in measure.fields:
+            if name not in names:
+                return None
+            field_bad = _invalid_mask(typ, value[name], nullable)
+            if field_bad is None:
+                return None
+            bad |= field_bad
+        return bad
+
+    if value.dtype.names:
+        return None
+    masked = np.ma.getmask(value)
+    data = np.ma.getdata(value)
+    if data.dtype.kind == 'O':
+        bad = _invalid_objects(measure, data, nullable)
+    else:
+        bad = _invalid_values(measure, data, nullable)
+    if bad is None or masked is np.ma.nomask:
+        return bad
+    if nullable:
+        return bad & ~masked
+    return bad | masked
+
+
+def _invalid_values(measure, data, nullable):
+    kind = data.dtype.kind
+    if isinstance(measure, String):
+        if kind not in 'SU':
+            return None
+        if measure.fixlen is not None and data.dtype.itemsize > (
+                measure.fixlen * (4 if kind == 'U' else 1)):
+            return np.char.str_len(data) > measure.fixlen
+        return np.zeros(data.shape, dtype=bool)
+    if isinstance(measure, (Date, DateTime)):
+        if kind != 'M':
+            return None
+        unit = np.datetime_data(data.dtype)[0]
+        if isinstance(measure, Date) and unit not in ('Y', 'M', 'W', 'D'):
+            return None
+    elif isinstance(measure, CType):
+        if not np.can_cast(data.dtype, to_numpy_dtype(measure), 'safe'):
+            return None
+    else:
+        return None
+    if nullable or kind not in 'fcM':
+        return np.zeros(data.shape, dtype=bool)
+    return np.isnat(data) if kind == 'M' else np.isnan(data)
+
+
+def _invalid_objects(measure, data, nullable):
+    def invalid(item):
+        if item is None:
+            return not nullable
+        return not validate(measure, item)
+    return np.frompyfunc(invalid, 1, 1)(data).astype(bool)
+
+
+_subschemas = LRUCache(4096)
 
 
 @dispatch(object, object)
 def issubschema(a, b):
+    if isinstance(a, _strtypes) and isinstance(b, _strtypes):
+        # Memoized on the text as well, so repeated calls skip parsing
+        key = a, b
+        result = _subschemas.get(key)
+        if result is None:
+            result = _subschemas[key] = issubschema(dshape(a), dshape(b))
+        return result
     return issubschema(dshape(a), dshape(b))
 
 
 @dispatch(DataShape, DataShape)
 def issubschema(a, b):
-    if a == b:
+    """ Is every value described by ``a`` also described by ``b``?
+
+    >>> issubschema('10 * int32', 'var * int64')
+    True
+    >>> issubschema('{name: string, amount: int32, id: int64}',
+    ...             '{name: string, amount: ?float64}')
+    True
+    >>> issubschema('var * int32', '10 * int32')
+    False
+
+    A type variable matches any type, but every occurrence of the same
+    variable must match the same type:
+
+    >>> issubschema('10 * 10 * int32', 'N * N * T')
+    True
+    >>> issubschema('10 * 3 * int32', 'N * N * T')
+    False
+    """
+    key = a, b
+    result = _subschemas.get(key)
+    if result is None:
+        result = _subschemas[key] = _issubschema(a, b, {})
+    return result
+
+
+def _unpack(ds):
+    if isinstance(ds, DataShape) and len(ds) == 1:
+        return ds[0]
+    return ds
+
+
+def _issubschema(a, b, bindings):
+    """ Is ``a`` a subschema of ``b``, binding the type variables of ``b``
+
+    ``bindings`` maps each type variable of ``b`` seen so far to the part
+    of ``a`` it matched.
+    """
+    a, b = _unpack(a), _unpack(b)
+    if isinstance(b, TypeVar):
+        return _bind(b, a, bindings)
+    if type(a) == type(b) and a == b:
         return True
-    # TODO, handle cases like float < real
-    # TODO, handle records {x: int, y: int, z: int} < {x: int, y: int}
+    if isinstance(a, DataShape) or isinstance(b, DataShape):
+        return (_dims_issubschema(list(a.shape), list(b.shape), bindings) and
+                _issubschema(a.measure, b.measure, bindings))
+    if isinstance(b, Option):
+        if isinstance(a, Null):
+            return True
+        return _issubschema(a.ty if isinstance(a, Option) else a, b.ty,
+                            bindings)
+    if isinstance(a, CType) and isinstance(b, CType):
+        return _ctype_issubschema(a, b)
+    if isinstance(a, String) and isinstance(b, String):
+        if b.encoding == u'A' and a.encoding != u'A':
+            return False
+        return b.fixlen is None or (a.fixlen is not None and
+                                    a.fixlen <= b.fixlen)
+    if isinstance(a, Record) and isinstance(b, Record):
+        fields = a.dict
+        return all(name in fields and
+                   _issubschema(fields[name], typ, bindings)
+                   for name, typ in b.fields)
+    if isinstance(a, Tuple) and isinstance(b, Tuple):
+        return (len(a.dshapes) == len(b.dshapes) and
+                all(_issubschema(x, y, bindings)
+                    for x, y in zip(a.dshapes, b.dshapes)))
+    if isinstance(b, Implements):
+        return a in b.typeset
+    return False
 
-    return None  # We don't know, return something falsey
+
+def _bind(var, ds, bindings):
+    """ Bind type variable ``var`` to ``ds``, or check its earlier binding """
+    bound = bindings.get(var)
+    if bound is None:
+        bindings[var] = ds
+        return True
+    return type(bound) == type(ds) and bound == ds
+
+
+def _ctype_issubschema(a, b):
+    """ Numeric widening, coercions in the coercion table which NumPy
+    considers safe """
+    from .coercion import coercion_cost_table
+    try:
+        coercion_cost_table(a, b)
+    except KeyError:
+        return False
+    return np.can_cast(to_numpy_dtype(a), to_numpy_dtype(b), 'safe')
+
+
+def _dims_issubschema(a, b, bindings):
+    """ Do dimensions ``a`` fit within the dimensions ``b``?
+
+    Either list may contain a single Ellipsis, which stands for any number
+    of dimensions.
+    """
+    bsplit = _split_ellipsis(b)
+    asplit = _split_ellipsis(a)
+    if bsplit is None:
+        return (asplit is None and len(a) == len(b) and
+                all(_dim_issubschema(x, y, bindings)
+                    for x, y in zip(a, b)))
+    bpre, bpost = bsplit
+    if asplit is None:
+        if len(a) < len(bpre) + len(bpost):
+            return False
+        apre, apost = a[:len(bpre)], a[len(a) - len(bpost):]
+    else:
+        apre, apost = asplit
+        # Whatever a's ellipsis stands for must land in b's ellipsis
+        if len(apre) < len(bpre) or len(apost) < len(bpost):
+            return False
+        apre, apost = apre[:len(bpre)], apost[len(apost) - len(bpost):]
+    return all(_dim_issubschema(x, y, bindings)
+               for x, y in zip(apre + apost, bpre + bpost))
+
+
+def _split_ellipsis(dims):
+    for i, dim in enumerate(dims):
+        if isinstance(dim, Ellipsis):
+            return dims[:i], dims[i + 1:]
+    return None
+
+
+def _dim_issubschema(a, b, bindings):
+    if isinstance(b, TypeVar):
+        return _bind(b, a, bindings)
+    if isinstance(b, Var):
+        return isinstance(a, (Fixed, Var))
+    if isinstance(b, Fixed):
+        return isinstance(a, Fixed) and a.val == b.val
+    return False
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function, division, absolute_import
 
+import itertools
 import operator
 import ctypes
 import sys
@@ -10,13 +11,14 @@ from . import parser
 from . import type_symbol_table
 from .error import UnificationError
 from .validation import validate
+from .traversal import walk
 from . import coretypes
-from itertools import chain
-from .internal_utils import reverse_dict
+from .internal_utils import reverse_dict, LRUCache
 
 
 __all__ = ['dshape', 'dshapes', 'has_var_dim', 'has_ellipsis',
-           'cat_dshapes', 'from_ctypes', 'from_cffi', 'to_ctypes']
+           'cat_dshapes', 'from_ctypes', 'from_cffi', 'to_ctypes',
+           'to_ctypes_many']
 
 
 PY3 = (sys.version_info[:2] >= (3, 0))
@@ -43,23 +45,47 @@ def dshape(o):
     >>> ds[1]
     ctype("int32")
     """
-    if isinstance(o, coretypes.DataShape):
+    cls = type(o)
+    if cls is coretypes.DataShape:
         return o
-    if isinstance(o, py2help._strtypes):
-        ds = parser.parse(o, type_symbol_table.sym)
-    elif isinstance(o, (coretypes.CType, coretypes.String,
+    try:
+        convert = _converters[cls]
+    except KeyError:
+        convert = _converters[cls] = _converter(cls)
+    ds = convert(o)
+    validate(ds)
+    return ds
+
+
+# How ``dshape`` turns an object into a type, by the class of the object
+_converters = {}
+
+
+def _converter(cls):
+    if issubclass(cls, py2help._strtypes):
+        return _parse
+    if issubclass(cls, (coretypes.CType, coretypes.String,
                         coretypes.Record, coretypes.JSON,
                         coretypes.Date, coretypes.Time, coretypes.DateTime,
                         coretypes.Unit)):
-        ds = coretypes.DataShape(o)
-    elif isinstance(o, coretypes.Mono):
-        ds = o
-    elif isinstance(o, (list, tuple)):
-        ds = coretypes.DataShape(*o)
-    else:
-        raise TypeError('Cannot create dshape from object of type %s' % type(o))
-    validate(ds)
-    return ds
+        return coretypes.DataShape
+    if issubclass(cls, coretypes.Mono):
+        return _identity
+    if issubclass(cls, (list, tuple)):
+        return _from_parts
+    raise TypeError('Cannot create dshape from object of type %s' % cls)
+
+
+def _parse(o):
+    return parser.parse(o, type_symbol_table.sym)
+
+
+def _identity(o):
+    return o
+
+
+def _from_parts(o):
+    return coretypes.DataShape(*o)
 
 
 def cat_dshapes(dslist):
@@ -67,31 +93,125 @@ def cat_dshapes(dslist):
     Concatenates a list of dshapes together along
     the first axis. Raises an error if there is
     a mismatch along another axis or the measures
-    are different.
+    cannot be promoted to a common type.
 
-    Requires that the leading dimension be a known
-    size for all data shapes.
-    TODO: Relax this restriction to support
-          streaming dimensions.
+    ``dslist`` may be any iterable, and is consumed once.  The result has a
+    fixed leading dimension when every input does, and ``var`` when any
+    leading dimension is unknown (``var`` or a type variable).  Inner
+    dimensions must match, except that a fixed and a ``var`` dimension
+    concatenate to ``var``.
 
     >>> cat_dshapes(dshapes('10 * int32', '5 * int32'))
     dshape("15 * int32")
+    >>> cat_dshapes(dshapes('10 * 3 * int32', 'var * 3 * float64'))
+    dshape("var * 3 * float64")
+    >>> cat_dshapes(iter(dshapes('2 * 3 * int32', '4 * var * int32')))
+    dshape("6 * var * int32")
+    >>> cat_dshapes(dshapes('2 * {x: ?int32}', '3 * {x: float64}'))
+    dshape("5 * { x : ?float64 }")
     """
-    if len(dslist) == 0:
+    dslist = iter(dslist)
+    try:
+        first = next(dslist)
+    except StopIteration:
         raise ValueError('Cannot concatenate an empty list of dshapes')
-    elif len(dslist) == 1:
-        return dslist[0]
-
-    outer_dim_size = operator.index(dslist[0][0])
-    inner_ds = dslist[0][1:]
-    for ds in dslist[1:]:
-        outer_dim_size += operator.index(ds[0])
-        if ds[1:] != inner_ds:
-            raise ValueError(('The datashapes to concatenate much'
+    try:
+        second = next(dslist)
+    except StopIteration:
+        # Concatenating one dshape is a no-op
+        return first
+    dslist = itertools.chain([second], dslist)
+    params = (first.parameters if isinstance(first, coretypes.DataShape)
+              else (first,))
+    if len(params) < 2:
+        raise ValueError('Cannot concatenate datashape %s without a '
+                         'leading dimension' % first)
+
+    n = len(params)
+    outer = params[0]
+    total = outer.val if isinstance(outer, coretypes.Fixed) else None
+    tail = params[1:]
+    for ds in dslist:
+        ps = ds.parameters if isinstance(ds, coretypes.DataShape) else (ds,)
+        if len(ps) != n:
+            raise ValueError(('The datashapes to concatenate must'
                               ' all match after'
                               ' the first dimension (%s vs %s)') %
-                              (inner_ds, ds[1:]))
-    return coretypes.DataShape(*[coretypes.Fixed(outer_dim_size)] + list(inner_ds))
+                              (first, ds))
+        if total is not None:
+            dim = ps[0]
+            if type(dim) is coretypes.Fixed:
+                total += dim.val
+            else:
+                total = None
+        # Compare the inner dimensions and measure in one tuple comparison,
+        # only unifying them one by one when they differ
+        if ps[1:] != tail:
+            tail = _cat_tail(tail, ps, first, ds)
+    outer = coretypes.Fixed(total) if total is not None else coretypes.var
+    return coretypes.DataShape(outer, *tail)
+
+
+def _cat_tail(tail, ps, first, ds):
+    result = list(tail)
+    for i, dim in enumerate(result[:-1]):
+        if ps[i + 1] != dim:
+            result[i] = _cat_inner_dim(dim, ps[i + 1], first, ds)
+    if ps[-1] != result[-1]:
+        result[-1] = _cat_measure(result[-1], ps[-1], first, ds)
+    return tuple(result)
+
+
+def _cat_inner_dim(a, b, first, ds):
+    if isinstance(a, (coretypes.Fixed, coretypes.Var)) and \
+            isinstance(b, (coretypes.Fixed, coretypes.Var)) and \
+            not (isinstance(a, coretypes.Fixed) and
+                 isinstance(b, coretypes.Fixed)):
+        return coretypes.var
+    raise ValueError(('The datashapes to concatenate must'
+                      ' all match after'
+                      ' the first dimension (%s vs %s)') % (first, ds))
+
+
+def _cat_measure(a, b, first, ds):
+    """ The measure of the concatenation of measures ``a`` and ``b``
+
+    Options, records, tuples and nested dimensions are united part by
+    part, and strings take the longer of two fixed lengths.  Other types
+    are promoted as NumPy would.
+    """
+    if a == b:
+        return a
+    if isinstance(a, coretypes.Option) or isinstance(b, coretypes.Option):
+        a = a.ty if isinstance(a, coretypes.Option) else a
+        b = b.ty if isinstance(b, coretypes.Option) else b
+        return coretypes.Option(_cat_measure(a, b, first, ds))
+    if isinstance(a, coretypes.DataShape) and \
+            isinstance(b, coretypes.DataShape) and len(a) == len(b):
+        dims = [x if x == y else _cat_inner_dim(x, y, first, ds)
+                for x, y in zip(a.parameters[:-1], b.parameters[:-1])]
+        measure = _cat_measure(a.measure, b.measure, first, ds)
+        return coretypes.DataShape(*(dims + [measure]))
+    if isinstance(a, coretypes.Record) and \
+            isinstance(b, coretypes.Record) and a.names == b.names:
+        return coretypes.Record([(name, _cat_measure(x, y, first, ds))
+                                 for (name, x), (_, y)
+                                 in zip(a.fields, b.fields)])
+    if isinstance(a, coretypes.Tuple) and isinstance(b, coretypes.Tuple) \
+            and len(a.dshapes) == len(b.dshapes):
+        return coretypes.Tuple([_cat_measure(x, y, first, ds)
+                                for x, y in zip(a.dshapes, b.dshapes)])
+    if isinstance(a, coretypes.String) and \
+            isinstance(b, coretypes.String) and a.encoding == b.encoding:
+        if a.fixlen is None or b.fixlen is None:
+            return coretypes.String(a.encoding)
+        return coretypes.String(max(a.fixlen, b.fixlen), a.encoding)
+    from .promotion import promote_dtypes
+    try:
+        return promote_dtypes(a, b)
+    except (TypeError, UnificationError):
+        raise ValueError('Cannot concatenate datashapes with measures '
+                         '%s and %s (%s vs %s)' % (a, b, first, ds))
 
 
 def collect(pred, expr):
@@ -103,14 +223,7 @@ def collect(pred, expr):
     >>> sorted(set(collect(predicate, dshape)), key=str)
     [Fixed(2), ctype("int32"), ctype("int64"), Var()]
     """
-    if pred(expr):
-        return [expr]
-    if isinstance(expr, coretypes.Record):
-        return chain.from_iterable(collect(pred, typ) for typ in expr.types)
-    if isinstance(expr, coretypes.Mono):
-        return chain.from_iterable(collect(pred, typ) for typ in expr.parameters)
-    if isinstance(expr, (list, tuple)):
-        return chain.from_iterable(collect(pred, item) for item in expr)
+    return [term for term in walk(expr, prune=pred) if pred(term)]
 
 
 def has_var_dim(ds):
@@ -126,16 +239,25 @@ def has_var_dim(ds):
     return has((coretypes.Ellipsis, coretypes.Var), ds)
 
 
+_has_cache = LRUCache(4096)
+
+
 def has(typ, ds):
-    if isinstance(ds, typ):
-        return True
-    if isinstance(ds, coretypes.Record):
-        return any(has(typ, t) for t in ds.types)
-    if isinstance(ds, coretypes.Mono):
-        return any(has(typ, p) for p in ds.parameters)
-    if isinstance(ds, (list, tuple)):
-        return any(has(typ, item) for item in ds)
-    return False
+    """ Whether ``ds`` contains a term of type ``typ``
+
+    Results for types are cached per ``(typ, ds)``.
+
+    >>> has(coretypes.Var, dshape('{a: int32, b: var * string}'))
+    True
+    """
+    if not isinstance(ds, coretypes.Mono):
+        return any(isinstance(t, typ) for t in walk(ds))
+    key = typ, ds
+    result = _has_cache.get(key)
+    if result is None:
+        result = any(isinstance(t, typ) for t in walk(ds))
+        _has_cache[key] = result
+    return result
 
 
 def has_ellipsis(ds):
@@ -152,16 +274,50 @@ def has_ellipsis(ds):
 #------------------------------------------------------------------------
 # DataShape Conversion
 #------------------------------------------------------------------------
+_cffi_signed = {1: coretypes.int8, 2: coretypes.int16, 4: coretypes.int32,
+                8: coretypes.int64}
+_cffi_unsigned = {1: coretypes.uint8, 2: coretypes.uint16,
+                  4: coretypes.uint32, 8: coretypes.uint64}
+
+_cffi_primitives = {'float': coretypes.float32,
+                    'double': coretypes.float64,
+                    '_Bool': coretypes.bool_,
+                    'char': coretypes.char}
+for _cn in ['signed char', 'short', 'int', 'long', 'long long', 'int8_t',
+            'int16_t', 'int32_t', 'int64_t', 'intptr_t', 'ssize_t',
+            'ptrdiff_t']:
+    _cffi_primitives[_cn] = _cffi_signed
+for _cn in ['unsigned char', 'unsigned short', 'unsigned int',
+            'unsigned long', 'unsigned long long', 'uint8_t', 'uint16_t',
+            'uint32_t', 'uint64_t', 'uintptr_t', 'size_t']:
+    _cffi_primitives[_cn] = _cffi_unsigned
+del _cn
+
+_cffi_cache = LRUCache(1024)
+
+
 def _from_cffi_internal(ffi, ctype):
+    result = _cffi_cache.get(ctype)
+    if result is None:
+        result = _from_cffi_uncached(ffi, ctype)
+        _cffi_cache[ctype] = result
+    return result
+
+
+def _from_cffi_uncached(ffi, ctype):
     k = ctype.kind
     if k == 'struct':
         # TODO: Assuming the field offsets match
         #       blaze kernels - need to sync up blaze, dynd,
         #       cffi, numpy, etc so that the field offsets always work!
-        #       Also need to make sure there are no bitsize/bitshift
-        #       values that would be incompatible.
-        return Record([(f[0], _from_cffi_internal(ffi, f[1].type))
-                        for f in ctype.fields])
+        if ctype.fields is None:
+            raise TypeError('cffi struct "%s" is opaque' % ctype.cname)
+        for name, field in ctype.fields:
+            if field.bitsize != -1:
+                raise TypeError('cffi bitfield "%s" in "%s" has no '
+                                'datashape equivalent' % (name, ctype.cname))
+        return coretypes.Record([(f[0], _from_cffi_internal(ffi, f[1].type))
+                                 for f in ctype.fields])
     elif k == 'array':
         if ctype.length is None:
             # Only the first array can have the size
@@ -177,41 +333,18 @@ def _from_cffi_internal(ffi, ctype):
         return coretypes.DataShape(*dsparams)
     elif k == 'primitive':
         cn = ctype.cname
-        if cn in ['signed char', 'short', 'int',
-                        'long', 'long long']:
+        try:
+            result = _cffi_primitives[cn]
+        except KeyError:
+            raise TypeError('Unrecognized cffi primitive "%s"' % cn)
+        if isinstance(result, dict):
             so = ffi.sizeof(ctype)
-            if so == 1:
-                return coretypes.int8
-            elif so == 2:
-                return coretypes.int16
-            elif so == 4:
-                return coretypes.int32
-            elif so == 8:
-                return coretypes.int64
-            else:
+            try:
+                result = result[so]
+            except KeyError:
                 raise TypeError('cffi primitive "%s" has invalid size %d' %
                                 (cn, so))
-        elif cn in ['unsigned char', 'unsigned short',
-                        'unsigned int', 'unsigned long',
-                        'unsigned long long']:
-            so = ffi.sizeof(ctype)
-            if so == 1:
-                return coretypes.uint8
-            elif so == 2:
-                return coretypes.uint16
-            elif so == 4:
-                return coretypes.uint32
-            elif so == 8:
-                return coretypes.uint64
-            else:
-                raise TypeError('cffi primitive "%s" has invalid size %d' %
-                                (cn, so))
-        elif cn == 'float':
-            return coretypes.float32
-        elif cn == 'double':
-            return coretypes.float64
-        else:
-            raise TypeError('Unrecognized cffi primitive "%s"' % cn)
+        return result
     elif k == 'pointer':
         raise TypeError('a pointer can only be at the outer level of a cffi type '
                         'when converting to blaze datashape')
@@ -222,6 +355,15 @@ def _from_cffi_internal(ffi, ctype):
 def from_cffi(ffi, ctype):
     """
     Constructs a blaze dshape from a cffi type.
+
+    Conversions are cached per cffi type, so converting the same struct for
+    every call is cheap.
+
+    >>> import cffi                                 # doctest: +SKIP
+    >>> ffi = cffi.FFI()                            # doctest: +SKIP
+    >>> ffi.cdef('struct point { int x; double y[3]; };')  # doctest: +SKIP
+    >>> from_cffi(ffi, ffi.typeof('struct point *'))  # doctest: +SKIP
+    dshape("{ x : int32, y : 3 * float64 }")
     """
     # Allow one pointer dereference at the outermost level
     if ctype.kind == 'pointer':
@@ -237,79 +379,198 @@ typedict = {ctypes.c_int8:   coretypes.int8,
             ctypes.c_uint32: coretypes.uint32,
             ctypes.c_uint64: coretypes.uint64,
             ctypes.c_float:  coretypes.float32,
-            ctypes.c_double: coretypes.float64}
+            ctypes.c_double: coretypes.float64,
+            ctypes.c_bool:   coretypes.bool_}
 
 
 revtypedict = reverse_dict(typedict)
 
 
-def to_ctypes(dshape):
+class Complex64(ctypes.Structure):
+    _fields_ = [('real', ctypes.c_float),
+                ('imag', ctypes.c_float)]
+    _blaze_type_ = coretypes.complex_float32
+
+
+class Complex128(ctypes.Structure):
+    _fields_ = [('real', ctypes.c_double),
+                ('imag', ctypes.c_double)]
+    _blaze_type_ = coretypes.complex_float64
+
+
+revtypedict.update({coretypes.complex_float32: Complex64,
+                    coretypes.complex_float64: Complex128,
+                    coretypes.date_: ctypes.c_int64,
+                    coretypes.datetime_: ctypes.c_int64})
+
+
+# Characters of fixed-length strings, laid out as in NumPy
+_char_types = {u'A': ctypes.c_char}
+_wide_char = (ctypes.c_wchar if ctypes.sizeof(ctypes.c_wchar) == 4
+              else ctypes.c_uint32)
+
+_ctypes_cache = LRUCache(1024)
+
+
+def to_ctypes(dshape, pack=None):
     """
     Constructs a ctypes type from a datashape
 
+    Records and tuples become ``ctypes.Structure`` subclasses, fixed
+    dimensions become ctypes arrays and fixed-length strings become arrays
+    of characters.  ``pack`` sets ``_pack_`` on every generated structure,
+    limiting the alignment of their fields as ``#pragma pack`` would.
+
+    Generated types are cached, so converting the same datashape twice
+    returns the same class.
+
     >>> to_ctypes(coretypes.int32)
     <class 'ctypes.c_int'>
+    >>> S = to_ctypes(dshape('{x: int8, y: 3 * float64}'))
+    >>> S.y.offset, ctypes.sizeof(S)
+    (8, 32)
+    >>> ctypes.sizeof(to_ctypes(dshape('{x: int8, y: 3 * float64}'), pack=1))
+    25
+    >>> to_ctypes(dshape('{x: int8, y: 3 * float64}')) is S
+    True
     """
-    if len(dshape) == 1:
-        ctype = revtypedict.get(dshape)
-        if ctype:
-            return ctype
-        if dshape == coretypes.complex_float32:
-            class Complex64(ctypes.Structure):
-                _fields_ = [('real', ctypes.c_float),
-                            ('imag', ctypes.c_float)]
-                _blaze_type_ = coretypes.complex_float32
-            return Complex64
-        elif dshape == coretypes.complex_float64:
-            class Complex128(ctypes.Structure):
-                _fields_ = [('real', ctypes.c_double),
-                            ('imag', ctypes.c_double)]
-                _blaze_type_ = coretypes.complex_float64
-            return Complex128
-        elif isinstance(dshape, coretypes.Record):
-            fields = [(name, to_ctypes(dshape.fields[name]))
-                                          for name in dshape.names]
-            class temp(ctypes.Structure):
-                _fields_ = fields
-            return temp
-        else:
-            raise TypeError("Cannot convert datashape %r into ctype" % dshape)
-    # Create arrays
-    else:
-        if isinstance(dshape[0], (coretypes.TypeVar, coretypes.Ellipsis)):
-            num = 0
-        else:
-            num = int(dshape[0])
-        return num*to_ctypes(dshape.subarray(1))
+    key = dshape, pack
+    result = _ctypes_cache.get(key)
+    if result is None:
+        result = _to_ctypes(dshape, pack)
+        _ctypes_cache[key] = result
+    return result
+
+
+def to_ctypes_many(dshapes, pack=None):
+    """
+    Constructs ctypes types for many datashapes at once
+
+    Strings are parsed as datashapes, and repeated datashapes are converted
+    only once.
+
+    >>> to_ctypes_many(['int32', '2 * float64', 'int32'])
+    [<class 'ctypes.c_int'>, <class '...c_double_Array_2'>, <class 'ctypes.c_int'>]
+    """
+    seen = {}
+    result = []
+    for ds in dshapes:
+        try:
+            ctype = seen[ds]
+        except KeyError:
+            ctype = seen[ds] = to_ctypes(dshape(ds), pack)
+        result.append(ctype)
+    return result
+
+
+def _to_ctypes(ds, pack):
+    if len(ds) > 1:
+        ctype = to_ctypes(ds.measure, pack)
+        for dim in reversed(ds.shape):
+            if isinstance(dim, (coretypes.TypeVar, coretypes.Ellipsis)):
+                num = 0
+            else:
+                num = int(dim)
+            ctype = num * ctype
+        return ctype
+    ds = ds.measure
+    ctype = revtypedict.get(ds)
+    if ctype:
+        return ctype
+    if isinstance(ds, coretypes.Record):
+        return _structure('Record', ds,
+                          [(str(name), to_ctypes(typ, pack))
+                           for name, typ in ds.fields], pack)
+    if isinstance(ds, coretypes.Tuple):
+        return _structure('Tuple', ds,
+                          [('f%d' % i, to_ctypes(typ, pack))
+                           for i, typ in enumerate(ds.dshapes)], pack)
+    if isinstance(ds, coretypes.String) and ds.fixlen is not None:
+        return ds.fixlen * _char_types.get(ds.encoding, _wide_char)
+    raise TypeError("Cannot convert datashape %r into ctype" % ds)
+
+
+def _structure(name, ds, fields, pack):
+    namespace = {'_fields_': fields, '_blaze_type_': ds}
+    if pack is not None:
+        namespace['_pack_'] = pack
+    return type(name, (ctypes.Structure,), namespace)
+
+# Integer types that ctypes does not alias to its fixed-width types
+_ctypes_aliases = {ctypes.c_longlong: coretypes.int64,
+                   ctypes.c_ulonglong: coretypes.uint64,
+                   ctypes.c_char: coretypes.char}
+
+# Arrays of characters are strings
+_ctypes_strings = {ctypes.c_char: 'A'}
+if ctypes.sizeof(ctypes.c_wchar) == 4:
+    _ctypes_strings[ctypes.c_wchar] = 'U32'
+
+_from_ctypes_cache = LRUCache(1024)
+
 
 # FIXME: Add a field
 def from_ctypes(ctype):
     """
     Constructs a blaze dshape from a ctypes type.
 
+    Conversions are cached per ctypes type.  As with ``from_cffi``, one
+    pointer at the outermost level is dereferenced.
+
     >>> from_ctypes(ctypes.c_int)
     ctype("int32")
+    >>> from_ctypes(ctypes.POINTER(ctypes.c_double * 3))
+    dshape("3 * float64")
     """
+    if issubclass(ctype, ctypes._Pointer):
+        ctype = ctype._type_
+    return _from_ctypes_internal(ctype)
+
+
+def _from_ctypes_internal(ctype):
+    result = _from_ctypes_cache.get(ctype)
+    if result is None:
+        result = _from_ctypes_uncached(ctype)
+        _from_ctypes_cache[ctype] = result
+    return result
+
+
+def _from_ctypes_uncached(ctype):
     if issubclass(ctype, ctypes.Structure):
         fields = []
         if hasattr(ctype, '_blaze_type_'):
             return ctype._blaze_type_
-        for nm, tp in ctype._fields_:
-            child_ds = from_ctypes(tp)
+        for field in ctype._fields_:
+            if len(field) > 2:
+                raise TypeError('ctypes bitfield %r in %r has no datashape '
+                                'equivalent' % (field[0], ctype))
+            nm, tp = field
+            child_ds = _from_ctypes_internal(tp)
             fields.append((nm, child_ds))
-        ds = Record(fields)
+        ds = coretypes.Record(fields)
         # TODO: Validate that the ctypes offsets match
         #       the C offsets blaze uses
         return ds
     elif issubclass(ctype, ctypes.Array):
         dstup = []
         while issubclass(ctype, ctypes.Array):
+            if ctype._type_ in _ctypes_strings:
+                measure = coretypes.String(ctype._length_,
+                                           _ctypes_strings[ctype._type_])
+                break
             dstup.append(coretypes.Fixed(ctype._length_))
             ctype = ctype._type_
-        dstup.append(from_ctypes(ctype))
+        else:
+            measure = _from_ctypes_internal(ctype)
+        if not dstup:
+            return measure
+        dstup.append(measure)
         return coretypes.DataShape(*dstup)
+    elif issubclass(ctype, ctypes._Pointer):
+        raise TypeError('a pointer can only be at the outer level of a ctypes '
+                        'type when converting to blaze datashape')
 
-    coretype = typedict.get(ctype)
+    coretype = typedict.get(ctype) or _ctypes_aliases.get(ctype)
 
     if coretype:
         return coretype
@@ -6,6 +6,7 @@ Datashape validation.
 
 from .error import DataShapeError
 from . import coretypes as T
+from .traversal import fold, parameters
 
 
 def traverse(f, t):
@@ -13,9 +14,8 @@ def traverse(f, t):
     Map f over t, calling `f` with type `t` and the map result of the mapping
     `f` over `t`s parameters.
     """
-    if isinstance(t, T.Mono) and not isinstance(t, T.Unit):
-        return f(t, [traverse(f, p) for p in t.parameters])
-    return t
+    return fold(lambda t, params: t if isinstance(t, T.Unit) else f(t, params),
+                t, parameters)
 
 
 def validate(ds):
@@ -39,8 +39,34 @@ def validate(ds):
         Traceback (most recent call last):
             ...
         DataShapeSyntaxError: Expected a dtype
+
+    Types are immutable, so each type object is marked once it has been
+    validated and neither it nor any type containing it checks it again.
     """
-    traverse(_validate, ds)
+    if isinstance(ds, T.Mono):
+        if '_validated' in ds.__dict__:
+            return
+        params = parameters(ds)
+        if all('_validated' in p.__dict__ for p in params
+               if isinstance(p, T.Mono)):
+            # A new type built from validated parts, such as a measure
+            # wrapped in a DataShape
+            return _check(ds, params)
+    fold(_check, ds, _unvalidated_parameters)
+
+
+def _unvalidated_parameters(ds):
+    if '_validated' in ds.__dict__:
+        return ()
+    return parameters(ds)
+
+
+def _check(ds, params):
+    if '_validated' not in ds.__dict__:
+        if not isinstance(ds, T.Unit):
+            _validate(ds, params)
+        ds.__dict__['_validated'] = True
+
 
 def _validate(ds, params):
     if isinstance(ds, T.DataShape):